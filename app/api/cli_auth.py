@@ -1,29 +1,60 @@
 import uuid
-import hashlib
+import json
+import asyncio
 import secrets
+from weakref import WeakValueDictionary
 from datetime import datetime, timedelta, UTC
 from typing import Dict, Optional
 from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.utils import load_users, save_users, normalize_username, verify_password
+from app.ttl_store import TTLStore
+from app.storage.auth_state import MemoryAuthState, get_sqlite_auth_state
+from app.utils import (
+    get_user, add_user_api_key, revoke_user_api_key, authenticate_api_key,
+    hash_api_key, normalize_username, verify_password_async,
+    auth_state_engine, auth_state_path
+)
 
 router = APIRouter()
 
-# In-memory state for CLI authentication
-auth_sessions: Dict[str, dict] = {}
-failed_logins: Dict[str, dict] = {}
-
 # Configuration
 MAX_ACTIVE_SESSIONS = 100
 CLI_TOKEN_TTL = 10  # minutes
 MAX_FAILED_ATTEMPTS = 5
 FAILED_ATTEMPTS_WINDOW = 10  # minutes
+# Beyond this many IPs, the least recently seen ones are forgotten
+MAX_TRACKED_IPS = 10000
+# Longest /auth/status?wait= the server honours
+MAX_STATUS_WAIT = 60  # seconds
+# Waiters also recheck the state this often: a completion on another worker can't wake this worker's events
+STATUS_RECHECK_INTERVAL = 1  # seconds
+SSE_KEEPALIVE = 15  # seconds
+
+# In-memory state for CLI authentication (the "memory" engine). Entries expire on their own, and both stores are size-capped
+auth_sessions = TTLStore(MAX_ACTIVE_SESSIONS, lambda session: session["expires_at"].timestamp())
+failed_logins = TTLStore(MAX_TRACKED_IPS, lambda attempts: attempts["expires_at"])
+memory_auth_state = MemoryAuthState(auth_sessions, failed_logins)
+
+def get_auth_state():
+    """Where sessions and rate limits live. Use "sqlite" when running more than one worker."""
+    if auth_state_engine == "sqlite":
+        return get_sqlite_auth_state(auth_state_path)
+    return memory_auth_state
+
+# Set when verify_cli_auth completes a session, waking its long-polls and SSE streams.
+# Weak values: an event lives only while something is waiting on it
+completion_events: WeakValueDictionary = WeakValueDictionary()
 
 class AuthVerifyRequest(BaseModel):
     cli_token: str
     username: str
     password: str
 
+class AuthRevokeRequest(BaseModel):
+    user: str
+    api_key: str
+
 def get_client_ip(request: Request) -> str:
     """Extract client IP address from request."""
     forwarded_for = request.headers.get("X-Forwarded-For")
@@ -32,64 +63,105 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 def is_rate_limited(ip: str) -> bool:
-    """Check if IP is rate limited due to failed login attempts."""
-    if ip not in failed_logins:
-        return False
-    
-    attempt_data = failed_logins[ip]
-    window_start = datetime.now(UTC) - timedelta(minutes=FAILED_ATTEMPTS_WINDOW)
-    
-    if attempt_data["last_attempt"] < window_start:
-        # Reset if outside window
-        del failed_logins[ip]
-        return False
-    
-    return attempt_data["count"] >= MAX_FAILED_ATTEMPTS
+    """Check if IP is rate limited due to failed login attempts (sliding window)."""
+    return get_auth_state().count_hits(ip, FAILED_ATTEMPTS_WINDOW * 60) >= MAX_FAILED_ATTEMPTS
 
 def record_failed_attempt(ip: str):
     """Record a failed login attempt for rate limiting."""
-    now = datetime.now(UTC)
-    if ip not in failed_logins:
-        failed_logins[ip] = {"count": 0, "last_attempt": now}
-    
-    failed_logins[ip]["count"] += 1
-    failed_logins[ip]["last_attempt"] = now
+    get_auth_state().record_hit(ip, FAILED_ATTEMPTS_WINDOW * 60, MAX_FAILED_ATTEMPTS)
 
 def generate_api_key() -> str:
     """Generate a secure API key."""
     return secrets.token_hex(32)
 
-def hash_api_key(api_key: str) -> str:
-    """Hash an API key for storage."""
-    return hashlib.sha256(api_key.encode()).hexdigest()
+def complete_cli_auth(cli_token: str, username: str) -> bool:
+    """
+    Issue an API key for a user whose credentials were already checked and hand
+    it to the pending CLI session. Called directly by /auth/verify and the
+    /cli-login page. Returns False if the session is gone (expired or unknown).
+    """
+    state = get_auth_state()
+    if state.get_session(cli_token) is None:
+        return False
+    
+    api_key = generate_api_key()
+    api_key_hash = hash_api_key(api_key)
+    add_user_api_key(username, api_key_hash)
+    
+    if not state.complete_session(cli_token, username, api_key):
+        revoke_user_api_key(username, api_key_hash)
+        return False
+    notify_completed(cli_token)
+    return True
+
+def notify_completed(cli_token: str):
+    event = completion_events.get(cli_token)
+    if event is not None:
+        event.set()
+
+async def wait_for_completion(cli_token: str, timeout: float) -> dict | None:
+    """
+    The session once it is completed, or as it stands after timeout seconds.
+    None if it expired or was collected meanwhile.
+    """
+    event = completion_events.get(cli_token)
+    if event is None:
+        event = completion_events[cli_token] = asyncio.Event()
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        session = get_auth_state().get_session(cli_token)
+        remaining = deadline - asyncio.get_running_loop().time()
+        if session is None or session["completed"] or remaining <= 0:
+            return session
+        try:
+            await asyncio.wait_for(event.wait(), min(remaining, STATUS_RECHECK_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+
+def take_completed(cli_token: str) -> dict:
+    """Return the API key and delete the session in one step, so only one poller ever gets it."""
+    session = get_auth_state().take_session(cli_token)
+    if session is None:
+        raise HTTPException(status_code=400, detail="Invalid CLI token")
+    return {
+        "username": session["username"],
+        "api_key": session["raw_api_key"]
+    }
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def status_events(cli_token: str):
+    """SSE: a keepalive comment every SSE_KEEPALIVE seconds, then one "completed" or "error" event."""
+    while True:
+        session = await wait_for_completion(cli_token, SSE_KEEPALIVE)
+        if session is None:
+            yield sse_event("error", {"detail": "Invalid CLI token"})
+            return
+        if session["completed"]:
+            try:
+                yield sse_event("completed", take_completed(cli_token))
+            except HTTPException as e:
+                yield sse_event("error", {"detail": e.detail})
+            return
+        yield ": keepalive\n\n"
 
 def cleanup_expired_sessions():
-    """Remove expired CLI tokens from memory."""
-    now = datetime.now(UTC)
-    expired_tokens = [
-        token for token, session in auth_sessions.items()
-        if session["expires_at"] < now
-    ]
-    for token in expired_tokens:
-        del auth_sessions[token]
+    """Remove expired CLI tokens and rate-limit hits."""
+    get_auth_state().purge()
+
+def auth_state_metrics() -> dict:
+    return get_auth_state().metrics()
 
 @router.post("/auth/init")
 async def init_cli_auth(request: Request):
     """Initialize CLI authentication by generating a token."""
     cleanup_expired_sessions()
     
-    if len(auth_sessions) >= MAX_ACTIVE_SESSIONS:
-        raise HTTPException(status_code=429, detail="Too many active sessions")
-    
     cli_token = str(uuid.uuid4())
     expires_at = datetime.now(UTC) + timedelta(minutes=CLI_TOKEN_TTL)
-    
-    auth_sessions[cli_token] = {
-        "expires_at": expires_at,
-        "username": None,
-        "raw_api_key": None,
-        "completed": False
-    }
+    if not get_auth_state().create_session(cli_token, expires_at, MAX_ACTIVE_SESSIONS):
+        raise HTTPException(status_code=429, detail="Too many active sessions")
     
     base_url = str(request.base_url).rstrip("/")
     login_url = f"{base_url}/cli-login?cli_token={cli_token}"
@@ -107,62 +179,56 @@ async def verify_cli_auth(request: Request, auth_data: AuthVerifyRequest):
     if is_rate_limited(client_ip):
         raise HTTPException(status_code=429, detail="Too many failed attempts")
     
-    # Validate CLI token
-    if auth_data.cli_token not in auth_sessions:
+    # Validate CLI token (expired ones are gone)
+    state = get_auth_state()
+    if state.get_session(auth_data.cli_token) is None:
         record_failed_attempt(client_ip)
         raise HTTPException(status_code=400, detail="Invalid CLI token")
     
-    session = auth_sessions[auth_data.cli_token]
-    if session["expires_at"] < datetime.now(UTC):
-        del auth_sessions[auth_data.cli_token]
-        record_failed_attempt(client_ip)
-        raise HTTPException(status_code=400, detail="CLI token expired")
-    
     # Validate credentials
     username = normalize_username(auth_data.username)
-    users = load_users()
-    user_data = users.get(username)
+    user_data = get_user(username)
     
-    if not user_data or not verify_password(auth_data.password, user_data["password_hash"]):
+    if not user_data or not await verify_password_async(auth_data.password, user_data["password_hash"]):
         record_failed_attempt(client_ip)
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Generate API key
-    api_key = generate_api_key()
-    api_key_hash = hash_api_key(api_key)
-    
-    # Store API key hash in user data
-    if "api_keys" not in user_data:
-        user_data["api_keys"] = []
-    user_data["api_keys"].append(api_key_hash)
-    save_users(users)
-    
-    # Update session
-    session["username"] = username
-    session["raw_api_key"] = api_key
-    session["completed"] = True
+    # Session may have expired while the password was checked
+    if not complete_cli_auth(auth_data.cli_token, username):
+        raise HTTPException(status_code=400, detail="Invalid CLI token")
     
     return {"message": "Authentication successful"}
 
 @router.get("/auth/status")
-async def get_auth_status(cli_token: str):
-    """Get authentication status and return API key if completed."""
-    if cli_token not in auth_sessions:
+async def get_auth_status(request: Request, cli_token: str, wait: float = 0):
+    """
+    Get authentication status and return API key if completed.
+    ?wait=N holds the request up to N seconds for the login to complete;
+    "Accept: text/event-stream" streams the outcome as server-sent events.
+    """
+    session = get_auth_state().get_session(cli_token)
+    if session is None:
         raise HTTPException(status_code=400, detail="Invalid CLI token")
     
-    session = auth_sessions[cli_token]
-    if session["expires_at"] < datetime.now(UTC):
-        del auth_sessions[cli_token]
-        raise HTTPException(status_code=400, detail="CLI token expired")
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(status_events(cli_token), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    
+    if not session["completed"] and wait > 0:
+        session = await wait_for_completion(cli_token, min(wait, MAX_STATUS_WAIT))
+        if session is None:
+            raise HTTPException(status_code=400, detail="Invalid CLI token")
     
     if not session["completed"]:
         raise HTTPException(status_code=401, detail="Authentication not completed")
     
-    # Return API key and immediately delete session
-    result = {
-        "username": session["username"],
-        "api_key": session["raw_api_key"]
-    }
-    
-    del auth_sessions[cli_token]
-    return result 
\ No newline at end of file
+    return take_completed(cli_token)
+
+@router.post("/auth/revoke")
+async def revoke_cli_auth(body: AuthRevokeRequest):
+    """Revoke a CLI API key (e.g. on "gitmini logout")."""
+    if not authenticate_api_key(body.user, body.api_key):
+        raise HTTPException(status_code=401, detail="Authentication failed")
+
+    revoke_user_api_key(body.user, hash_api_key(body.api_key))
+    return {"message": "API key revoked"}
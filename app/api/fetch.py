@@ -0,0 +1,84 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from app.utils import authenticate_api_key, repo_owned_by_other_user, get_repo_root, is_invalid_repo_name
+from app.gitmini.objects import get_object_store, is_object_hash
+from app.gitmini.reader import ObjectReader
+from app.gitmini.refs import RefStore
+from app.gitmini.commit_graph import get_commit_graph
+from app.gitmini.fetch import fetch_stream, known_commits, FETCH_BATCH_OBJECTS, MAX_FETCH_HAVES
+import os
+from typing import Optional
+
+router = APIRouter()
+
+class FetchRequest(BaseModel):
+    user: str
+    api_key: str
+    repo: str
+    branch: str
+    have: list[str] = []
+    max_objects: Optional[int] = None
+
+@router.post("/api/remote/fetch")
+async def remote_fetch(body: FetchRequest):
+    """
+    Streams the objects reachable from the branch tip that the client is
+    missing, given the commits it already has. See PUSH_PULL.md.
+    """
+    if (not all([body.user, body.api_key, body.repo, body.branch])
+            or is_invalid_repo_name(body.repo)
+            or not all(is_object_hash(h) for h in body.have)
+            or len(body.have) > MAX_FETCH_HAVES
+            or (body.max_objects is not None and body.max_objects < 1)):
+        return JSONResponse(status_code=400, content={
+            "status": "error",
+            "message": "Invalid request payload"
+        })
+
+    if not authenticate_api_key(body.user, body.api_key):
+        return JSONResponse(status_code=401, content={
+            "status": "error",
+            "message": "Authentication failed"
+        })
+
+    repo_root = get_repo_root()
+    user_repo_path = os.path.join(repo_root, body.user, body.repo)
+    if not os.path.isdir(user_repo_path):
+        if repo_owned_by_other_user(body.user, body.repo):
+            return JSONResponse(status_code=403, content={
+                "status": "error",
+                "message": "Repository not found or access denied"
+            })
+        return JSONResponse(status_code=404, content={
+            "status": "error",
+            "message": "Repository not found or access denied"
+        })
+
+    refs = RefStore(os.path.join(user_repo_path, ".gitmini"))
+    if not refs.exists(body.branch):
+        return JSONResponse(status_code=404, content={
+            "status": "error",
+            "message": "Remote branch not found."
+        })
+
+    store = get_object_store(os.path.join(user_repo_path, ".gitmini", "objects"))
+    tip = refs.read(body.branch) or None
+    reader = ObjectReader(store)
+    # Checked before streaming: a bad have must not fail the walk after the 200 went out
+    have = await run_in_threadpool(known_commits, reader, body.have)
+    if tip is None or tip in have:
+        return JSONResponse(status_code=200, content={
+            "status": "ok",
+            "message": "Already up to date.",
+            "branch": body.branch,
+            "most_recent_remote_branch_commit": tip
+        })
+
+    max_objects = min(body.max_objects or FETCH_BATCH_OBJECTS, FETCH_BATCH_OBJECTS)
+    return StreamingResponse(
+        fetch_stream(reader, get_commit_graph(refs.gitmini_dir), body.branch, tip, have, max_objects),
+        media_type="application/gzip",
+        headers={"Content-Disposition": 'attachment; filename="missing_objects.tar.gz"'}
+    )
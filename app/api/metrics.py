@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from app.hashing import password_pool
+from app.gitmini.ingest import ingest_metrics
+from app.api.negotiate import negotiation_metrics
+from app.gitmini.fetch import fetch_metrics
+from app.page_cache import page_cache
+from app.gitmini.reader import cache_metrics
+from app.gitmini.archive import download_metrics
+from app.api.cli_auth import auth_state_metrics
+from app.utils import sessions, get_repo_reaper
+
+router = APIRouter()
+
+@router.get("/api/metrics")
+async def metrics():
+    """Runtime counters for sizing worker pools and caches."""
+    return {
+        "password_hashing": password_pool.metrics(),
+        "push_ingest": ingest_metrics.as_dict(),
+        "push_negotiation": negotiation_metrics.as_dict(),
+        "fetch": fetch_metrics.as_dict(),
+        "page_cache": page_cache.metrics(),
+        "object_reader": cache_metrics(),
+        "downloads": download_metrics(),
+        "auth_state": auth_state_metrics(),
+        "sessions": sessions.metrics(),
+        "repo_trash": get_repo_reaper().metrics()
+    }
@@ -0,0 +1,102 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from app.utils import authenticate_api_key, repo_owned_by_other_user, get_repo_root, is_invalid_repo_name
+from app.gitmini.objects import get_object_store, is_object_hash
+import os, threading
+from typing import Optional
+
+router = APIRouter()
+
+# Clients with more objects than this split them over several requests
+MAX_NEGOTIATE_OBJECTS = 10000
+
+class NegotiateRequest(BaseModel):
+    user: str
+    api_key: str
+    repo: str
+    objects: list[str] = []
+    last_known_remote_commit: Optional[str] = None
+
+class NegotiationMetrics:
+    """Totals reported by /api/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.objects_offered = 0
+        self.objects_missing = 0
+
+    def record(self, offered: int, missing: int):
+        with self._lock:
+            self.requests += 1
+            self.objects_offered += offered
+            self.objects_missing += missing
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "objects_offered": self.objects_offered,
+                "objects_missing": self.objects_missing,
+                "objects_skipped": self.objects_offered - self.objects_missing
+            }
+
+negotiation_metrics = NegotiationMetrics()
+
+@router.post("/api/remote/negotiate")
+async def remote_negotiate(body: NegotiateRequest):
+    """
+    Tells the CLI which of the objects it is about to push the server is missing.
+    common_commit echoes last_known_remote_commit if the server has it, so the
+    client can skip everything reachable from it before asking.
+    """
+    if (is_invalid_repo_name(body.repo)
+            or not all(is_object_hash(h) for h in body.objects)
+            or (body.last_known_remote_commit and not is_object_hash(body.last_known_remote_commit))):
+        return JSONResponse(status_code=400, content={
+            "status": "error",
+            "message": "Invalid request payload"
+        })
+
+    if len(body.objects) > MAX_NEGOTIATE_OBJECTS:
+        return JSONResponse(status_code=400, content={
+            "status": "error",
+            "message": "Too many objects in one request",
+            "max_objects": MAX_NEGOTIATE_OBJECTS
+        })
+
+    if not authenticate_api_key(body.user, body.api_key):
+        return JSONResponse(status_code=401, content={
+            "status": "error",
+            "message": "Authentication failed"
+        })
+
+    repo_root = get_repo_root()
+    user_repo_path = os.path.join(repo_root, body.user, body.repo)
+    if not os.path.isdir(user_repo_path):
+        if repo_owned_by_other_user(body.user, body.repo):
+            return JSONResponse(status_code=403, content={
+                "status": "error",
+                "message": "Repository not found or access denied"
+            })
+        return JSONResponse(status_code=404, content={
+            "status": "error",
+            "message": "Repository not found or access denied"
+        })
+
+    store = get_object_store(os.path.join(user_repo_path, ".gitmini", "objects"))
+    wanted = list(dict.fromkeys(body.objects))
+    missing = await run_in_threadpool(store.missing, wanted)
+
+    common_commit = body.last_known_remote_commit
+    if common_commit and not await run_in_threadpool(store.has, common_commit):
+        common_commit = None
+
+    negotiation_metrics.record(len(wanted), len(missing))
+    return JSONResponse(status_code=200, content={
+        "status": "ok",
+        "missing": missing,
+        "common_commit": common_commit
+    })
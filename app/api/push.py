@@ -1,11 +1,34 @@
 from fastapi import APIRouter, Form, File, UploadFile
 from fastapi.responses import JSONResponse
-from app.utils import load_users, get_repo_root
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from app.utils import authenticate_api_key, repo_owned_by_other_user, get_repo_root, is_invalid_repo_name
+from app.gitmini.ingest import ingest_archive, ArchiveError
+from app.gitmini.objects import get_object_store, is_object_hash
+from app.gitmini.refs import RefStore, RefUpdateRejected
+from app.gitmini.reader import ObjectReader, ObjectNotFound
+from app.gitmini.commit_graph import get_commit_graph
+from app.gitmini.manifest import write_manifest
+from datetime import datetime, UTC
 import os
 from typing import Optional
 
 router = APIRouter()
 
+def archive_error_response():
+    return JSONResponse(status_code=400, content={
+        "status": "error",
+        "message": "Object archive missing or corrupt"
+    })
+
+def non_fast_forward_response(branch: str, current_remote_commit: str | None):
+    return JSONResponse(status_code=400, content={
+        "status": "error",
+        "message": "Non-fast-forward push rejected. Remote branch has diverged.",
+        "branch": branch,
+        "most_recent_remote_branch_commit": current_remote_commit
+    })
+
 @router.post("/api/remote/push")
 async def remote_push(
     user: str = Form(...),
@@ -17,7 +40,8 @@ async def remote_push(
     objects: UploadFile = File(...)
 ):
     # Validate required fields
-    if not all([user, api_key, repo, branch]):
+    if (not all([user, api_key, repo, branch]) or is_invalid_repo_name(repo)
+            or (new_commit is not None and not is_object_hash(new_commit))):
         return JSONResponse(status_code=400, content={
             "status": "error",
             "message": "Invalid push payload"
@@ -25,25 +49,10 @@ async def remote_push(
 
     # Check tarball
     if not objects or not objects.filename or not objects.filename.endswith(".tar.gz"):
-        return JSONResponse(status_code=400, content={
-            "status": "error",
-            "message": "Object archive missing or corrupt"
-        })
-    try:
-        # Try to read a small chunk to check if file is readable
-        await objects.read(1)
-        await objects.seek(0)
-    except Exception:
-        return JSONResponse(status_code=400, content={
-            "status": "error",
-            "message": "Object archive missing or corrupt"
-        })
-
-    users = load_users()
-    user_obj = users.get(user)
+        return archive_error_response()
 
     # Auth fail response
-    if not user_obj or api_key not in user_obj.get("api_keys", []):
+    if not authenticate_api_key(user, api_key):
         return JSONResponse(status_code=401, content={
             "status": "error",
             "message": "Authentication failed"
@@ -53,52 +62,68 @@ async def remote_push(
     user_repo_path = os.path.join(repo_root, user, repo)
     if not os.path.isdir(user_repo_path):
         # Repo not found response
-        for other_user in users:
-            if other_user == user:
-                continue
-            other_repo_path = os.path.join(repo_root, other_user, repo)
-            if os.path.isdir(other_repo_path):
-                return JSONResponse(status_code=403, content={
-                    "status": "error",
-                    "message": "Repository not found or access denied"
-                })
+        if repo_owned_by_other_user(user, repo):
+            return JSONResponse(status_code=403, content={
+                "status": "error",
+                "message": "Repository not found or access denied"
+            })
         return JSONResponse(status_code=404, content={
             "status": "error",
             "message": "Repository not found or access denied"
         })
 
     # Check if branch exists
-    heads_dir = os.path.join(user_repo_path, ".gitmini", "refs", "heads")
-    branch_path = os.path.join(heads_dir, branch)
-    if not os.path.isfile(branch_path):
+    refs = RefStore(os.path.join(user_repo_path, ".gitmini"))
+    if not refs.exists(branch):
         return JSONResponse(status_code=404, content={
             "status": "error",
             "message": "Remote branch not found."
         })
 
-    # Simulate fast-forward/non-fast-forward logic
-    # Read current remote branch commit
+    # Reject early, before receiving any objects, if the client's base is not in this repo's history.
+    # A stale but known base may still lead to a fast-forward: that is decided once the objects are in.
+    current_remote_commit = refs.read(branch)
+    store = get_object_store(os.path.join(user_repo_path, ".gitmini", "objects"))
+    if last_known_remote_commit is not None and last_known_remote_commit != current_remote_commit and not (
+            is_object_hash(last_known_remote_commit) and store.has(last_known_remote_commit)):
+        return non_fast_forward_response(branch, current_remote_commit)
+
+    # Stream the archive into the object store (off the event loop)
     try:
-        with open(branch_path, "r") as f:
-            current_remote_commit = f.read().strip()
-    except Exception:
-        current_remote_commit = None
+        ingested = await run_in_threadpool(ingest_archive, objects.file, store)
+    except ArchiveError:
+        return archive_error_response()
 
-    # If last_known_remote_commit is provided, check for fast-forward
-    if last_known_remote_commit is not None:
-        if last_known_remote_commit != current_remote_commit:
-            return JSONResponse(status_code=400, content={
-                "status": "error",
-                "message": "Non-fast-forward push rejected. Remote branch has diverged.",
-                "branch": branch,
-                "most_recent_remote_branch_commit": current_remote_commit
-            })
+    # Only move the branch once every object it needs is durable.
+    # Compare-and-swap under the ref lock, so a concurrent push to the same branch can't be lost.
+    if new_commit is None:
+        new_commit = current_remote_commit
+    elif not store.has(new_commit):
+        return archive_error_response()
+    else:
+        graph = get_commit_graph(os.path.join(user_repo_path, ".gitmini"))
+        try:
+            await run_in_threadpool(graph.update, ObjectReader(store), new_commit)
+        except ObjectNotFound:
+            # new_commit is not a commit
+            return archive_error_response()
+        # The tip must stay in the branch's history. A tip the server has no commit for
+        # can only be checked against what the client says it last saw.
+        if current_remote_commit and store.has(current_remote_commit):
+            fast_forward = graph.is_fast_forward(current_remote_commit, new_commit)
+        else:
+            fast_forward = last_known_remote_commit in (None, current_remote_commit)
+        if not fast_forward:
+            return non_fast_forward_response(branch, current_remote_commit)
+        try:
+            await run_in_threadpool(refs.compare_and_swap, branch, current_remote_commit, new_commit, user)
+        except RefUpdateRejected as e:
+            return non_fast_forward_response(branch, e.current)
+        await run_in_threadpool(write_manifest, refs.gitmini_dir, datetime.now(UTC), (ingested.written, ingested.bytes))
 
-    # Simulate branch update (not actually updating yet)
-    # Return success response
     return JSONResponse(status_code=200, content={
         "status": "ok",
         "message": "Push successful.",
         "branch": branch,
         "most_recent_remote_branch_commit": new_commit
-    })
+    }, background=BackgroundTask(store.consolidate_if_needed))
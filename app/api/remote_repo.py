@@ -2,15 +2,15 @@ from fastapi import APIRouter, Request, Form
 from fastapi.responses import RedirectResponse
 from app.utils import (
     get_current_user,
-    load_users,
-    save_users,
+    get_user,
     normalize_username,
-    add_repo_to_user,
+    add_user_repo,
     initialize_repo_structure,
     delete_repo_from_filesystem,
-    remove_repo_from_user,
+    remove_user_repo,
     is_repo_owner,
-    get_user_repo_entry
+    is_invalid_repo_name,
+    find_repo_entry
 )
 
 router = APIRouter()
@@ -24,13 +24,13 @@ async def create_remote_repo(request: Request, username: str, repo_name: str):
     if normalize_username(current_user) != normalize_username(username):
         return RedirectResponse("/?error=Unauthorized", status_code=302)
 
-    users = load_users()
-    error = add_repo_to_user(users, username, repo_name)
+    if is_invalid_repo_name(repo_name):
+        return RedirectResponse("/?error=Invalid repository name", status_code=302)
+
+    error = add_user_repo(username, repo_name)
     if error:
         return RedirectResponse(f"/?error={error}", status_code=302)
 
-    save_users(users)
-
     success = initialize_repo_structure(username, repo_name)
     if not success:
         return RedirectResponse(f"/?error=Repository already exists", status_code=302)
@@ -42,12 +42,15 @@ async def create_remote_repo(request: Request, username: str, repo_name: str):
 async def delete_remote_repo(request: Request, username: str, repo_name: str, confirm_name: str = Form(...)):
     current_user = get_current_user(request)
     username = normalize_username(username)
-    users = load_users()
 
     if not is_repo_owner(current_user, username):
         return RedirectResponse(f"/{username}/{repo_name}?error=unauthorized", status_code=302)
 
-    repo_entry = get_user_repo_entry(users, username, repo_name)
+    # Never joined into a path: the name must stay inside the user's directory
+    if is_invalid_repo_name(repo_name):
+        return RedirectResponse(f"/{username}?error=not_found", status_code=302)
+
+    repo_entry = find_repo_entry(get_user(username), repo_name)
     if not repo_entry:
         return RedirectResponse(f"/{username}/{repo_name}?error=not_found", status_code=302)
 
@@ -55,7 +58,6 @@ async def delete_remote_repo(request: Request, username: str, repo_name: str, co
         return RedirectResponse(f"/{username}/{repo_name}?error=confirmation_mismatch", status_code=302)
 
     delete_repo_from_filesystem(username, repo_name)
-    remove_repo_from_user(users, username, repo_name)
-    save_users(users)
+    remove_user_repo(username, repo_name)
 
     return RedirectResponse(f"/{username}", status_code=302)
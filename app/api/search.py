@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.utils import search as search_index, SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX, SEARCH_KINDS
+
+router = APIRouter()
+
+@router.get("/api/search")
+async def api_search(q: str = "", kind: str = "repos", page: int = 1, per_page: int = SEARCH_PAGE_SIZE):
+    if kind not in SEARCH_KINDS or page < 1 or per_page < 1:
+        return JSONResponse(status_code=400, content={
+            "status": "error",
+            "message": "Invalid search parameters"
+        })
+
+    per_page = min(per_page, SEARCH_PAGE_MAX)
+    results, total = search_index(kind, q, page, per_page)
+    return {
+        "status": "ok",
+        "query": q,
+        "kind": kind,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "results": results
+    }
@@ -0,0 +1,253 @@
+"""
+Downloads: raw blob files and tarballs of a commit.
+
+tar_stream() walks a commit's tree and emits a gzip-compressed tar chunk by
+chunk through TarGzWriter (also used by fetch). Member headers come from
+TarInfo, file bodies are copied straight from ObjectReader.stream(), so memory
+use stays at a few chunks however large the repo is, and nothing is assembled
+on disk before the first byte goes out.
+
+DownloadCache keeps what has been sent before, named by content:
+
+- blobs/<hash>                 the body of a blob, so raw downloads are plain
+                               file sends (sendfile, Range requests)
+- archives/<commit>/<name>     a finished tarball, written while the first
+                               download streams and published when it ends
+
+Everything in it is immutable, so entries are only ever evicted (least
+recently sent first) to stay under max_bytes, never invalidated.
+"""
+import os, time, uuid, zlib, tarfile, threading
+from app.gitmini.reader import CHUNK_SIZE, ObjectNotFound
+from app.storage.json_store import fsync_dir
+
+DOWNLOAD_CACHE_BYTES = int(os.getenv("GITMINIHUB_DOWNLOAD_CACHE_MB", "512")) * 1024 * 1024
+# Re-measure the cache at least this often, to account for files other workers added
+DOWNLOAD_CACHE_RESCAN = 300
+TAR_BLOCK = 512
+
+
+class TarGzWriter:
+    """
+    Incremental .tar.gz encoder. Every call returns (or yields) the compressed
+    bytes that are ready to send, so callers can stream an archive without
+    holding more than one chunk of it.
+    """
+
+    def __init__(self):
+        self._gzip = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def _compress(self, data: bytes) -> bytes:
+        return self._gzip.compress(data)
+
+    def _header(self, name: str, kind: bytes, size: int, mode: int, mtime: int) -> bytes:
+        info = tarfile.TarInfo(name)
+        info.type = kind
+        info.size = size
+        info.mode = mode
+        info.mtime = mtime
+        # PAX headers carry paths longer than ustar allows
+        return self._compress(info.tobuf(format=tarfile.PAX_FORMAT))
+
+    def directory(self, name: str, mtime: int = 0) -> bytes:
+        return self._header(name, tarfile.DIRTYPE, 0, 0o755, mtime)
+
+    def file(self, name: str, size: int, chunks, mode: int = 0o644, mtime: int = 0):
+        """Member of exactly size bytes, read from chunks."""
+        yield self._header(name, tarfile.REGTYPE, size, mode, mtime)
+        written = 0
+        for chunk in chunks:
+            written += len(chunk)
+            yield self._compress(chunk)
+        if written != size:
+            raise ObjectNotFound(f"{name} is truncated")
+        yield self._compress(b"\0" * (-size % TAR_BLOCK))
+
+    def close(self) -> bytes:
+        # End-of-archive marker: two empty blocks
+        return self._compress(b"\0" * (2 * TAR_BLOCK)) + self._gzip.flush()
+
+
+def _file_mode(mode: str) -> int:
+    return 0o755 if int(mode, 8) & 0o111 else 0o644
+
+
+def is_safe_entry_name(name: str) -> bool:
+    """Whether a tree entry name is a single path component (pushed trees are not trusted)."""
+    return bool(name) and name not in (".", "..") and "/" not in name and "\\" not in name and "\0" not in name
+
+
+def walk_tree(reader, tree_hash: str, prefix: str):
+    """
+    (path, entry) for every entry under a tree, parents before children.
+    Entries whose name could escape prefix/ when extracted are skipped.
+    """
+    stack = [(tree_hash, prefix)]
+    while stack:
+        obj_hash, path = stack.pop()
+        subtrees = []
+        for entry in reader.tree(obj_hash):
+            if not is_safe_entry_name(entry["name"]):
+                continue
+            entry_path = f"{path}/{entry['name']}"
+            yield entry_path, entry
+            if entry["type"] == "tree":
+                subtrees.append((entry["hash"], entry_path))
+        stack.extend(reversed(subtrees))
+
+
+def tar_stream(reader, commit_hash: str, prefix: str, chunk_size: int = CHUNK_SIZE):
+    """gzip-compressed tar of a commit's tree under prefix/, as a stream of chunks."""
+    # The compressor holds back small writes; don't send the empty results
+    return (chunk for chunk in _tar_chunks(reader, commit_hash, prefix, chunk_size) if chunk)
+
+
+def _tar_chunks(reader, commit_hash: str, prefix: str, chunk_size: int):
+    commit = reader.commit(commit_hash)
+    mtime = commit["timestamp"] or 0
+    tar = TarGzWriter()
+    yield tar.directory(prefix, mtime)
+    for path, entry in walk_tree(reader, commit["tree"], prefix):
+        if entry["type"] == "tree":
+            yield tar.directory(path, mtime)
+            continue
+        _, size = reader.info(entry["hash"])
+        yield from tar.file(path, size, reader.stream(entry["hash"], chunk_size), _file_mode(entry["mode"]), mtime)
+    yield tar.close()
+
+
+class DownloadCache:
+    def __init__(self, root: str, max_bytes: int = DOWNLOAD_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._prune_lock = threading.Lock()
+        # Bytes in the cache as of the last scan plus what this process published since (None: not scanned yet)
+        self._total: int | None = None
+        self._scanned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def blob_path(self, obj_hash: str) -> str:
+        return os.path.join(self.root, "blobs", obj_hash[:2], obj_hash[2:])
+
+    def archive_path(self, commit_hash: str, name: str) -> str:
+        return os.path.join(self.root, "archives", commit_hash, name)
+
+    def get(self, path: str) -> str | None:
+        """path if it is cached. Marks it as recently sent (atime only: mtime backs the ETag)."""
+        try:
+            st = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def _temp_path(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{uuid.uuid4().hex}.tmp"
+
+    def _publish(self, fileobj, tmp_path: str, path: str):
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+        fileobj.close()
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        fsync_dir(os.path.dirname(path))
+        with self._prune_lock:
+            if self._total is not None:
+                self._total += size
+            due = (self._total is None or self._total > self.max_bytes
+                   or time.monotonic() - self._scanned_at > DOWNLOAD_CACHE_RESCAN)
+        # Only walk the cache when it may be over the limit
+        if due:
+            self.prune()
+
+    def blob(self, reader, obj_hash: str) -> str:
+        """Path of the blob's body, extracting it into the cache first if needed."""
+        path = self.blob_path(obj_hash)
+        if self.get(path) is not None:
+            return path
+        tmp_path = self._temp_path(path)
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in reader.stream(obj_hash):
+                    f.write(chunk)
+                self._publish(f, tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def tee(self, chunks, path: str):
+        """
+        Pass chunks through while writing them to path. The file is only
+        published once the stream ends; an abandoned download leaves nothing.
+        """
+        tmp_path = self._temp_path(path)
+        f = open(tmp_path, "wb")
+        try:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+            self._publish(f, tmp_path, path)
+        finally:
+            f.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prune(self):
+        """Scan the cache and evict least recently sent files until it fits in max_bytes."""
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            files, total = [], 0
+            for dirpath, _, names in os.walk(self.root):
+                for name in names:
+                    if name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((st.st_atime_ns, st.st_size, path))
+                    total += st.st_size
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._total = total
+            self._scanned_at = time.monotonic()
+        finally:
+            self._prune_lock.release()
+
+
+_caches: dict[str, DownloadCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_download_cache(root: str) -> DownloadCache:
+    """One DownloadCache per directory, shared across requests."""
+    root = os.path.abspath(root)
+    with _caches_lock:
+        cache = _caches.get(root)
+        if cache is None:
+            cache = _caches[root] = DownloadCache(root)
+        return cache
+
+
+def download_metrics() -> dict:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {
+        "hits": sum(c.hits for c in caches),
+        "misses": sum(c.misses for c in caches),
+        "max_bytes": DOWNLOAD_CACHE_BYTES
+    }
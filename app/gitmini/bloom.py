@@ -0,0 +1,39 @@
+"""
+Bloom filter over object hashes.
+
+Object names are already uniformly distributed SHA-1 digests, so the bit
+positions are derived from the digest itself (double hashing on two 64-bit
+slices) instead of re-hashing every key.
+"""
+import math
+
+BITS_PER_OBJECT = 10  # ~1% false positives with the matching number of probes
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, bits_per_object: int = BITS_PER_OBJECT):
+        self.capacity = max(1, capacity)
+        self.size = self.capacity * bits_per_object
+        self.probes = max(1, round(bits_per_object * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, obj_hash: str):
+        digest = bytes.fromhex(obj_hash)
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.probes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, obj_hash: str):
+        for pos in self._positions(obj_hash):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, obj_hash: str) -> bool:
+        """False means definitely absent; True means probably present."""
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(obj_hash))
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
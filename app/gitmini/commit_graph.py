@@ -0,0 +1,254 @@
+"""
+Per-repo commit graph: .gitmini/commit-graph.
+
+One line per commit, appended parents first:
+
+    <commit> <generation> <timestamp> [<parent> ...]
+
+The generation is 1 for a root and 1 + the largest parent generation
+otherwise, so a commit can only reach commits of a lower generation. That
+bound is what lets ancestry and merge-base queries stop early instead of
+walking the whole history. Parents the server never received are left out
+(the commit counts as a root), the same way ObjectReader stops at them.
+
+The file is append-only. Each process keeps the parsed graph in memory and
+only reads lines appended since its last look. A torn last line (a crash
+mid-append) is ignored and dropped by the next writer. Writers hold
+.gitmini/locks/commit-graph.lock, shared across worker processes.
+"""
+import os, heapq, threading
+from app.storage.json_store import file_lock
+from app.gitmini.reader import LRUCache
+from app.gitmini.objects import OPEN_REPO_ENTRIES
+
+
+class CommitGraph:
+    def __init__(self, gitmini_dir: str):
+        self.path = os.path.join(gitmini_dir, "commit-graph")
+        self.lock_path = os.path.join(gitmini_dir, "locks", "commit-graph.lock")
+        # commit -> (generation, timestamp, parents)
+        self._nodes: dict[str, tuple[int, int, tuple]] = {}
+        self._loaded = 0
+        self._inode = None
+        self._mutex = threading.Lock()
+
+    def __contains__(self, commit: str) -> bool:
+        self.refresh()
+        return commit in self._nodes
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._nodes)
+
+    def generation(self, commit: str) -> int | None:
+        self.refresh()
+        return self._generation(commit)
+
+    def _generation(self, commit: str) -> int | None:
+        node = self._nodes.get(commit)
+        return node[0] if node else None
+
+    def _parents(self, commit: str) -> tuple:
+        node = self._nodes.get(commit)
+        return node[2] if node else ()
+
+    # -- loading and updating ---------------------------------------------------
+
+    def refresh(self):
+        """Read lines appended since the last call (or everything, if the file was replaced)."""
+        with self._mutex:
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._nodes, self._loaded, self._inode = {}, 0, None
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._inode or st.st_size < self._loaded:
+                self._nodes, self._loaded, self._inode = {}, 0, st.st_ino
+            if st.st_size == self._loaded:
+                return
+            f.seek(self._loaded)
+            data = f.read(st.st_size - self._loaded)
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.decode().splitlines():
+            commit, generation, timestamp, *parents = line.split(" ")
+            self._nodes[commit] = (int(generation), int(timestamp), tuple(parents))
+        self._loaded += len(complete)
+
+    def update(self, reader, tip: str) -> int:
+        """
+        Add tip and every ancestor not yet in the graph, reading commit
+        objects through reader. Returns the number of commits added.
+        """
+        self.refresh()
+        if tip in self._nodes:
+            return 0
+        with file_lock(self.lock_path), self._mutex:
+            self._refresh()
+            new = self._walk_new(reader, tip)
+            if not new:
+                return 0
+            lines = "".join(f"{c} {g} {t} {' '.join(p)}".rstrip(" ") + "\n" for c, (g, t, p) in new)
+            with open(self.path, "ab") as f:
+                # Drop a torn line left by a crashed writer
+                f.truncate(self._loaded)
+                f.write(lines.encode())
+                f.flush()
+                os.fsync(f.fileno())
+                self._inode = os.fstat(f.fileno()).st_ino
+            self._nodes.update(new)
+            self._loaded += len(lines.encode())
+            return len(new)
+
+    def _walk_new(self, reader, tip: str) -> list:
+        """(commit, node) for commits reachable from tip and missing from the graph, parents first."""
+        added: dict[str, tuple] = {}
+        stack = [(tip, False)]
+        while stack:
+            commit, expanded = stack.pop()
+            if commit in self._nodes or (commit in added and not expanded):
+                continue
+            if not expanded:
+                added[commit] = None
+                stack.append((commit, True))
+                for parent in reader.commit(commit)["parents"]:
+                    if parent not in self._nodes and parent not in added and reader.store.has(parent):
+                        stack.append((parent, False))
+                continue
+            info = reader.commit(commit)
+            parents = tuple(p for p in info["parents"] if p in self._nodes or added.get(p) is not None)
+            generation = 1 + max((self._node(p, added)[0] for p in parents), default=0)
+            added[commit] = (generation, info["timestamp"] or 0, parents)
+        return list(added.items())
+
+    def _node(self, commit: str, added: dict):
+        return self._nodes.get(commit) or added[commit]
+
+    # -- queries ----------------------------------------------------------------
+
+    def is_ancestor(self, ancestor: str, commit: str) -> bool:
+        """Whether ancestor is reachable from commit (a commit is its own ancestor)."""
+        self.refresh()
+        target = self._generation(ancestor)
+        if target is None or commit not in self._nodes:
+            return False
+        seen, stack = {commit}, [commit]
+        while stack:
+            current = stack.pop()
+            if current == ancestor:
+                return True
+            for parent in self._parents(current):
+                # Nothing below the ancestor's generation can lead back up to it
+                if parent not in seen and self._generation(parent) >= target:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def is_fast_forward(self, old: str | None, new: str) -> bool:
+        """Whether moving a branch from old to new keeps every commit it had."""
+        return not old or self.is_ancestor(old, new)
+
+    def merge_base(self, a: str, b: str) -> str | None:
+        """
+        A common ancestor of a and b with the highest generation, or None.
+        Commits are visited in decreasing generation order, so a commit is
+        only examined once every commit above it has marked it.
+        """
+        self.refresh()
+        if a not in self._nodes or b not in self._nodes:
+            return None
+        # Bit 1: reachable from a, bit 2: reachable from b
+        flags = {a: 1}
+        flags[b] = flags.get(b, 0) | 2
+        heap = [(-self._generation(c), c) for c in flags]
+        heapq.heapify(heap)
+        while heap:
+            _, commit = heapq.heappop(heap)
+            if flags[commit] == 3:
+                return commit
+            for parent in self._parents(commit):
+                if parent not in flags:
+                    flags[parent] = flags[commit]
+                    heapq.heappush(heap, (-self._generation(parent), parent))
+                else:
+                    flags[parent] |= flags[commit]
+        return None
+
+    def missing(self, tip: str, haves) -> tuple[list[str], list[str]]:
+        """
+        Commits reachable from tip but from none of haves, parents first, and
+        the haves' ancestors directly under them. Commits are visited in
+        decreasing generation order, and the walk ends as soon as everything
+        left to visit is reachable from a have.
+        """
+        self.refresh()
+        if tip not in self._nodes:
+            return [], []
+        # True: reachable from a have
+        flags = {h: True for h in haves if h in self._nodes}
+        flags.setdefault(tip, False)
+        heap = [(-self._generation(c), c) for c in flags]
+        heapq.heapify(heap)
+        interesting = 0 if flags[tip] else 1
+        missing = []
+        while interesting:
+            _, commit = heapq.heappop(heap)
+            known = flags[commit]
+            if not known:
+                interesting -= 1
+                missing.append(commit)
+            for parent in self._parents(commit):
+                if parent not in flags:
+                    flags[parent] = known
+                    interesting += not known
+                    heapq.heappush(heap, (-self._generation(parent), parent))
+                elif known and not flags[parent]:
+                    flags[parent] = True
+                    interesting -= 1
+        # Generations strictly decrease towards the roots
+        missing.reverse()
+        boundary = {p for c in missing for p in self._parents(c) if flags[p]}
+        return missing, sorted(boundary)
+
+    def walk(self, start: str):
+        """Commits reachable from start, newest (by author timestamp) first."""
+        self.refresh()
+        if start not in self._nodes:
+            return
+        seen = {start}
+        heap = [self._order(start)]
+        while heap:
+            _, _, commit = heapq.heappop(heap)
+            yield commit
+            for parent in self._parents(commit):
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(heap, self._order(parent))
+
+    def _order(self, commit: str) -> tuple:
+        generation, timestamp, _ = self._nodes[commit]
+        return (-timestamp, -generation, commit)
+
+
+_graphs = LRUCache(OPEN_REPO_ENTRIES)
+_graphs_lock = threading.Lock()
+
+
+def get_commit_graph(gitmini_dir: str) -> CommitGraph:
+    """One CommitGraph per recently used repo, shared across requests."""
+    gitmini_dir = os.path.abspath(gitmini_dir)
+    with _graphs_lock:
+        graph = _graphs.get(gitmini_dir)
+        if graph is None:
+            graph = CommitGraph(gitmini_dir)
+            _graphs.put(gitmini_dir, graph)
+        return graph
+
+
+def forget_commit_graph(gitmini_dir: str):
+    """Drop the parsed graph of a repo that is going away."""
+    _graphs.pop(os.path.abspath(gitmini_dir))
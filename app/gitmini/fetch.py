@@ -0,0 +1,171 @@
+"""
+Object walk for fetch/clone.
+
+The server sends every object reachable from the branch tip but not from the
+commits the client says it has. The commits to send are found in the commit
+graph (no commit object is read): the walk goes down by generation and stops
+as soon as everything left is an ancestor of a have, so an incremental fetch
+looks at the new commits, not the whole history. Each commit is then sent
+together with the trees and blobs it introduces, reading objects only as the
+stream is consumed. The trees of the client's commits right under the new
+ones are marked as known up front, so unchanged files are not resent.
+
+Sending oldest first means any prefix of the stream is a complete history.
+When a response reaches its object budget, the walk stops at a commit
+boundary and the closing fetch.json member tells the client where to resume.
+Objects are copied into the archive in chunks, so memory use is the set of
+hashes walked, never the objects themselves.
+"""
+import os, json, threading
+from app.gitmini.archive import TarGzWriter
+from app.gitmini.reader import CHUNK_SIZE, ObjectNotFound
+
+# Objects per response; bigger fetches continue over several requests
+FETCH_BATCH_OBJECTS = int(os.getenv("GITMINIHUB_FETCH_BATCH_OBJECTS", "50000"))
+MAX_FETCH_HAVES = 256
+MANIFEST_NAME = "fetch.json"
+
+
+class FetchMetrics:
+    """Totals reported by /api/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.partial = 0
+        self.objects_sent = 0
+        self.bytes_sent = 0
+
+    def record(self, objects: int, sent: int, complete: bool):
+        with self._lock:
+            self.fetches += 1
+            self.partial += not complete
+            self.objects_sent += objects
+            self.bytes_sent += sent
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "fetches": self.fetches,
+                "partial": self.partial,
+                "objects_sent": self.objects_sent,
+                "bytes_sent": self.bytes_sent
+            }
+
+
+fetch_metrics = FetchMetrics()
+
+
+def known_commits(reader, hashes) -> set:
+    """The hashes that name a commit in the store. Anything else can't bound the walk."""
+    commits = set()
+    for obj_hash in hashes:
+        try:
+            if reader.info(obj_hash)[0] == "commit":
+                commits.add(obj_hash)
+        except ObjectNotFound:
+            continue
+    return commits
+
+
+def commits_to_send(reader, graph, tip: str, have: set) -> tuple[list[str], list[str]]:
+    """
+    Commits reachable from tip but not from have, parents before children,
+    and the have commits directly under them. Parents missing from the store
+    end the walk quietly, as they are left out of the commit graph.
+    """
+    graph.update(reader, tip)
+    for commit_hash in have:
+        # Only walks commits the graph doesn't have yet (e.g. repos pushed before it existed)
+        graph.update(reader, commit_hash)
+    return graph.missing(tip, have)
+
+
+def mark_tree_known(reader, tree_hash: str, known: set):
+    """Add a tree and everything under it to known."""
+    stack = [tree_hash]
+    while stack:
+        obj_hash = stack.pop()
+        if obj_hash in known:
+            continue
+        known.add(obj_hash)
+        for entry in reader.tree(obj_hash):
+            if entry["type"] == "tree":
+                stack.append(entry["hash"])
+            else:
+                known.add(entry["hash"])
+
+
+def commit_objects(reader, commit_hash: str, known: set):
+    """The commit, then the trees and blobs it introduces. Everything yielded is added to known."""
+    known.add(commit_hash)
+    yield commit_hash
+    stack = [reader.commit(commit_hash)["tree"]]
+    while stack:
+        obj_hash = stack.pop()
+        if obj_hash in known:
+            continue
+        known.add(obj_hash)
+        yield obj_hash
+        for entry in reader.tree(obj_hash):
+            if entry["type"] == "tree":
+                stack.append(entry["hash"])
+            elif entry["hash"] not in known:
+                known.add(entry["hash"])
+                yield entry["hash"]
+
+
+def raw_chunks(store, obj_hash: str):
+    stream = store.open(obj_hash)
+    if stream is None:
+        raise ObjectNotFound(obj_hash)
+    with stream:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def fetch_stream(reader, graph, branch: str, tip: str, have: set, max_objects: int = FETCH_BATCH_OBJECTS):
+    """
+    .tar.gz of the objects the client is missing, as a stream of chunks.
+    Members are "objects/<hash>" holding the raw object (the push format),
+    followed by fetch.json: {branch, commit, last_commit, complete, objects}.
+    """
+    tar = TarGzWriter()
+    objects, sent, last_commit = 0, 0, None
+    try:
+        commits, boundary = commits_to_send(reader, graph, tip, have)
+        known = set(boundary)
+        for commit_hash in boundary:
+            mark_tree_known(reader, reader.commit(commit_hash)["tree"], known)
+
+        for commit_hash in commits:
+            # Stop between commits, so what was sent is always a complete history
+            if objects >= max_objects:
+                break
+            for obj_hash in commit_objects(reader, commit_hash, known):
+                obj_type, size = reader.info(obj_hash)
+                raw_size = len(f"{obj_type} {size}\0".encode()) + size
+                for chunk in tar.file(f"objects/{obj_hash}", raw_size, raw_chunks(reader.store, obj_hash)):
+                    if chunk:
+                        sent += len(chunk)
+                        yield chunk
+                objects += 1
+            last_commit = commit_hash
+
+        manifest = json.dumps({
+            "branch": branch,
+            "commit": tip,
+            "last_commit": last_commit,
+            "complete": last_commit == tip,
+            "objects": objects
+        }).encode()
+        for chunk in (*tar.file(MANIFEST_NAME, len(manifest), [manifest]), tar.close()):
+            if chunk:
+                sent += len(chunk)
+                yield chunk
+    finally:
+        # Also reached when the client goes away mid-stream
+        fetch_metrics.record(objects, sent, last_commit == tip)
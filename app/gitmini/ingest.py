@@ -0,0 +1,145 @@
+"""
+Streaming ingestion of pushed object archives.
+
+The .tar.gz is decompressed member by member ("r|gz" stream mode) and each
+object is copied in fixed-size chunks into a temp file while its SHA-1 is
+computed, so memory use does not depend on the archive or object size.
+"""
+import os, time, gzip, tarfile, zlib, hashlib, threading
+from app.gitmini.objects import ObjectStore, is_object_hash
+from app.storage.json_store import fsync_dir
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ArchiveError(Exception):
+    """The uploaded archive is unreadable or contains an invalid object."""
+
+
+class IngestStats:
+    def __init__(self):
+        self.received = 0
+        self.written = 0
+        self.deduplicated = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def objects_per_sec(self) -> float:
+        return self.received / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / (1024 * 1024) / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "objects_received": self.received,
+            "objects_written": self.written,
+            "objects_deduplicated": self.deduplicated,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 6),
+            "objects_per_sec": round(self.objects_per_sec, 2),
+            "mb_per_sec": round(self.mb_per_sec, 3),
+        }
+
+
+class IngestMetrics:
+    """Totals across pushes in this process, reported by /api/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pushes = 0
+        self.totals = IngestStats()
+        self.last: dict | None = None
+
+    def record(self, stats: IngestStats):
+        with self._lock:
+            self.pushes += 1
+            self.totals.received += stats.received
+            self.totals.written += stats.written
+            self.totals.deduplicated += stats.deduplicated
+            self.totals.bytes += stats.bytes
+            self.totals.seconds += stats.seconds
+            self.last = stats.as_dict()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"pushes": self.pushes, "totals": self.totals.as_dict(), "last_push": self.last}
+
+
+ingest_metrics = IngestMetrics()
+
+
+def member_object_hash(name: str) -> str | None:
+    """Object hash for an archive member named "<hash>", "objects/<hash>" or "<2>/<38>"."""
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts:
+        return None
+    if len(parts) >= 2 and len(parts[-2]) == 2 and len(parts[-1]) == 38:
+        candidate = parts[-2] + parts[-1]
+    else:
+        candidate = parts[-1]
+    return candidate if is_object_hash(candidate) else None
+
+
+def _store_member(stream, obj_hash: str, store: ObjectStore, stats: IngestStats):
+    """Copy one member into the store, verifying its hash before publishing it."""
+    tmp_path = store.temp_path()
+    digest = hashlib.sha1()
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                stats.bytes += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        if digest.hexdigest() != obj_hash:
+            raise ArchiveError(f"Object {obj_hash} does not match its content hash")
+        store.publish(tmp_path, obj_hash)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def ingest_archive(fileobj, store: ObjectStore) -> IngestStats:
+    """
+    Stream a .tar.gz of objects into the store.
+    Objects already present are skipped. Raises ArchiveError on any bad input.
+    """
+    stats = IngestStats()
+    started = time.perf_counter()
+    written_dirs = set()
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|gz") as archive:
+            for member in archive:
+                if member.isdir():
+                    continue
+                if not member.isfile():
+                    raise ArchiveError(f"Unexpected archive member: {member.name}")
+                obj_hash = member_object_hash(member.name)
+                if obj_hash is None:
+                    raise ArchiveError(f"Archive member is not an object: {member.name}")
+
+                stats.received += 1
+                if store.has(obj_hash):
+                    # Content-addressed: same name means same bytes
+                    stats.deduplicated += 1
+                    continue
+                _store_member(archive.extractfile(member), obj_hash, store, stats)
+                written_dirs.add(os.path.dirname(store.loose_path(obj_hash)))
+                stats.written += 1
+    except (tarfile.TarError, gzip.BadGzipFile, EOFError, zlib.error) as e:
+        raise ArchiveError(str(e)) from e
+
+    # Make the renames durable before any ref points at these objects
+    for directory in written_dirs:
+        fsync_dir(directory)
+    stats.seconds = time.perf_counter() - started
+    ingest_metrics.record(stats)
+    return stats
+
@@ -0,0 +1,134 @@
+"""
+Per-repo summary: .gitmini/manifest.json.
+
+    {"refs": {branch: commit}, "objects": n, "size": bytes on disk,
+     "last_pushed_at": ISO time or null, "refs_signature": [mtime_ns, inode]}
+
+Listings read this one file instead of walking refs/heads and objects/.
+Pushes rewrite it (temp file, fsync, rename) after moving a ref, under
+.gitmini/locks/manifest.lock. It also records the state of refs/heads it was
+built from, so a manifest that is missing or older than the refs (a crash
+between the ref update and the rewrite, or a ref written by other means) is
+rebuilt on the next read.
+
+Object count and size come from a full scan of objects/ only when the
+manifest is built from scratch. A push adds what it wrote (objects, bytes) to
+the previous figures, so its cost doesn't grow with the repo. Between rebuilds
+they can drift slightly: objects from a rejected push aren't added, and the
+size doesn't follow pack consolidation.
+
+Parsed manifests are cached per process and reused while the file's
+mtime/inode/size are unchanged, so a read is one open and one fstat.
+"""
+import os, json, uuid, threading
+from datetime import datetime, UTC
+from app.storage.json_store import fsync_dir, file_lock
+from app.gitmini.objects import get_object_store
+from app.gitmini.refs import RefStore
+
+MANIFEST_NAME = "manifest.json"
+
+_cache: dict[str, tuple[tuple, dict]] = {}
+_cache_lock = threading.Lock()
+
+
+def manifest_path(gitmini_dir: str) -> str:
+    return os.path.join(gitmini_dir, MANIFEST_NAME)
+
+
+def refs_signature(gitmini_dir: str) -> list | None:
+    """Changes whenever a branch is created, moved or deleted (refs are replaced atomically)."""
+    try:
+        st = os.stat(os.path.join(gitmini_dir, "refs", "heads"))
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return [st.st_mtime_ns, st.st_ino]
+
+
+def _load(path: str) -> dict | None:
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        st = os.fstat(f.fileno())
+        key = (st.st_mtime_ns, st.st_ino, st.st_size)
+        with _cache_lock:
+            cached = _cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            manifest = json.load(f)
+        except ValueError:
+            return None
+    with _cache_lock:
+        _cache[path] = (key, manifest)
+    return manifest
+
+
+def _last_push(refs: RefStore, branches) -> str | None:
+    """Latest ref update in the reflogs, for a manifest built from scratch."""
+    times = [entry["timestamp"] for branch in branches for entry in refs.reflog(branch)]
+    return datetime.fromtimestamp(max(times), UTC).isoformat() if times else None
+
+
+def write_manifest(gitmini_dir: str, pushed_at: datetime | None = None, added: tuple[int, int] | None = None) -> dict:
+    """
+    Rebuild the manifest from refs and replace it atomically. Returns it.
+    added is (objects, bytes) a push wrote; without it (or a previous
+    manifest) the object store is scanned.
+    """
+    path = manifest_path(gitmini_dir)
+    with file_lock(os.path.join(gitmini_dir, "locks", "manifest.lock")):
+        previous = _load(path)
+        refs = RefStore(gitmini_dir)
+        # Taken before the refs are read: a concurrent update leaves the manifest stale, never wrong
+        signature = refs_signature(gitmini_dir)
+        branches = refs.branches()
+        if added is not None and previous is not None:
+            objects, size = previous["objects"] + added[0], previous["size"] + added[1]
+        else:
+            objects, size = get_object_store(os.path.join(gitmini_dir, "objects")).stats()
+        if pushed_at is not None:
+            last_pushed_at = pushed_at.isoformat()
+        elif previous is not None:
+            last_pushed_at = previous.get("last_pushed_at")
+        else:
+            last_pushed_at = _last_push(refs, branches)
+        manifest = {
+            "refs": branches,
+            "objects": objects,
+            "size": size,
+            "last_pushed_at": last_pushed_at,
+            "refs_signature": signature
+        }
+
+        tmp_path = os.path.join(gitmini_dir, f".{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+                st = os.fstat(f.fileno())
+            os.replace(tmp_path, path)
+            # The rename keeps the inode and mtime, so the next read hits the cache
+            with _cache_lock:
+                _cache[path] = ((st.st_mtime_ns, st.st_ino, st.st_size), manifest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        fsync_dir(gitmini_dir)
+    return manifest
+
+
+def read_manifest(gitmini_dir: str) -> dict | None:
+    """
+    The repo's manifest, rebuilt first if it is missing or behind the refs,
+    or None if the repo has no .gitmini directory. Treat it as read-only.
+    """
+    if not os.path.isdir(gitmini_dir):
+        return None
+    manifest = _load(manifest_path(gitmini_dir))
+    if manifest is None or manifest.get("refs_signature") != refs_signature(gitmini_dir):
+        manifest = write_manifest(gitmini_dir)
+    return manifest
@@ -0,0 +1,465 @@
+"""
+GitMini object store.
+
+Objects are stored the way the CLI writes them: the raw bytes
+"<type> <size>\\0<body>", named by the SHA-1 of those bytes.
+
+Loose objects live in two-level fan-out directories (objects/ab/cdef...),
+so no single directory grows past a few thousand entries. They can be
+consolidated into packfiles under objects/pack/:
+
+    pack-<id>.pack  b"GMPK" + version + count, then zlib-compressed objects
+    pack-<id>.idx   b"GMIX" + version + count, a 256-entry fan-out table,
+                    then (sha1, offset, length) records sorted by sha1
+
+Lookups in a pack are a fan-out jump plus a binary search over the mmap'd
+index, so existence checks stay O(log n) with millions of objects. Every
+consolidation adds a pack, and a miss has to search them all, so once there
+would be more than PACK_LIMIT the existing packs are merged into the new one
+(compressed objects are copied as they are). Readers that still hold a merged
+pack retry with the current ones.
+
+Batch existence checks (push negotiation) go through an in-memory bloom
+filter first, so objects the server has never seen cost no disk access.
+"""
+import os, re, sys, mmap, time, uuid, zlib, struct, hashlib, threading
+from app.gitmini.bloom import BloomFilter
+from app.gitmini.reader import LRUCache
+from app.storage.json_store import fsync_dir, file_lock
+
+OBJECT_HASH_RE = re.compile(r"[0-9a-f]{40}")
+
+PACK_MAGIC = b"GMPK"
+INDEX_MAGIC = b"GMIX"
+PACK_VERSION = 1
+HEADER = struct.Struct(">4sII")       # magic, version, object count
+FANOUT = struct.Struct(">256I")
+INDEX_RECORD = struct.Struct(">20sQI")  # sha1, offset in pack, compressed length
+
+# Consolidate once roughly this many loose objects have piled up (estimated from one fan-out dir)
+LOOSE_OBJECT_LIMIT = 6700
+# Merge all packs into one when a consolidation would leave more than this many
+PACK_LIMIT = 8
+# Repos whose store (open packs, bloom filter) or commit graph a worker keeps in memory
+OPEN_REPO_ENTRIES = int(os.getenv("GITMINIHUB_OPEN_REPOS", "256"))
+# Rebuild the bloom filter this often, to pick up objects written by other worker processes
+BLOOM_MAX_AGE = 60
+
+
+def is_object_hash(value: str) -> bool:
+    return bool(value) and OBJECT_HASH_RE.fullmatch(value) is not None
+
+
+def encode_object(obj_type: str, body: bytes) -> bytes:
+    """Serialize an object. Its name is hashlib.sha1(result).hexdigest()."""
+    return f"{obj_type} {len(body)}".encode() + b"\0" + body
+
+
+def hash_object(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class Pack:
+    """A read-only packfile and its mmap'd index."""
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self.pack_path = index_path[:-len(".idx")] + ".pack"
+        with open(index_path, "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"Not a GitMini pack index: {index_path}")
+        self._fanout = FANOUT.unpack_from(self._index, HEADER.size)
+        self._records_start = HEADER.size + FANOUT.size
+
+    def _sha_at(self, i: int) -> bytes:
+        start = self._records_start + i * INDEX_RECORD.size
+        return self._index[start:start + 20]
+
+    def find(self, obj_hash: str) -> tuple[int, int] | None:
+        """(offset, length) of an object in the pack, or None."""
+        sha = bytes.fromhex(obj_hash)
+        lo = self._fanout[sha[0] - 1] if sha[0] else 0
+        hi = self._fanout[sha[0]]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_sha = self._sha_at(mid)
+            if mid_sha < sha:
+                lo = mid + 1
+            elif mid_sha > sha:
+                hi = mid
+            else:
+                _, offset, length = INDEX_RECORD.unpack_from(self._index, self._records_start + mid * INDEX_RECORD.size)
+                return offset, length
+        return None
+
+    def read(self, obj_hash: str) -> bytes | None:
+        location = self.find(obj_hash)
+        if location is None:
+            return None
+        offset, length = location
+        try:
+            with open(self.pack_path, "rb") as f:
+                f.seek(offset)
+                return zlib.decompress(f.read(length))
+        except FileNotFoundError:
+            # Merged into another pack meanwhile
+            return None
+
+    def hashes(self):
+        for i in range(self.count):
+            yield self._sha_at(i).hex()
+
+    def records(self):
+        """(sha1 bytes, offset, compressed length) in sha1 order."""
+        for i in range(self.count):
+            yield INDEX_RECORD.unpack_from(self._index, self._records_start + i * INDEX_RECORD.size)
+
+    def open(self, obj_hash: str):
+        """Stream that decompresses one object on the fly, or None."""
+        location = self.find(obj_hash)
+        if location is None:
+            return None
+        try:
+            return PackedObjectStream(self.pack_path, *location)
+        except FileNotFoundError:
+            return None
+
+
+class PackedObjectStream:
+    """Read-only file-like view of one zlib-compressed object in a pack."""
+
+    def __init__(self, pack_path: str, offset: int, length: int):
+        self._file = open(pack_path, "rb")
+        self._file.seek(offset)
+        self._remaining = length
+        self._inflate = zlib.decompressobj()
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self._buffer) < size) and not self._inflate.eof:
+            chunk = self._file.read(min(self._remaining, 64 * 1024)) if self._remaining else b""
+            self._remaining -= len(chunk)
+            self._buffer += self._inflate.decompress(chunk) if chunk else self._inflate.flush()
+            if not chunk:
+                break
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ObjectStore:
+    def __init__(self, objects_dir: str):
+        self.objects_dir = objects_dir
+        self.pack_dir = os.path.join(objects_dir, "pack")
+        self._packs: list[Pack] = []
+        self._packs_signature = None
+        self._packs_lock = threading.Lock()
+        self._bloom: BloomFilter | None = None
+        self._bloom_built_at = 0.0
+        self._bloom_packs = None
+        self._bloom_lock = threading.Lock()
+
+    # -- loose objects -------------------------------------------------------
+
+    def loose_path(self, obj_hash: str) -> str:
+        return os.path.join(self.objects_dir, obj_hash[:2], obj_hash[2:])
+
+    def legacy_path(self, obj_hash: str) -> str:
+        """Flat layout used before fan-out directories."""
+        return os.path.join(self.objects_dir, obj_hash)
+
+    def temp_path(self) -> str:
+        os.makedirs(self.objects_dir, exist_ok=True)
+        return os.path.join(self.objects_dir, f".tmp-{uuid.uuid4().hex}")
+
+    def publish(self, tmp_path: str, obj_hash: str):
+        """Move a fully written, verified temp file into place as a loose object."""
+        final_path = self.loose_path(obj_hash)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(obj_hash)
+
+    def write(self, data: bytes) -> str:
+        """Store an encoded object and return its hash."""
+        obj_hash = hash_object(data)
+        if not self.has(obj_hash):
+            tmp_path = self.temp_path()
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.publish(tmp_path, obj_hash)
+        return obj_hash
+
+    # -- packs ---------------------------------------------------------------
+
+    def packs(self) -> list[Pack]:
+        """Open packs, re-scanned only when objects/pack changes."""
+        try:
+            signature = os.stat(self.pack_dir).st_mtime_ns
+        except FileNotFoundError:
+            signature = None
+        with self._packs_lock:
+            if signature != self._packs_signature:
+                # Old Pack objects are left for the GC: other threads may still be reading them
+                self._packs = []
+                if signature is not None:
+                    for name in sorted(os.listdir(self.pack_dir)):
+                        if name.endswith(".idx"):
+                            self._packs.append(Pack(os.path.join(self.pack_dir, name)))
+                self._packs_signature = signature
+            return list(self._packs)
+
+    def _from_packs(self, lookup):
+        """First non-None lookup(pack). Retried once if the packs were merged in the meantime."""
+        packs = self.packs()
+        for pack in packs:
+            result = lookup(pack)
+            if result is not None:
+                return result
+        current = self.packs()
+        if current != packs:
+            for pack in current:
+                result = lookup(pack)
+                if result is not None:
+                    return result
+        return None
+
+    # -- lookups -------------------------------------------------------------
+
+    def has(self, obj_hash: str) -> bool:
+        if os.path.exists(self.loose_path(obj_hash)) or os.path.exists(self.legacy_path(obj_hash)):
+            return True
+        return self._from_packs(lambda pack: pack.find(obj_hash)) is not None
+
+    def read(self, obj_hash: str) -> bytes | None:
+        for path in (self.loose_path(obj_hash), self.legacy_path(obj_hash)):
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+        # A consolidation may have just moved it into a new pack
+        return self._from_packs(lambda pack: pack.read(obj_hash))
+
+    def missing(self, hashes) -> list[str]:
+        """
+        The given hashes the store does not have, in order.
+        Bloom misses are trusted; bloom hits are confirmed against disk and packs.
+        An object written by another process since the last rebuild may be reported
+        missing, which only costs a redundant upload: ingestion deduplicates it.
+        """
+        bloom = self.bloom()
+        return [h for h in hashes if h not in bloom or not self.has(h)]
+
+    def bloom(self) -> BloomFilter:
+        """Bloom filter of every stored object, rebuilt when stale, full, or the packs changed."""
+        packs = self.packs()
+        with self._bloom_lock:
+            bloom = self._bloom
+            if (bloom is None or bloom.full or self._bloom_packs != self._packs_signature
+                    or time.monotonic() - self._bloom_built_at > BLOOM_MAX_AGE):
+                loose = list(self.loose_hashes())
+                bloom = BloomFilter(2 * (len(loose) + sum(pack.count for pack in packs)) + 1024)
+                for obj_hash in loose:
+                    bloom.add(obj_hash)
+                for pack in packs:
+                    for obj_hash in pack.hashes():
+                        bloom.add(obj_hash)
+                self._bloom = bloom
+                self._bloom_built_at = time.monotonic()
+                self._bloom_packs = self._packs_signature
+            return bloom
+
+    def open(self, obj_hash: str):
+        """Binary stream of the raw object (header included), or None. The caller closes it."""
+        for path in (self.loose_path(obj_hash), self.legacy_path(obj_hash)):
+            try:
+                return open(path, "rb")
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+        return self._from_packs(lambda pack: pack.open(obj_hash))
+
+    def loose_hashes(self):
+        """Every loose object (fan-out and legacy flat layout)."""
+        if not os.path.isdir(self.objects_dir):
+            return
+        for name in os.listdir(self.objects_dir):
+            path = os.path.join(self.objects_dir, name)
+            if len(name) == 2 and os.path.isdir(path):
+                for rest in os.listdir(path):
+                    if is_object_hash(name + rest):
+                        yield name + rest
+            elif is_object_hash(name):
+                yield name
+
+    def stats(self) -> tuple[int, int]:
+        """(object count, bytes on disk) over loose objects and packs."""
+        count = size = 0
+        if os.path.isdir(self.objects_dir):
+            for entry in os.scandir(self.objects_dir):
+                if len(entry.name) == 2 and entry.is_dir():
+                    files = [(entry.name + f.name, f) for f in os.scandir(entry.path)]
+                else:
+                    files = [(entry.name, entry)]
+                for name, f in files:
+                    if not is_object_hash(name):
+                        continue
+                    try:
+                        size += f.stat().st_size
+                    except FileNotFoundError:
+                        # Moved into a pack meanwhile
+                        continue
+                    count += 1
+        for pack in self.packs():
+            count += pack.count
+            for path in (pack.pack_path, pack.index_path):
+                try:
+                    size += os.path.getsize(path)
+                except FileNotFoundError:
+                    pass
+        return count, size
+
+    # -- consolidation ---------------------------------------------------------
+
+    def should_consolidate(self) -> bool:
+        """Cheap estimate in the style of "git gc --auto": sample one fan-out directory."""
+        try:
+            sample = len(os.listdir(os.path.join(self.objects_dir, "17")))
+        except FileNotFoundError:
+            return False
+        return sample * 256 > LOOSE_OBJECT_LIMIT
+
+    def consolidate(self) -> int:
+        """
+        Pack every loose object into a new packfile, merging the existing
+        packs into it past PACK_LIMIT. Returns the number of loose objects packed.
+        """
+        # Non-blocking: another worker already consolidating is enough
+        with file_lock(os.path.join(self.pack_dir, ".consolidate.lock"), blocking=False) as acquired:
+            if not acquired:
+                return 0
+            hashes = sorted(set(self.loose_hashes()))
+            if not hashes:
+                return 0
+            packs = self.packs()
+            merged = packs if len(packs) + 1 > PACK_LIMIT else []
+            # sha1 -> (pack, offset, length) to copy, or None to compress the loose object
+            sources = {}
+            for pack in merged:
+                for sha, offset, length in pack.records():
+                    sources.setdefault(sha, (pack, offset, length))
+            for obj_hash in hashes:
+                sources[bytes.fromhex(obj_hash)] = None
+
+            pack_id = uuid.uuid4().hex
+            pack_path = os.path.join(self.pack_dir, f"pack-{pack_id}.pack")
+            index_path = os.path.join(self.pack_dir, f"pack-{pack_id}.idx")
+            records = []
+            tmp_pack = pack_path + ".tmp"
+            pack_files = {}
+            try:
+                with open(tmp_pack, "wb") as out:
+                    out.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(sources)))
+                    for sha in sorted(sources):
+                        source = sources[sha]
+                        if source is None:
+                            compressed = zlib.compress(self.read(sha.hex()))
+                        else:
+                            pack, offset, length = source
+                            if pack.pack_path not in pack_files:
+                                pack_files[pack.pack_path] = open(pack.pack_path, "rb")
+                            f = pack_files[pack.pack_path]
+                            f.seek(offset)
+                            compressed = f.read(length)
+                        records.append((sha, out.tell(), len(compressed)))
+                        out.write(compressed)
+                    out.flush()
+                    os.fsync(out.fileno())
+            finally:
+                for f in pack_files.values():
+                    f.close()
+
+            fanout = [0] * 256
+            for sha, _, _ in records:
+                fanout[sha[0]] += 1
+            for i in range(1, 256):
+                fanout[i] += fanout[i - 1]
+
+            tmp_index = index_path + ".tmp"
+            with open(tmp_index, "wb") as out:
+                out.write(HEADER.pack(INDEX_MAGIC, PACK_VERSION, len(records)))
+                out.write(FANOUT.pack(*fanout))
+                for record in records:
+                    out.write(INDEX_RECORD.pack(*record))
+                out.flush()
+                os.fsync(out.fileno())
+
+            # Publish the pack before its index: readers only look at packs that have one
+            os.replace(tmp_pack, pack_path)
+            os.replace(tmp_index, index_path)
+            fsync_dir(self.pack_dir)
+
+            for pack in merged:
+                # Index first: a pack without one is never opened
+                for path in (pack.index_path, pack.pack_path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            if merged:
+                fsync_dir(self.pack_dir)
+
+            for obj_hash in hashes:
+                for path in (self.loose_path(obj_hash), self.legacy_path(obj_hash)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            return len(hashes)
+
+    def consolidate_if_needed(self) -> int:
+        return self.consolidate() if self.should_consolidate() else 0
+
+
+_stores = LRUCache(OPEN_REPO_ENTRIES)
+_stores_lock = threading.Lock()
+
+
+def get_object_store(objects_dir: str) -> ObjectStore:
+    """Process-wide store per objects directory, so open pack indexes are reused."""
+    key = os.path.abspath(objects_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ObjectStore(objects_dir)
+            _stores.put(key, store)
+        return store
+
+
+def forget_object_store(objects_dir: str):
+    """Drop the cached store of a repo that is going away."""
+    _stores.pop(os.path.abspath(objects_dir))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python -m app.gitmini.objects <path/to/.gitmini/objects>")
+        sys.exit(1)
+    packed = ObjectStore(sys.argv[1]).consolidate()
+    print(f"Packed {packed} loose objects")
@@ -0,0 +1,214 @@
+"""
+Read path for browsing repositories.
+
+Objects are immutable and named by their content hash, so everything read
+here is cached by hash alone, shared across repos, and never invalidated:
+
+- an LRU of raw object bodies, bounded by total bytes
+- an LRU of parsed trees and commits, bounded by entry count
+
+Objects over STREAM_THRESHOLD bypass the byte cache; their bodies are
+streamed from disk (or inflated from a pack) in chunks.
+"""
+import os, threading
+from collections import OrderedDict
+
+OBJECT_CACHE_BYTES = int(os.getenv("GITMINIHUB_OBJECT_CACHE_MB", "64")) * 1024 * 1024
+PARSED_CACHE_ENTRIES = int(os.getenv("GITMINIHUB_PARSED_CACHE_ENTRIES", "8192"))
+# Bodies bigger than this are never held in memory
+STREAM_THRESHOLD = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class ObjectNotFound(Exception):
+    """The object is missing from the store or is not of the expected type."""
+
+
+class LRUCache:
+    """Thread-safe LRU bounded by entry count and, optionally, by total size."""
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._sizes: dict = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int = 0):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+
+    def pop(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._bytes -= self._sizes.pop(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+object_cache = LRUCache(max_entries=1_000_000, max_bytes=OBJECT_CACHE_BYTES)
+parsed_cache = LRUCache(max_entries=PARSED_CACHE_ENTRIES)
+
+
+def read_header(stream) -> tuple[str, int]:
+    """Consume "<type> <size>\\0" from the start of a raw object stream."""
+    header = b""
+    while not header.endswith(b"\0"):
+        byte = stream.read(1)
+        if not byte or len(header) > 64:
+            raise ObjectNotFound("Malformed object header")
+        header += byte
+    obj_type, _, size = header[:-1].decode().partition(" ")
+    return obj_type, int(size)
+
+
+def parse_tree(body: bytes) -> list[dict]:
+    """Entries of a tree body ("<mode> <type> <hash>\\t<name>" lines), directories first."""
+    entries = []
+    for line in body.decode("utf-8", errors="replace").splitlines():
+        meta, _, name = line.partition("\t")
+        parts = meta.split()
+        if len(parts) != 3 or not name:
+            continue
+        mode, obj_type, obj_hash = parts
+        entries.append({"mode": mode, "type": obj_type, "hash": obj_hash, "name": name})
+    entries.sort(key=lambda e: (e["type"] != "tree", e["name"]))
+    return entries
+
+
+def parse_commit(body: bytes) -> dict:
+    """Header lines (tree, parent..., author) then a blank line and the message."""
+    text = body.decode("utf-8", errors="replace")
+    head, _, message = text.partition("\n\n")
+    commit = {"tree": None, "parents": [], "author": "", "timestamp": None, "message": message.rstrip("\n")}
+    for line in head.splitlines():
+        key, _, value = line.partition(" ")
+        if key == "tree":
+            commit["tree"] = value
+        elif key == "parent":
+            commit["parents"].append(value)
+        elif key == "author":
+            name, _, timestamp = value.rpartition(" ")
+            if name and timestamp.lstrip("-").isdigit():
+                commit["author"], commit["timestamp"] = name, int(timestamp)
+            else:
+                commit["author"] = value
+    return commit
+
+
+class ObjectReader:
+    """Typed, cached reads from one repo's ObjectStore."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def read(self, obj_hash: str) -> tuple[str, bytes]:
+        """(type, body). Small objects are served from and added to the byte cache."""
+        cached = object_cache.get(obj_hash)
+        if cached is not None:
+            return cached
+        stream = self.store.open(obj_hash)
+        if stream is None:
+            raise ObjectNotFound(obj_hash)
+        with stream:
+            obj_type, size = read_header(stream)
+            body = stream.read()
+        if size <= STREAM_THRESHOLD:
+            object_cache.put(obj_hash, (obj_type, body), size)
+        return obj_type, body
+
+    def info(self, obj_hash: str) -> tuple[str, int]:
+        """(type, size) without reading the body."""
+        cached = object_cache.get(obj_hash)
+        if cached is not None:
+            return cached[0], len(cached[1])
+        stream = self.store.open(obj_hash)
+        if stream is None:
+            raise ObjectNotFound(obj_hash)
+        with stream:
+            return read_header(stream)
+
+    def stream(self, obj_hash: str, chunk_size: int = CHUNK_SIZE):
+        """Body in chunks; large objects are never loaded whole."""
+        cached = object_cache.get(obj_hash)
+        if cached is not None:
+            body = cached[1]
+            for start in range(0, len(body), chunk_size):
+                yield body[start:start + chunk_size]
+            return
+        stream = self.store.open(obj_hash)
+        if stream is None:
+            raise ObjectNotFound(obj_hash)
+        with stream:
+            read_header(stream)
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _parsed(self, obj_hash: str, expected_type: str, parse):
+        cached = parsed_cache.get(obj_hash)
+        if cached is not None:
+            return cached
+        obj_type, body = self.read(obj_hash)
+        if obj_type != expected_type:
+            raise ObjectNotFound(f"{obj_hash} is a {obj_type}, not a {expected_type}")
+        parsed = parse(body)
+        parsed_cache.put(obj_hash, parsed)
+        return parsed
+
+    def tree(self, obj_hash: str) -> list[dict]:
+        return self._parsed(obj_hash, "tree", parse_tree)
+
+    def commit(self, obj_hash: str) -> dict:
+        return self._parsed(obj_hash, "commit", parse_commit)
+
+    def resolve(self, commit_hash: str, path: str) -> dict:
+        """Entry for path in a commit ("" is the root tree)."""
+        entry = {"mode": "040000", "type": "tree", "hash": self.commit(commit_hash)["tree"], "name": ""}
+        for part in [p for p in path.split("/") if p]:
+            if entry["type"] != "tree":
+                raise ObjectNotFound(path)
+            entry = next((e for e in self.tree(entry["hash"]) if e["name"] == part), None)
+            if entry is None:
+                raise ObjectNotFound(path)
+        return entry
+
+
+def cache_metrics() -> dict:
+    return {"objects": object_cache.metrics(), "parsed": parsed_cache.metrics()}
@@ -0,0 +1,114 @@
+"""
+Branch refs with compare-and-swap updates.
+
+Each ref has its own lock file under .gitmini/locks/, held with fcntl.flock so
+it serializes writers across uvicorn worker processes as well as threads.
+Pushes to different refs (and different repos) never wait on each other.
+Every successful update is appended to .gitmini/logs/refs/heads/<branch>.
+"""
+import os, time, uuid
+from app.storage.json_store import fsync_dir, file_lock
+
+ZERO_COMMIT = "0" * 40
+
+
+class RefUpdateRejected(Exception):
+    """The ref no longer points at the expected commit."""
+
+    def __init__(self, current: str | None):
+        super().__init__(f"Ref is at {current}")
+        self.current = current
+
+
+class RefStore:
+    def __init__(self, gitmini_dir: str):
+        self.gitmini_dir = gitmini_dir
+        self.heads_dir = os.path.join(gitmini_dir, "refs", "heads")
+        self.locks_dir = os.path.join(gitmini_dir, "locks", "heads")
+        self.logs_dir = os.path.join(gitmini_dir, "logs", "refs", "heads")
+
+    def ref_path(self, branch: str) -> str:
+        return os.path.join(self.heads_dir, branch)
+
+    def is_valid_branch(self, branch: str) -> bool:
+        return bool(branch) and "/" not in branch and "\\" not in branch and not branch.startswith(".")
+
+    def exists(self, branch: str) -> bool:
+        return self.is_valid_branch(branch) and os.path.isfile(self.ref_path(branch))
+
+    def read(self, branch: str) -> str | None:
+        """Commit the branch points at ("" for a branch with no commits), or None if it doesn't exist."""
+        try:
+            with open(self.ref_path(branch), "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def branches(self) -> dict[str, str]:
+        branches = {}
+        if not os.path.isdir(self.heads_dir):
+            return branches
+        for name in os.listdir(self.heads_dir):
+            if not self.is_valid_branch(name):
+                continue
+            commit = self.read(name)
+            if commit is not None:
+                branches[name] = commit
+        return branches
+
+    def lock(self, branch: str):
+        """Exclusive lock on one ref, shared by every worker process."""
+        return file_lock(os.path.join(self.locks_dir, branch + ".lock"))
+
+    def compare_and_swap(self, branch: str, expected: str | None, new: str, who: str = "", message: str = "push") -> str | None:
+        """
+        Point branch at new if it currently points at expected
+        (expected=None skips the check). Returns the previous commit.
+        Raises RefUpdateRejected if the ref moved.
+        """
+        with self.lock(branch):
+            current = self.read(branch)
+            if expected is not None and current != expected:
+                raise RefUpdateRejected(current)
+            self._write(branch, new)
+            self._log(branch, current, new, who, message)
+            return current
+
+    def _write(self, branch: str, commit: str):
+        ref_path = self.ref_path(branch)
+        tmp_path = os.path.join(self.heads_dir, f".{branch}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(commit)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, ref_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        fsync_dir(self.heads_dir)
+
+    def _log(self, branch: str, old: str | None, new: str, who: str, message: str):
+        os.makedirs(self.logs_dir, exist_ok=True)
+        line = f"{old or ZERO_COMMIT} {new} {who} {int(time.time())}\t{message}\n"
+        with open(os.path.join(self.logs_dir, branch), "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def reflog(self, branch: str) -> list[dict]:
+        """Updates to branch, oldest first."""
+        entries = []
+        try:
+            with open(os.path.join(self.logs_dir, branch), "r", encoding="utf-8") as f:
+                for line in f:
+                    head, _, message = line.rstrip("\n").partition("\t")
+                    old, new, who, timestamp = head.split(" ")
+                    entries.append({
+                        "old": None if old == ZERO_COMMIT else old,
+                        "new": new,
+                        "user": who,
+                        "timestamp": int(timestamp),
+                        "message": message
+                    })
+        except FileNotFoundError:
+            pass
+        return entries
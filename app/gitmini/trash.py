@@ -0,0 +1,170 @@
+"""
+Background deletion of repositories.
+
+Deleting a repo renames its directory into <repo_root>/.trash/ (one atomic
+rename on the same filesystem) and returns. A reaper thread then removes what
+is in the trash, deepest entries first, pausing after every batch of files
+(GITMINIHUB_TRASH_BATCH, GITMINIHUB_TRASH_PAUSE_MS) so a large repo doesn't
+starve requests of disk I/O.
+
+Everything under .trash is garbage, so there is nothing to journal: a crash
+leaves either the repo in place or a (possibly half-removed) trash entry, and
+the reaper started with the app carries on with whatever is left.
+"""
+import os, time, uuid, threading
+from app.storage.json_store import fsync_dir
+
+TRASH_BATCH = int(os.getenv("GITMINIHUB_TRASH_BATCH", "500"))
+TRASH_PAUSE = int(os.getenv("GITMINIHUB_TRASH_PAUSE_MS", "50")) / 1000
+
+
+class Reaper:
+    def __init__(self, trash_dir: str, batch: int = TRASH_BATCH, pause: float = TRASH_PAUSE):
+        self.trash_dir = trash_dir
+        self.batch = batch
+        self.pause = pause
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        # One reaping pass at a time
+        self._reap_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._failed: set[str] = set()
+        self.current = None
+        self.reaped = 0
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+        self.errors = 0
+
+    def trash(self, path: str) -> str | None:
+        """Move a directory into the trash and wake the reaper. Returns its trash path, or None if path is gone."""
+        os.makedirs(self.trash_dir, exist_ok=True)
+        target = os.path.join(self.trash_dir, f"{os.path.basename(path)}-{uuid.uuid4().hex}")
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            return None
+        fsync_dir(self.trash_dir)
+        fsync_dir(os.path.dirname(path))
+        self.start()
+        self._wake.set()
+        return target
+
+    def pending(self) -> list[str]:
+        try:
+            return sorted(os.listdir(self.trash_dir))
+        except FileNotFoundError:
+            return []
+
+    # -- the reaper thread ------------------------------------------------------
+
+    def start(self):
+        """Start the reaper thread if it isn't running. It begins with whatever is already in the trash."""
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="repo-reaper", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """Stop after the current batch. Unfinished entries stay in the trash for the next start."""
+        with self._thread_lock:
+            thread = self._thread
+            self._stopping = True
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            self.reap_all()
+            self._wake.wait()
+
+    def reap_all(self) -> int:
+        """Remove every entry currently in the trash. Returns the number removed."""
+        removed = 0
+        with self._reap_lock:
+            for name in self.pending():
+                if self._stopping:
+                    break
+                if name in self._failed:
+                    continue
+                if self._reap(os.path.join(self.trash_dir, name)):
+                    removed += 1
+        return removed
+
+    def _reap(self, path: str) -> bool:
+        name = os.path.basename(path)
+        with self._stats_lock:
+            self.current = {"name": name, "files_removed": 0, "bytes_reclaimed": 0}
+        try:
+            in_batch = 0
+            for dirpath, dirnames, filenames in os.walk(path, topdown=False):
+                for filename in filenames:
+                    file_path = os.path.join(dirpath, filename)
+                    try:
+                        size = os.lstat(file_path).st_size
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        continue
+                    with self._stats_lock:
+                        self.current["files_removed"] += 1
+                        self.current["bytes_reclaimed"] += size
+                        self.files_removed += 1
+                        self.bytes_reclaimed += size
+                    in_batch += 1
+                    if in_batch >= self.batch:
+                        if self._stopping:
+                            return False
+                        time.sleep(self.pause)
+                        in_batch = 0
+                for dirname in dirnames:
+                    dir_path = os.path.join(dirpath, dirname)
+                    if os.path.islink(dir_path):
+                        os.remove(dir_path)
+                    else:
+                        os.rmdir(dir_path)
+            os.rmdir(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Left in place (and skipped until restart) rather than retried in a tight loop
+            with self._stats_lock:
+                self.errors += 1
+            self._failed.add(name)
+            return False
+        finally:
+            with self._stats_lock:
+                self.current = None
+        with self._stats_lock:
+            self.reaped += 1
+        return True
+
+    def metrics(self) -> dict:
+        pending = len(self.pending())
+        with self._stats_lock:
+            return {
+                "pending": pending,
+                "current": dict(self.current) if self.current else None,
+                "reaped": self.reaped,
+                "files_removed": self.files_removed,
+                "bytes_reclaimed": self.bytes_reclaimed,
+                "errors": self.errors
+            }
+
+
+_reapers: dict[str, Reaper] = {}
+_reapers_lock = threading.Lock()
+
+
+def get_reaper(trash_dir: str) -> Reaper:
+    """The process-wide Reaper for a trash directory."""
+    trash_dir = os.path.abspath(trash_dir)
+    with _reapers_lock:
+        reaper = _reapers.get(trash_dir)
+        if reaper is None:
+            reaper = _reapers[trash_dir] = Reaper(trash_dir)
+        return reaper
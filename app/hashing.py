@@ -0,0 +1,81 @@
+import os, time, asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+
+# bcrypt releases the GIL, so a thread pool gives real parallelism per core
+HASH_WORKERS = int(os.getenv("GITMINIHUB_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Requests allowed to wait for a worker before new ones are turned away
+HASH_QUEUE_LIMIT = int(os.getenv("GITMINIHUB_HASH_QUEUE_LIMIT", str(HASH_WORKERS * 8)))
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the password hashing queue is full. Surfaced as a 503."""
+
+
+class PasswordHashPool:
+    """
+    Bounded worker pool for bcrypt hashing and verification.
+
+    Keeps the 100-300ms bcrypt calls off the event loop. At most
+    workers + queue_limit calls are admitted at once; beyond that, callers
+    get PasswordPoolSaturated instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise PasswordPoolSaturated()
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(started - submitted, time.perf_counter() - started)
+
+        # The slot is released by the worker, so a cancelled request cannot free it early
+        return await asyncio.wrap_future(self._executor.submit(job))
+
+    def _record(self, queue_wait: float, hash_time: float):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._queue_wait_total += queue_wait
+            self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+            self._hash_time_total += hash_time
+            self._hash_time_max = max(self._hash_time_max, hash_time)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "queue_wait_avg_ms": self._queue_wait_total / completed * 1000,
+                "queue_wait_max_ms": self._queue_wait_max * 1000,
+                "hash_time_avg_ms": self._hash_time_total / completed * 1000,
+                "hash_time_max_ms": self._hash_time_max * 1000,
+            }
+
+
+password_pool = PasswordHashPool(HASH_WORKERS, HASH_QUEUE_LIMIT)
@@ -1,19 +1,55 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from app.pages import homepage, user, repo, signup, login, logout, cli_login
-from app.api import remote_repo, cli_auth, remote_add, push
+from app.pages import homepage, user, repo, browse, downloads, signup, login, logout, cli_login
+from app.api import remote_repo, cli_auth, remote_add, push, negotiate, fetch, metrics, search
+from app.utils import get_storage, get_repo_reaper, sessions
+from app.sessions import SESSION_TTL
+from app.hashing import PasswordPoolSaturated
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Finish removing repos deleted before a restart
+    get_repo_reaper().start()
+    yield
+    get_repo_reaper().stop(timeout=5)
+    # Write back buffered API-key last-used times
+    get_storage().flush_api_key_usage()
 
-# Prevent caching globally
+app = FastAPI(lifespan=lifespan)
+
+# Password hashing pool is full: shed load instead of queueing forever
+@app.exception_handler(PasswordPoolSaturated)
+async def password_pool_saturated(request: Request, exc: PasswordPoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+# Prevent caching globally, except for responses that set their own policy (see app/page_cache.py)
 @app.middleware("http")
 async def disable_caching(request: Request, call_next):
     response: Response = await call_next(request)
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
+    if "cache-control" not in response.headers:
+        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+        response.headers["Pragma"] = "no-cache"
+    return response
+
+# Sliding sessions: re-issue the cookie once it is past half its lifetime
+@app.middleware("http")
+async def renew_session(request: Request, call_next):
+    response: Response = await call_next(request)
+    # Login and logout set the cookie themselves
+    if any(h.startswith("session=") for h in response.headers.getlist("set-cookie")):
+        return response
+    renewed = sessions.renewal(request.cookies.get("session"))
+    if renewed:
+        response.set_cookie(key="session", value=renewed, httponly=True, max_age=SESSION_TTL)
     return response
 
 # Backend routes
@@ -21,6 +57,10 @@ app.include_router(cli_auth.router)
 app.include_router(remote_repo.router)
 app.include_router(remote_add.router)
 app.include_router(push.router)
+app.include_router(negotiate.router)
+app.include_router(fetch.router)
+app.include_router(metrics.router)
+app.include_router(search.router)
 
 # Frontend routes
 app.include_router(signup.router)
@@ -28,5 +68,8 @@ app.include_router(login.router)
 app.include_router(logout.router)
 app.include_router(homepage.router)
 app.include_router(cli_login.router)
+# /raw/ and /archive/ URLs also match the browse patterns, so they go first
+app.include_router(downloads.router)
+app.include_router(browse.router)
 app.include_router(repo.router)
 app.include_router(user.router)
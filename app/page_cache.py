@@ -0,0 +1,175 @@
+"""
+Rendered-page cache for the public HTML pages.
+
+Entries are keyed by path + the endpoint's parsed arguments + viewer (None
+for anonymous visitors, else the logged-in username), so query parameters a
+page doesn't read can't create new entries. The cache is bounded by entry
+count and by total body size. Entries carry a validator: the storage
+version plus, for repo pages, the state of the repo's refs and, for profile
+pages, the state of the user's repo manifests. A request whose validator still
+matches is served without touching the templates; any user, repo or branch
+change (or push) makes the stored validator stale.
+
+Anonymous responses get a strong ETag and Last-Modified with
+"Cache-Control: no-cache", so browsers and proxies revalidate and get a 304
+when nothing changed. Responses for logged-in viewers are still cached here
+but stay no-store on the wire.
+"""
+import os, time, hashlib, threading, functools
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+from app.utils import get_current_user, get_storage, get_repo_root, normalize_username
+
+PAGE_CACHE_ENTRIES = int(os.getenv("GITMINIHUB_PAGE_CACHE_ENTRIES", "1024"))
+PAGE_CACHE_BYTES = int(os.getenv("GITMINIHUB_PAGE_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Bigger pages are rendered every time rather than pinned in memory
+PAGE_CACHE_MAX_BODY = 1024 * 1024
+
+
+class CachedPage:
+    def __init__(self, validator, body: bytes, media_type: str):
+        self.validator = validator
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.modified = int(time.time())
+        self.last_modified = formatdate(self.modified, usegmt=True)
+
+
+class PageCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, CachedPage] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: tuple, validator) -> CachedPage | None:
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None or page.validator != validator:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key: tuple, page: CachedPage):
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                if previous.etag == page.etag:
+                    # Same bytes under a new validator: keep the original Last-Modified
+                    page.modified, page.last_modified = previous.modified, previous.last_modified
+                self._bytes -= len(previous.body)
+            self._entries[key] = page
+            self._entries.move_to_end(key)
+            self._bytes += len(page.body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified
+            }
+
+
+page_cache = PageCache(PAGE_CACHE_ENTRIES, PAGE_CACHE_BYTES)
+
+
+def refs_signature(username: str, repo_name: str):
+    """Changes whenever a branch of the repo is created, moved or deleted (refs are replaced atomically)."""
+    try:
+        st = os.stat(os.path.join(get_repo_root(), username, repo_name, ".gitmini", "refs", "heads"))
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return (st.st_mtime_ns, st.st_ino)
+
+
+def manifests_signature(username: str):
+    """Changes whenever one of the user's repo manifests is rewritten (a push)."""
+    user_dir = os.path.join(get_repo_root(), username)
+    try:
+        names = sorted(os.listdir(user_dir))
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    signature = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(user_dir, name, ".gitmini", "manifest.json"))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        signature.append((name, st.st_mtime_ns, st.st_ino))
+    return tuple(signature)
+
+
+def not_modified(request: Request, page: CachedPage) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return page.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since).timestamp() >= page.modified
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def page_response(request: Request, page: CachedPage, viewer: str | None) -> Response:
+    if viewer is not None:
+        return Response(page.body, media_type=page.media_type)
+    headers = {"ETag": page.etag, "Last-Modified": page.last_modified, "Cache-Control": "no-cache"}
+    if not_modified(request, page):
+        page_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(page.body, media_type=page.media_type, headers=headers)
+
+
+def cached_page(endpoint):
+    """Serve a GET page endpoint through the page cache. Only 200 HTML responses are stored."""
+
+    @functools.wraps(endpoint)
+    async def wrapper(request: Request, **kwargs):
+        viewer = get_current_user(request)
+        # Only what the endpoint reads: ?x=1 or a reordered query is the same page
+        key = (request.url.path, tuple(sorted(kwargs.items())), viewer)
+        validator = get_storage().version()
+        if "repo_name" in kwargs:
+            validator = (validator, refs_signature(normalize_username(kwargs["username"]), kwargs["repo_name"]))
+        elif "username" in kwargs:
+            # Profile pages show each repo's last push
+            validator = (validator, manifests_signature(normalize_username(kwargs["username"])))
+
+        page = page_cache.get(key, validator)
+        if page is None:
+            response = await endpoint(request, **kwargs)
+            body = getattr(response, "body", None)
+            if response.status_code != 200 or body is None or len(body) > PAGE_CACHE_MAX_BODY:
+                return response
+            page = CachedPage(validator, body, response.media_type)
+            page_cache.put(key, page)
+        return page_response(request, page, viewer)
+
+    return wrapper
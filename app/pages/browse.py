@@ -0,0 +1,172 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.templating import templates, render
+from app.page_cache import cached_page
+from app.gitmini.objects import get_object_store, is_object_hash
+from app.gitmini.refs import RefStore
+from app.gitmini.reader import ObjectReader, ObjectNotFound, STREAM_THRESHOLD
+from app.gitmini.commit_graph import get_commit_graph
+from app.utils import (
+    get_user,
+    normalize_username,
+    get_current_user,
+    get_repo_root,
+    find_repo_entry
+)
+import os, codecs
+from itertools import islice
+
+router = APIRouter()
+
+COMMITS_PAGE_SIZE = 30
+
+
+def open_repo(username: str, repo_name: str):
+    """(RefStore, ObjectReader) for a registered repo, or None."""
+    if not find_repo_entry(get_user(username), repo_name):
+        return None
+    gitmini_dir = os.path.join(get_repo_root(), username, repo_name, ".gitmini")
+    return RefStore(gitmini_dir), ObjectReader(get_object_store(os.path.join(gitmini_dir, "objects")))
+
+
+def default_branch(branches: dict) -> str | None:
+    if "main" in branches:
+        return "main"
+    return min(branches) if branches else None
+
+
+def resolve_ref(refs: RefStore, reader: ObjectReader, ref: str) -> str | None:
+    """Commit for a branch name, or for a commit hash (as linked from the log)."""
+    commit = refs.read(ref) if refs.is_valid_branch(ref) else None
+    if not commit and is_object_hash(ref) and reader.store.has(ref):
+        commit = ref
+    return commit or None
+
+
+def breadcrumbs(path: str) -> list[dict]:
+    parts = [p for p in path.split("/") if p]
+    return [{"name": part, "path": "/".join(parts[:i + 1])} for i, part in enumerate(parts)]
+
+
+def decode_chunks(chunks):
+    """UTF-8 text from byte chunks, without splitting multi-byte characters."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def not_found(request: Request, context: dict, error: str):
+    return templates.TemplateResponse(request, "repo.html", {**context, "error": error}, status_code=404)
+
+
+@router.get("/{username}/{repo_name}/tree/{branch}", response_class=HTMLResponse)
+@router.get("/{username}/{repo_name}/tree/{branch}/{path:path}", response_class=HTMLResponse)
+@cached_page
+async def view_tree(request: Request, username: str, repo_name: str, branch: str, path: str = ""):
+    username = normalize_username(username)
+    context = {"username": username, "repo_name": repo_name, "user": get_current_user(request)}
+    repo = open_repo(username, repo_name)
+    if repo is None:
+        return not_found(request, context, "Repository does not exist")
+    refs, reader = repo
+
+    commit = resolve_ref(refs, reader, branch)
+    if not commit:
+        return not_found(request, context, "Branch does not exist")
+    try:
+        entry = reader.resolve(commit, path)
+        if entry["type"] != "tree":
+            return not_found(request, context, "Path is not a directory")
+        entries = reader.tree(entry["hash"])
+        head = reader.commit(commit)
+    except ObjectNotFound:
+        return not_found(request, context, "Path does not exist")
+
+    return render(request, "tree.html", {
+        **context,
+        "branch": branch,
+        "branches": sorted(refs.branches()),
+        "path": path.strip("/"),
+        "parent": path.strip("/").rpartition("/")[0],
+        "crumbs": breadcrumbs(path),
+        "entries": entries,
+        "commit": {"hash": commit, **head}
+    }, items=len(entries))
+
+
+@router.get("/{username}/{repo_name}/blob/{branch}/{path:path}", response_class=HTMLResponse)
+@cached_page
+async def view_blob(request: Request, username: str, repo_name: str, branch: str, path: str):
+    username = normalize_username(username)
+    context = {"username": username, "repo_name": repo_name, "user": get_current_user(request)}
+    repo = open_repo(username, repo_name)
+    if repo is None:
+        return not_found(request, context, "Repository does not exist")
+    refs, reader = repo
+
+    commit = resolve_ref(refs, reader, branch)
+    if not commit:
+        return not_found(request, context, "Branch does not exist")
+    try:
+        entry = reader.resolve(commit, path)
+        if entry["type"] != "blob":
+            return not_found(request, context, "Path is not a file")
+        _, size = reader.info(entry["hash"])
+        head_chunks = reader.stream(entry["hash"], 8000)
+        first = next(head_chunks, b"")
+        head_chunks.close()
+    except ObjectNotFound:
+        return not_found(request, context, "Path does not exist")
+
+    context.update({
+        "branch": branch,
+        "path": path.strip("/"),
+        "crumbs": breadcrumbs(path),
+        "size": size,
+        "binary": b"\0" in first
+    })
+    if context["binary"]:
+        return templates.TemplateResponse(request, "blob.html", {**context, "chunks": []})
+    if size <= STREAM_THRESHOLD:
+        _, body = reader.read(entry["hash"])
+        return templates.TemplateResponse(request, "blob.html", {**context, "chunks": [body.decode("utf-8", errors="replace")]})
+
+    # Large file: render the page as the blob is read, never holding it whole
+    chunks = decode_chunks(reader.stream(entry["hash"]))
+    return StreamingResponse(templates.get_template("blob.html").generate({**context, "chunks": chunks}), media_type="text/html")
+
+
+@router.get("/{username}/{repo_name}/commits/{branch}", response_class=HTMLResponse)
+@cached_page
+async def view_commits(request: Request, username: str, repo_name: str, branch: str, page: int = 1):
+    username = normalize_username(username)
+    context = {"username": username, "repo_name": repo_name, "user": get_current_user(request)}
+    repo = open_repo(username, repo_name)
+    if repo is None:
+        return not_found(request, context, "Repository does not exist")
+    refs, reader = repo
+
+    commit = resolve_ref(refs, reader, branch)
+    if not commit:
+        return not_found(request, context, "Branch does not exist")
+    page = max(page, 1)
+    start = (page - 1) * COMMITS_PAGE_SIZE
+    graph = get_commit_graph(refs.gitmini_dir)
+    try:
+        # Normally a no-op: pushes keep the graph current
+        await run_in_threadpool(graph.update, reader, commit)
+        # Only the commits on this page are read from the object store
+        hashes = list(islice(graph.walk(commit), start, start + COMMITS_PAGE_SIZE + 1))
+        commits = [{"hash": h, **reader.commit(h)} for h in hashes[:COMMITS_PAGE_SIZE]]
+    except ObjectNotFound:
+        return not_found(request, context, "Commit history is unavailable")
+
+    return templates.TemplateResponse(request, "commits.html", {
+        **context,
+        "branch": branch,
+        "commits": commits,
+        "page": page,
+        "has_more": len(hashes) > COMMITS_PAGE_SIZE
+    })
@@ -1,14 +1,13 @@
-import httpx
 from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.templating import templates
 from app.utils import (
-    load_users, save_users, normalize_username, is_invalid_username,
-    is_invalid_password, hash_password, verify_password, get_current_user
+    get_user, user_exists, create_user, normalize_username, is_invalid_username,
+    is_invalid_password, hash_password_async, verify_password_async, get_current_user
 )
+from app.api.cli_auth import complete_cli_auth
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/cli-login", response_class=HTMLResponse)
 async def cli_login_page(request: Request, cli_token: str | None = None):
@@ -22,6 +21,18 @@ async def cli_login_page(request: Request, cli_token: str | None = None):
         "cli_token": cli_token
     })
 
+def complete_login(request: Request, cli_token: str, username: str, user):
+    """Hand an API key to the waiting CLI; credentials were already checked by the form handler."""
+    if not complete_cli_auth(cli_token, username):
+        return templates.TemplateResponse(request, "cli_login.html", {
+            "error": "Authentication failed. Please try again.",
+            "user": user,
+            "cli_token": cli_token
+        })
+    
+    # Redirect to success page
+    return RedirectResponse(f"/cli-success?cli_token={cli_token}", status_code=302)
+
 @router.post("/cli-login")
 async def cli_login(
     request: Request,
@@ -51,91 +62,29 @@ async def cli_login(
             "cli_token": cli_token
         })
     
-    users = load_users()
-    
     if action == "signup":
         # Handle signup
-        if username in users:
+        if user_exists(username) or not create_user(username, await hash_password_async(password)):
             return templates.TemplateResponse(request, "cli_login.html", {
                 "error": "Username already exists.",
                 "user": user,
                 "cli_token": cli_token
             })
         
-        # Create new user
-        users[username] = {
-            "password_hash": hash_password(password),
-            "repos": [],
-            "api_keys": []
-        }
-        save_users(users)
-        
-        # Call the API endpoint to complete authentication
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{request.base_url}auth/verify",
-                    json={
-                        "cli_token": cli_token,
-                        "username": username,
-                        "password": password
-                    }
-                )
-                
-                if response.status_code != 200:
-                    return templates.TemplateResponse(request, "cli_login.html", {
-                        "error": "Authentication failed. Please try again.",
-                        "user": user,
-                        "cli_token": cli_token
-                    })
-        except Exception:
-            return templates.TemplateResponse(request, "cli_login.html", {
-                "error": "Authentication service unavailable. Please try again.",
-                "user": user,
-                "cli_token": cli_token
-            })
-        
-        # Redirect to success page
-        return RedirectResponse(f"/cli-success?cli_token={cli_token}", status_code=302)
+        return complete_login(request, cli_token, username, user)
     
     elif action == "login":
-        # Handle login - verify credentials and call API endpoint
-        user_data = users.get(username)
+        # Handle login - verify credentials, then complete the CLI session
+        user_data = get_user(username)
         
-        if not user_data or not verify_password(password, user_data["password_hash"]):
+        if not user_data or not await verify_password_async(password, user_data["password_hash"]):
             return templates.TemplateResponse(request, "cli_login.html", {
                 "error": "Invalid username or password.",
                 "user": user,
                 "cli_token": cli_token
             })
         
-        # Call the API endpoint to complete authentication
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{request.base_url}auth/verify",
-                    json={
-                        "cli_token": cli_token,
-                        "username": username,
-                        "password": password
-                    }
-                )
-                
-                if response.status_code != 200:
-                    return templates.TemplateResponse(request, "cli_login.html", {
-                        "error": "Authentication failed. Please try again.",
-                        "user": user,
-                        "cli_token": cli_token
-                    })
-        except Exception:
-            return templates.TemplateResponse(request, "cli_login.html", {
-                "error": "Authentication service unavailable. Please try again.",
-                "user": user,
-                "cli_token": cli_token
-            })
-        
-        # Redirect to success page
-        return RedirectResponse(f"/cli-success?cli_token={cli_token}", status_code=302)
+        return complete_login(request, cli_token, username, user)
     
     else:
         raise HTTPException(status_code=400, detail="Invalid action")
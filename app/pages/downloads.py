@@ -0,0 +1,69 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.pages.browse import open_repo, resolve_ref
+from app.gitmini.archive import get_download_cache, tar_stream
+from app.gitmini.reader import ObjectNotFound
+from app.utils import normalize_username, get_repo_root
+import os
+
+router = APIRouter()
+
+
+def download_cache():
+    return get_download_cache(os.path.join(get_repo_root(), ".cache"))
+
+
+def resolve_download(username: str, repo_name: str, branch: str):
+    """(reader, commit) for a download, or 404."""
+    repo = open_repo(normalize_username(username), repo_name)
+    if repo is None:
+        raise HTTPException(status_code=404, detail="Repository does not exist")
+    refs, reader = repo
+    commit = resolve_ref(refs, reader, branch)
+    if not commit:
+        raise HTTPException(status_code=404, detail="Branch does not exist")
+    return reader, commit
+
+
+@router.get("/raw/{username}/{repo_name}/{branch}/{path:path}")
+async def raw_file(username: str, repo_name: str, branch: str, path: str):
+    reader, commit = resolve_download(username, repo_name, branch)
+    try:
+        entry = reader.resolve(commit, path)
+        if entry["type"] != "blob":
+            raise HTTPException(status_code=404, detail="Path is not a file")
+        file_path = await run_in_threadpool(download_cache().blob, reader, entry["hash"])
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Path does not exist")
+
+    with open(file_path, "rb") as f:
+        binary = b"\0" in f.read(8000)
+    # Never let a browser render user content as HTML on this origin
+    return FileResponse(
+        file_path,
+        media_type="application/octet-stream" if binary else "text/plain; charset=utf-8",
+        headers={"X-Content-Type-Options": "nosniff"}
+    )
+
+
+@router.get("/archive/{username}/{repo_name}/{branch}.tar.gz")
+async def archive(username: str, repo_name: str, branch: str):
+    reader, commit = resolve_download(username, repo_name, branch)
+    # Keyed by commit, so the top-level directory is named by commit too: any branch gets the same file
+    prefix = f"{repo_name}-{commit[:10]}"
+    filename = f"{repo_name}-{branch}.tar.gz"
+    cache = download_cache()
+    cache_path = cache.archive_path(commit, f"{prefix}.tar.gz")
+    if cache.get(cache_path) is not None:
+        return FileResponse(cache_path, media_type="application/gzip", filename=filename)
+
+    try:
+        reader.commit(commit)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="Commit does not exist")
+    return StreamingResponse(
+        cache.tee(tar_stream(reader, commit, prefix), cache_path),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
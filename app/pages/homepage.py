@@ -1,56 +1,81 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.templating import templates, render
+from app.page_cache import cached_page
 from app.utils import (
     get_current_user,
-    load_users,
+    get_user,
     normalize_username,
-    get_all_repos
+    get_recent_repos,
+    search as search_index,
+    FEED_PAGE_SIZE,
+    FEED_PAGE_MAX,
+    SEARCH_PAGE_SIZE,
+    SEARCH_KINDS
 )
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+def feed_page(after: str = "", limit: int = FEED_PAGE_SIZE) -> dict:
+    limit = max(1, min(limit, FEED_PAGE_MAX))
+    repos, next_cursor = get_recent_repos(after, limit)
+    return {"repos": repos, "next_cursor": next_cursor, "limit": limit}
 
 @router.get("/", response_class=HTMLResponse)
-async def homepage(request: Request):
+@cached_page
+async def homepage(request: Request, after: str = "", limit: int = FEED_PAGE_SIZE):
     user = get_current_user(request)
-    users = load_users()
-    all_repos = get_all_repos(users)
+    feed = feed_page(after, limit)
 
-    return templates.TemplateResponse(request, "index.html", {
+    return render(request, "index.html", {
         "user": user,
-        "repos": all_repos
-    })
+        **feed
+    }, items=len(feed["repos"]))
 
 @router.get("/search", response_class=HTMLResponse)
-async def search(request: Request, user: str = "", repo: str = ""):
+async def search(request: Request, user: str = "", repo: str = "", q: str = "", kind: str = "repos", page: int = 1):
     current_user = get_current_user(request)
+
+    # Free-text search over the index; user/repo below is the exact "go to" lookup
+    if q:
+        kind = kind if kind in SEARCH_KINDS else "repos"
+        page = max(page, 1)
+        results, total = search_index(kind, q, page)
+        return templates.TemplateResponse(request, "search.html", {
+            "user": current_user,
+            "q": q,
+            "kind": kind,
+            "results": results,
+            "total": total,
+            "page": page,
+            "per_page": SEARCH_PAGE_SIZE
+        })
+
     user = normalize_username(user)
-    users = load_users()
-    all_repos = get_all_repos(users)
 
     if not user:
         return templates.TemplateResponse(request, "index.html", {
             "error": "Please specify a user",
             "user": current_user,
-            "repos": all_repos
+            **feed_page()
         })
 
-    if user not in users:
+    user_data = get_user(user)
+    if user_data is None:
         return templates.TemplateResponse(request, "index.html", {
             "error": "User does not exist",
             "user": current_user,
-            "repos": all_repos
+            **feed_page()
         })
 
     if repo:
-        if any(r["name"] == repo for r in users[user]["repos"]):
+        if any(r["name"] == repo for r in user_data["repos"]):
             return RedirectResponse(url=f"/{user}/{repo}")
         else:
             return templates.TemplateResponse(request, "index.html", {
                 "error": "Repository does not exist",
                 "user": current_user,
-                "repos": all_repos
+                **feed_page()
             })
 
     return RedirectResponse(url=f"/{user}")
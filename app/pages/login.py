@@ -1,17 +1,17 @@
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.templating import templates
 from app.utils import (
-    load_users,
+    get_user,
     normalize_username,
     is_invalid_password,
-    verify_password,
+    verify_password_async,
     create_session_cookie,
     get_current_user,
 )
+from app.sessions import SESSION_TTL
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -33,16 +33,15 @@ async def login(
             "user": user
         })
 
-    users = load_users()
-    user_data = users.get(username)
+    user_data = get_user(username)
 
-    if not user_data or not verify_password(password, user_data["password_hash"]):
+    if not user_data or not await verify_password_async(password, user_data["password_hash"]):
         return templates.TemplateResponse(request, "login.html", {
             "error": "Invalid username or password.",
             "user": user
         })
 
     response = RedirectResponse("/", status_code=302)
-    session_cookie = create_session_cookie(username)
-    response.set_cookie(key="session", value=session_cookie, httponly=True, max_age=3600)
+    session_cookie = create_session_cookie(username, user_data)
+    response.set_cookie(key="session", value=session_cookie, httponly=True, max_age=SESSION_TTL)
     return response
\ No newline at end of file
@@ -1,10 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import RedirectResponse
+from app.utils import revoke_session
 
 router = APIRouter()
 
 @router.get("/logout")
-async def logout():
+async def logout(request: Request):
+    revoke_session(request)
     response = RedirectResponse("/", status_code=302)
     response.delete_cookie("session")
     return response
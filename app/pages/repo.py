@@ -1,23 +1,26 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+from app.templating import templates, render
+from app.page_cache import cached_page
+from app.pages.browse import open_repo, default_branch
+from app.gitmini.manifest import read_manifest
+from app.gitmini.reader import ObjectNotFound
 from app.utils import (
-    load_users,
     normalize_username,
-    get_current_user,
-    get_user_repo_entry
+    get_current_user
 )
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/{username}/{repo_name}", response_class=HTMLResponse)
+@cached_page
 async def view_repo(request: Request, username: str, repo_name: str):
     current_user = get_current_user(request)
     username = normalize_username(username)
-    users = load_users()
+    repo = open_repo(username, repo_name)
 
-    if username not in users:
+    if repo is None:
         return templates.TemplateResponse(request, "repo.html", {
             "username": username,
             "repo_name": repo_name,
@@ -25,17 +28,25 @@ async def view_repo(request: Request, username: str, repo_name: str):
             "user": current_user
         })
 
-    repo_entry = get_user_repo_entry(users, username, repo_name)
-    if not repo_entry:
-        return templates.TemplateResponse(request, "repo.html", {
-            "username": username,
-            "repo_name": repo_name,
-            "error": "Repository does not exist",
-            "user": current_user
-        })
-
-    return templates.TemplateResponse(request, "repo.html", {
+    # Branch list and the default branch's top-level files
+    refs, reader = repo
+    manifest = await run_in_threadpool(read_manifest, refs.gitmini_dir)
+    branches = manifest["refs"] if manifest else {}
+    branch = default_branch({name: commit for name, commit in branches.items() if commit})
+    context = {
         "username": username,
-        "repo_name": repo_entry["name"],
-        "user": current_user
-    })
+        "repo_name": repo_name,
+        "user": current_user,
+        "branches": sorted(branches),
+        "branch": branch,
+        "manifest": manifest
+    }
+    if branch:
+        try:
+            head = reader.commit(branches[branch])
+            context["entries"] = reader.tree(head["tree"])
+            context["commit"] = {"hash": branches[branch], **head}
+        except ObjectNotFound:
+            pass
+
+    return render(request, "repo.html", context, items=len(context.get("entries", ())))
@@ -1,18 +1,16 @@
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.templating import templates
 from app.utils import (
-    load_users,
-    save_users,
+    create_user,
     normalize_username,
     is_invalid_username,
     is_invalid_password,
-    hash_password,
+    hash_password_async,
     get_current_user,
 )
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/signup", response_class=HTMLResponse)
 async def signup_page(request: Request):
@@ -40,19 +38,11 @@ async def signup(
         })
 
     normalized = normalize_username(username)
-    users = load_users()
 
-    if normalized in users:
+    if not create_user(normalized, await hash_password_async(password)):
         return templates.TemplateResponse(request, "signup.html", {
             "error": "Username already exists.",
             "user": user
         })
 
-    users[normalized] = {
-        "password_hash": hash_password(password),
-        "repos": [],
-        "api_keys": []
-    }
-
-    save_users(users)
     return RedirectResponse("/login", status_code=302)
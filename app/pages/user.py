@@ -1,22 +1,39 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+from app.templating import templates, render
+from app.page_cache import cached_page
+from app.gitmini.manifest import read_manifest
 from app.utils import (
-    load_users,
+    get_user,
     normalize_username,
-    get_current_user
+    get_current_user,
+    get_repo_root
 )
+import os
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+def with_manifests(username: str, repos: list[dict]) -> list[dict]:
+    """Repo entries plus branch count and last push time from each repo's manifest."""
+    listed = []
+    for repo in repos:
+        manifest = read_manifest(os.path.join(get_repo_root(), username, repo["name"], ".gitmini"))
+        listed.append({
+            **repo,
+            "branches": len(manifest["refs"]) if manifest else 0,
+            "last_pushed_at": manifest["last_pushed_at"] if manifest else None
+        })
+    return listed
 
 @router.get("/{username}", response_class=HTMLResponse)
+@cached_page
 async def user_profile(request: Request, username: str):
     current_user = get_current_user(request)
     username = normalize_username(username)
-    users = load_users()
+    user_data = get_user(username)
 
-    if username not in users:
+    if user_data is None:
         return templates.TemplateResponse(request, "user.html", {
             "error": "User does not exist",
             "username": username,
@@ -24,9 +41,10 @@ async def user_profile(request: Request, username: str):
             "user": current_user
         })
 
-    repos = sorted(users[username]["repos"], key=lambda r: r["created_at"], reverse=True)
-    return templates.TemplateResponse(request, "user.html", {
+    repos = sorted(user_data["repos"], key=lambda r: r["created_at"], reverse=True)
+    repos = await run_in_threadpool(with_manifests, username, repos)
+    return render(request, "user.html", {
         "username": username,
         "repos": repos,
         "user": current_user
-    })
+    }, items=len(repos))
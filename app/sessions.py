@@ -0,0 +1,155 @@
+"""
+Browser login sessions.
+
+The session cookie is a timestamped signature over
+{"u": username, "sid": session id, "t": issue time, "k": password key}.
+The server enforces the lifetime (SESSION_TTL) itself, whatever max_age the
+browser was given. Sessions slide: once a cookie is past half its lifetime,
+renewal() re-signs the same payload and the response carries the fresh
+cookie, so active users stay logged in. "k" is an HMAC of the user's password
+hash, so changing the password invalidates every session issued before, in
+every worker.
+
+A validated cookie is kept in an LRU (cookie -> username and user record) until
+it expires. Identifying the viewer of a page is then a dictionary lookup, with
+no signature check and no storage read. Entries are dropped the moment they
+become wrong in this process:
+
+- invalidate_user(): the user's record changed (repos, keys), re-read on next use
+- revoke(): one session ends (logout), including every renewed copy of its
+  cookie; the id stays revoked until any cookie carrying it would have
+  expired, however many other sessions are revoked
+- revoke_user(): every session of the user ends (e.g. password change)
+
+Revocations are kept in memory, like the "memory" CLI auth state: other worker
+processes only notice them through the password key or session expiry.
+"""
+import os, sys, time, hmac, hashlib, secrets, threading
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from app.ttl_store import TTLStore
+
+SESSION_TTL = int(os.getenv("GITMINIHUB_SESSION_TTL", str(7 * 24 * 3600)))
+SESSION_CACHE_ENTRIES = int(os.getenv("GITMINIHUB_SESSION_CACHE_ENTRIES", "4096"))
+
+
+class SessionStore:
+    def __init__(self, secret: str, load_user, ttl: int = SESSION_TTL, max_entries: int = SESSION_CACHE_ENTRIES, clock=time.time):
+        self.secret = secret.encode()
+        self.load_user = load_user
+        self.ttl = ttl
+        self.clock = clock
+        self.serializer = URLSafeTimedSerializer(secret, salt="session")
+        # cookie -> {"username", "user", "sid", "generation", "expires_at"}
+        self._cache = TTLStore(max_entries, lambda e: e["expires_at"], clock)
+        # sid -> {"expires_at"}; never evicted, only expired (no cookie with the sid can outlive it)
+        self._revoked = TTLStore(sys.maxsize, lambda r: r["expires_at"], clock)
+        # username -> time before which every session is revoked
+        self._revoked_before: dict[str, float] = {}
+        # username -> bumped whenever cached entries for the user go stale
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def password_key(self, user_data: dict | None) -> str:
+        password_hash = (user_data or {}).get("password_hash", "")
+        return hmac.new(self.secret, password_hash.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def create(self, username: str, user_data: dict | None = None) -> str:
+        """Sign a new session cookie for username."""
+        if user_data is None:
+            user_data = self.load_user(username)
+        return self.serializer.dumps({
+            "u": username,
+            "sid": secrets.token_urlsafe(16),
+            "t": self.clock(),
+            "k": self.password_key(user_data)
+        })
+
+    def resolve(self, cookie: str | None) -> dict | None:
+        """The cached entry for a valid session cookie, else None."""
+        if not cookie:
+            return None
+        entry = self._cache.get(cookie)
+        if (entry is not None and entry["generation"] == self._generations.get(entry["username"], 0)
+                # Renewed cookies share a sid: revoking one must reach the others already cached
+                and entry["sid"] not in self._revoked):
+            with self._lock:
+                self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+        entry = self._validate(cookie)
+        if entry is None:
+            with self._lock:
+                self.rejected += 1
+            self._cache.pop(cookie, None)
+            return None
+        self._cache[cookie] = entry
+        return entry
+
+    def _validate(self, cookie: str) -> dict | None:
+        try:
+            data, signed_at = self.serializer.loads(cookie, max_age=self.ttl, return_timestamp=True)
+            username, sid, issued, key = data["u"], data["sid"], data["t"], data["k"]
+        except (BadSignature, TypeError, KeyError):
+            return None
+        if sid in self._revoked or issued < self._revoked_before.get(username, 0):
+            return None
+        generation = self._generations.get(username, 0)
+        user_data = self.load_user(username)
+        if user_data is None or not hmac.compare_digest(key, self.password_key(user_data)):
+            return None
+        return {
+            "username": username,
+            "user": user_data,
+            "sid": sid,
+            "payload": data,
+            "generation": generation,
+            "expires_at": signed_at.timestamp() + self.ttl
+        }
+
+    def renewal(self, cookie: str | None) -> str | None:
+        """A re-signed cookie for a valid session past half its lifetime, else None."""
+        entry = self.resolve(cookie)
+        if entry is None or entry["expires_at"] - self.clock() > self.ttl / 2:
+            return None
+        return self.serializer.dumps(entry["payload"])
+
+    def invalidate_user(self, username: str):
+        """The user's record changed: cached entries are re-validated on next use."""
+        with self._lock:
+            self._generations[username] = self._generations.get(username, 0) + 1
+
+    def revoke(self, cookie: str | None):
+        """End the session a cookie belongs to."""
+        entry = self.resolve(cookie)
+        if entry is None:
+            return
+        # Renewed cookies carry the same sid and may expire later than this one
+        self._revoked[entry["sid"]] = {"expires_at": self.clock() + self.ttl}
+        self._cache.pop(cookie, None)
+
+    def revoke_user(self, username: str):
+        """End every session of username issued up to now."""
+        with self._lock:
+            self._revoked_before[username] = self.clock()
+        self.invalidate_user(username)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._revoked.clear()
+            self._revoked_before.clear()
+            self._generations.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "cache": self._cache.metrics(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,253 @@
+"""
+State behind the CLI login flow: pending login sessions (one-shot tokens with
+a TTL) and sliding-window rate-limit counters.
+
+The "memory" engine keeps both in TTLStores inside the process, which is only
+correct with a single worker. The "sqlite" engine keeps them in a small SQLite
+database (WAL mode) that every worker on the host opens. Every check-then-write
+runs inside one transaction, so all workers see the same sessions and limits.
+"""
+import os, time, sqlite3, threading
+from contextlib import contextmanager
+from collections import deque
+from datetime import datetime, UTC
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cli_sessions (
+    token TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    username TEXT,
+    raw_api_key TEXT,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS cli_sessions_expires_at ON cli_sessions(expires_at);
+CREATE TABLE IF NOT EXISTS rate_hits (
+    key TEXT NOT NULL,
+    at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rate_hits_key ON rate_hits(key, at);
+CREATE INDEX IF NOT EXISTS rate_hits_expires_at ON rate_hits(expires_at);
+"""
+
+
+class AuthStateBackend:
+    """
+    Interface for CLI login state.
+
+    Sessions have the shape {"expires_at": datetime, "username", "raw_api_key", "completed"}.
+    Expired sessions are never returned. Rate limits count hits per key over the last window seconds.
+    """
+
+    def create_session(self, token: str, expires_at: datetime, max_active: int) -> bool:
+        """Start a pending session. Returns False if max_active sessions are already live."""
+        raise NotImplementedError
+
+    def get_session(self, token: str) -> dict | None:
+        raise NotImplementedError
+
+    def complete_session(self, token: str, username: str, raw_api_key: str) -> bool:
+        """Attach the login result. Returns False if the session is gone."""
+        raise NotImplementedError
+
+    def take_session(self, token: str) -> dict | None:
+        """Remove and return a completed session. Only one caller ever gets it."""
+        raise NotImplementedError
+
+    def purge(self):
+        """Drop expired sessions and rate-limit hits."""
+        raise NotImplementedError
+
+    def record_hit(self, key: str, window: float, limit: int):
+        """Count one hit for key. Only the latest limit hits within window are kept."""
+        raise NotImplementedError
+
+    def count_hits(self, key: str, window: float) -> int:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def metrics(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryAuthState(AuthStateBackend):
+    """Per-process state in TTLStores (sessions, and hit timestamps per key)."""
+
+    def __init__(self, sessions, hits):
+        self.sessions = sessions
+        self.hits = hits
+
+    def create_session(self, token: str, expires_at: datetime, max_active: int) -> bool:
+        self.sessions.purge()
+        if len(self.sessions) >= max_active:
+            return False
+        self.sessions[token] = {"expires_at": expires_at, "username": None, "raw_api_key": None, "completed": False}
+        return True
+
+    def get_session(self, token: str) -> dict | None:
+        session = self.sessions.get(token)
+        return dict(session) if session is not None else None
+
+    def complete_session(self, token: str, username: str, raw_api_key: str) -> bool:
+        session = self.sessions.get(token)
+        if session is None:
+            return False
+        session.update(username=username, raw_api_key=raw_api_key, completed=True)
+        return True
+
+    def take_session(self, token: str) -> dict | None:
+        session = self.sessions.get(token)
+        if session is None or not session["completed"]:
+            return None
+        del self.sessions[token]
+        return session
+
+    def purge(self):
+        self.sessions.purge()
+        self.hits.purge()
+
+    def record_hit(self, key: str, window: float, limit: int):
+        now = time.time()
+        entry = self.hits.get(key)
+        if entry is None:
+            entry = {"hits": deque(maxlen=limit)}
+        entry["hits"].append(now)
+        entry["expires_at"] = now + window
+        # Re-set so the store sees the new deadline and recency
+        self.hits[key] = entry
+
+    def count_hits(self, key: str, window: float) -> int:
+        entry = self.hits.get(key)
+        if entry is None:
+            return 0
+        since = time.time() - window
+        return sum(1 for at in entry["hits"] if at > since)
+
+    def clear(self):
+        self.sessions.clear()
+        self.hits.clear()
+
+    def metrics(self) -> dict:
+        return {"engine": "memory", "cli_sessions": self.sessions.metrics(), "rate_limit_keys": self.hits.metrics()}
+
+
+class SqliteAuthState(AuthStateBackend):
+    """State shared by every worker process that opens the same database file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+        # Holds API keys until the CLI collects them
+        os.chmod(path, 0o600)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the database lock up front, so check-then-write is atomic across workers."""
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    def _session(self, row: sqlite3.Row | None) -> dict | None:
+        if row is None:
+            return None
+        return {
+            "expires_at": datetime.fromtimestamp(row["expires_at"], UTC),
+            "username": row["username"],
+            "raw_api_key": row["raw_api_key"],
+            "completed": bool(row["completed"])
+        }
+
+    def create_session(self, token: str, expires_at: datetime, max_active: int) -> bool:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM cli_sessions WHERE expires_at <= ?", (time.time(),))
+            (active,) = conn.execute("SELECT COUNT(*) FROM cli_sessions").fetchone()
+            if active >= max_active:
+                return False
+            conn.execute("INSERT INTO cli_sessions (token, expires_at) VALUES (?, ?)", (token, expires_at.timestamp()))
+            return True
+
+    def get_session(self, token: str) -> dict | None:
+        row = self._connect().execute(
+            "SELECT * FROM cli_sessions WHERE token = ? AND expires_at > ?", (token, time.time())
+        ).fetchone()
+        return self._session(row)
+
+    def complete_session(self, token: str, username: str, raw_api_key: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE cli_sessions SET username = ?, raw_api_key = ?, completed = 1 WHERE token = ? AND expires_at > ?",
+                (username, raw_api_key, token, time.time())
+            )
+            return cursor.rowcount == 1
+
+    def take_session(self, token: str) -> dict | None:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "DELETE FROM cli_sessions WHERE token = ? AND completed = 1 AND expires_at > ? RETURNING *",
+                (token, time.time())
+            ).fetchone()
+            return self._session(row)
+
+    def purge(self):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM cli_sessions WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM rate_hits WHERE expires_at <= ?", (now,))
+
+    def record_hit(self, key: str, window: float, limit: int):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM rate_hits WHERE expires_at <= ?", (now,))
+            conn.execute("INSERT INTO rate_hits (key, at, expires_at) VALUES (?, ?, ?)", (key, now, now + window))
+            conn.execute(
+                "DELETE FROM rate_hits WHERE key = ? AND rowid NOT IN "
+                "(SELECT rowid FROM rate_hits WHERE key = ? ORDER BY at DESC LIMIT ?)",
+                (key, key, limit)
+            )
+
+    def count_hits(self, key: str, window: float) -> int:
+        (count,) = self._connect().execute(
+            "SELECT COUNT(*) FROM rate_hits WHERE key = ? AND at > ?", (key, time.time() - window)
+        ).fetchone()
+        return count
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM cli_sessions")
+            conn.execute("DELETE FROM rate_hits")
+
+    def metrics(self) -> dict:
+        conn = self._connect()
+        now = time.time()
+        (sessions,) = conn.execute("SELECT COUNT(*) FROM cli_sessions WHERE expires_at > ?", (now,)).fetchone()
+        (keys,) = conn.execute("SELECT COUNT(DISTINCT key) FROM rate_hits WHERE expires_at > ?", (now,)).fetchone()
+        return {"engine": "sqlite", "cli_sessions": {"entries": sessions}, "rate_limit_keys": {"entries": keys}}
+
+
+_sqlite_states: dict[str, SqliteAuthState] = {}
+_sqlite_states_lock = threading.Lock()
+
+
+def get_sqlite_auth_state(path: str) -> SqliteAuthState:
+    """Return the process-wide SqliteAuthState for a database path."""
+    with _sqlite_states_lock:
+        state = _sqlite_states.get(path)
+        if state is None:
+            state = _sqlite_states[path] = SqliteAuthState(path)
+        return state
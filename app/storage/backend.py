@@ -0,0 +1,133 @@
+import time, threading
+from datetime import datetime, UTC
+
+# How often buffered API-key last-used times are written back
+KEY_USAGE_FLUSH_INTERVAL = 60  # seconds
+
+
+class StorageBackend:
+    """
+    Interface for the users / repos / API keys store.
+
+    User records keep the users.json shape:
+        {"password_hash": str, "repos": [{"name", "created_at"}], "api_keys": [str]}
+    The granular write methods let engines persist a single row instead of
+    rewriting every user.
+    """
+
+    def __init__(self):
+        self._pending_key_usage: dict[str, str] = {}
+        self._key_usage_lock = threading.Lock()
+        self._last_key_usage_flush = time.monotonic()
+
+    # Whole-database access, kept for callers that still work on the users dict
+    def load_all(self) -> dict:
+        raise NotImplementedError
+
+    def save_all(self, users: dict):
+        raise NotImplementedError
+
+    # Reads
+    def get_user(self, username: str) -> dict | None:
+        raise NotImplementedError
+
+    def has_user(self, username: str) -> bool:
+        return self.get_user(username) is not None
+
+    def usernames(self) -> list[str]:
+        raise NotImplementedError
+
+    def all_repos(self) -> list[dict]:
+        """Every repo as {"username", "name", "created_at"}, newest first."""
+        raise NotImplementedError
+
+    def recent_repos(self, after: str | None, limit: int) -> tuple[list[dict], str | None]:
+        """
+        One page of the global feed: up to limit repos created before after,
+        newest first, and the cursor for the next page (None on the last one).
+        """
+        raise NotImplementedError
+
+    def repo_owners(self, repo_name: str) -> set[str]:
+        """Usernames that have a repo with this name. Served from an index, not a scan."""
+        raise NotImplementedError
+
+    def search(self, kind: str, query: str, offset: int, limit: int) -> tuple[list[dict], int]:
+        """
+        Prefix and fuzzy matches for query over "users" or "repos": one page of
+        results ({"username"} or {"username", "name", "created_at"}) and the total.
+        """
+        raise NotImplementedError
+
+    def version(self):
+        """Opaque token that changes whenever users or repos change, in any process."""
+        raise NotImplementedError
+
+    # Writes
+    def create_user(self, username: str, password_hash: str) -> bool:
+        """Insert a new user. Returns False if the username is taken."""
+        raise NotImplementedError
+
+    def add_repo(self, username: str, repo_entry: dict) -> str | None:
+        """Attach a repo entry to a user. Returns an error message on failure."""
+        raise NotImplementedError
+
+    def remove_repo(self, username: str, repo_name: str):
+        raise NotImplementedError
+
+    def add_api_key(self, username: str, key_hash: str):
+        raise NotImplementedError
+
+    def revoke_api_key(self, username: str, key_hash: str):
+        raise NotImplementedError
+
+    # API-key index
+    def find_api_key(self, key_hash: str) -> dict | None:
+        """Return {"username", "created_at", "last_used"} for an issued key hash."""
+        raise NotImplementedError
+
+    def touch_api_key(self, key_hash: str):
+        """Record that a key was used. Buffered and written back in batches."""
+        with self._key_usage_lock:
+            self._pending_key_usage[key_hash] = datetime.now(UTC).isoformat()
+            due = time.monotonic() - self._last_key_usage_flush >= KEY_USAGE_FLUSH_INTERVAL
+        if due:
+            self.flush_api_key_usage()
+
+    def flush_api_key_usage(self):
+        with self._key_usage_lock:
+            pending = self._pending_key_usage
+            self._pending_key_usage = {}
+            self._last_key_usage_flush = time.monotonic()
+        if pending:
+            self._write_key_usage(pending)
+
+    def _pending_last_used(self, key_hash: str) -> str | None:
+        with self._key_usage_lock:
+            return self._pending_key_usage.get(key_hash)
+
+    def _write_key_usage(self, usage: dict[str, str]):
+        """Persist {key_hash: last_used} for keys that still exist."""
+        raise NotImplementedError
+
+
+_backends: dict[tuple, StorageBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(engine: str, path: str, **options) -> StorageBackend:
+    """Return the process-wide backend for an engine name, path and options."""
+    key = (engine, path, tuple(sorted(options.items())))
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            if engine == "json":
+                from app.storage.json_store import UserStore
+                backend = UserStore(path, **options)
+            elif engine == "sqlite":
+                from app.storage.sqlite_store import SqliteStore
+                backend = SqliteStore(path, **options)
+            else:
+                raise ValueError(f"Unknown storage engine: {engine}")
+            _backends[key] = backend
+        return backend
@@ -0,0 +1,53 @@
+from bisect import bisect_left, insort
+
+
+class RepoFeed:
+    """
+    Every repo ordered by creation time, kept sorted as repos come and go.
+
+    Pages are read newest first from a cursor (the created_at of the last repo
+    on the previous page) with a binary search, so serving one costs
+    O(log R + page size) however many repos exist.
+    """
+
+    def __init__(self, repos=()):
+        self._created: dict[tuple[str, str], str] = {}
+        for repo in repos:
+            self._created[(repo["username"], repo["name"])] = repo["created_at"]
+        self._keys = sorted((created_at, username, name) for (username, name), created_at in self._created.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, username: str, name: str, created_at: str):
+        self.remove(username, name)
+        self._created[(username, name)] = created_at
+        insort(self._keys, (created_at, username, name))
+
+    def remove(self, username: str, name: str):
+        created_at = self._created.pop((username, name), None)
+        if created_at is None:
+            return
+        key = (created_at, username, name)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def page(self, after: str | None, limit: int) -> tuple[list[dict], str | None]:
+        """
+        Up to limit repos created before after, newest first, and the cursor for
+        the next page (None on the last one). Repos sharing the last timestamp are
+        kept together so the cursor never splits them across pages.
+        """
+        end = len(self._keys) if after is None else bisect_left(self._keys, (after,))
+        i = end
+        repos = []
+        while i > 0 and (len(repos) < limit or (repos and self._keys[i - 1][0] == repos[-1]["created_at"])):
+            i -= 1
+            created_at, username, name = self._keys[i]
+            repos.append({"username": username, "name": name, "created_at": created_at})
+        next_cursor = repos[-1]["created_at"] if repos and i > 0 else None
+        return repos, next_cursor
+
+    def newest_first(self) -> list[dict]:
+        return self.page(None, len(self._keys))[0]
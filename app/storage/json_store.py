@@ -0,0 +1,436 @@
+import os, json, tempfile, threading
+from datetime import datetime, UTC
+from contextlib import contextmanager
+from app.storage.backend import StorageBackend
+from app.storage.feed import RepoFeed
+from app.storage.search import SearchIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: file locks are no-ops, only in-process locks serialize writers
+    fcntl = None
+
+# In journal mode, fold the journal back into users.json after this many ops
+JOURNAL_COMPACT_EVERY = 500
+
+
+class UserStore(StorageBackend):
+    """
+    users.json backend with an in-process cache.
+
+    The parsed file is kept in memory and only re-read when the file's stat
+    signature changes (another process wrote it) or when this process saves.
+    Per-user lookups copy a single record instead of the whole database.
+
+    Writes are read-modify-write under an exclusive lock on "<path>.lock" and
+    are published with write-to-temp + fsync + rename, so concurrent workers
+    never lose updates or observe a half-written file. With journal=True a
+    single change is appended to "<path>.journal" instead of re-serializing
+    every user; the journal is folded back into users.json periodically.
+
+    Repo names are indexed in memory (name -> owners), as are API keys
+    (key hash -> username). A RepoFeed keeps every repo sorted by creation
+    time for the homepage, and a SearchIndex serves user and repo search. Key created and
+    last-used times live in the small "<path>.keys" sidecar so recording a
+    key's use never rewrites users.json.
+    """
+
+    def __init__(self, path: str, journal: bool = False):
+        super().__init__()
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.journal_path = path + ".journal"
+        self.keys_path = path + ".keys"
+        self.journal = journal
+        self._lock = threading.RLock()
+        self._users: dict = {}
+        self._signature = None
+        self._journal_signature = None
+        self._journal_offset = 0
+        self._journal_ops = 0
+        self._loaded = False
+        self._key_index: dict[str, str] = {}
+        self._repo_index: dict[str, set[str]] = {}
+        self._feed = RepoFeed()
+        self._search = SearchIndex()
+        self._key_meta: dict[str, dict] = {}
+        self._key_meta_signature = None
+
+    # -- reading -----------------------------------------------------------
+
+    def _stat_signature(self, path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_ctime_ns)
+
+    def _read_file(self) -> dict:
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _replay_journal(self):
+        """Apply journal entries appended since the last replay."""
+        signature = self._stat_signature(self.journal_path)
+        if signature == self._journal_signature:
+            return
+        self._journal_signature = signature
+        if signature is None:
+            self._journal_offset = 0
+            return
+
+        with open(self.journal_path, "rb") as f:
+            if self._journal_offset == 0:
+                # Only trust a journal that was started against this users.json
+                header = f.readline()
+                base = self._signature
+                if not header.endswith(b"\n") or base is None or json.loads(header).get("base") != list(base[:3]):
+                    return
+                self._journal_offset = f.tell()
+                self._journal_ops = 0
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write from a crashed process; stop before it
+                    break
+                self._apply(json.loads(line))
+                self._journal_offset += len(line)
+                self._journal_ops += 1
+
+    def _refresh(self):
+        signature = self._stat_signature(self.path)
+        if not self._loaded or signature != self._signature:
+            self._users = self._read_file() if signature else {}
+            self._signature = signature
+            self._journal_signature = None
+            self._journal_offset = 0
+            self._journal_ops = 0
+            self._loaded = True
+            self._rebuild_indexes()
+        self._replay_journal()
+
+    def _apply(self, op: dict):
+        """Apply an op to the cached users and keep the in-memory indexes in step."""
+        changed, result = apply_op(self._users, op)
+        if changed:
+            if op["op"] == "add_api_key":
+                self._key_index[op["key_hash"]] = op["username"]
+            elif op["op"] == "revoke_api_key":
+                self._key_index.pop(op["key_hash"], None)
+            elif op["op"] == "create_user":
+                self._search.add_user(op["username"])
+            elif op["op"] == "add_repo":
+                self._repo_index.setdefault(op["repo"]["name"], set()).add(op["username"])
+                self._feed.add(op["username"], op["repo"]["name"], op["repo"]["created_at"])
+                self._search.add_repo(op["username"], op["repo"]["name"], op["repo"]["created_at"])
+            elif op["op"] == "remove_repo":
+                owners = self._repo_index.get(op["name"], set())
+                owners.discard(op["username"])
+                if not owners:
+                    self._repo_index.pop(op["name"], None)
+                self._feed.remove(op["username"], op["name"])
+                self._search.remove_repo(op["username"], op["name"])
+        return changed, result
+
+    def _rebuild_indexes(self):
+        self._key_index = {}
+        self._repo_index = {}
+        feed = []
+        for username, user_data in self._users.items():
+            if not isinstance(user_data, dict):
+                continue
+            for key_hash in user_data.get("api_keys", []):
+                self._key_index[key_hash] = username
+            for repo in user_data.get("repos", []):
+                name = repo["name"] if isinstance(repo, dict) else repo
+                self._repo_index.setdefault(name, set()).add(username)
+                if isinstance(repo, dict):
+                    feed.append({"username": username, "name": name, "created_at": repo["created_at"]})
+        self._feed = RepoFeed(feed)
+        self._search = SearchIndex.build(self._users, feed)
+
+    def _snapshot(self) -> dict:
+        """Return the cached users dict, reloading it if the files changed."""
+        with self._lock:
+            self._refresh()
+            return self._users
+
+    # -- writing -----------------------------------------------------------
+
+    @contextmanager
+    def _locked(self):
+        """Hold the in-process lock and, where supported, the cross-process file lock."""
+        with self._lock, file_lock(self.lock_path):
+            yield
+
+    def _publish(self, users: dict):
+        """Atomically replace users.json with users."""
+        write_json_atomic(self.path, users, indent=2)
+        self._signature = self._stat_signature(self.path)
+        self._journal_offset = 0
+        self._journal_ops = 0
+        if self.journal:
+            self._reset_journal()
+
+    def _reset_journal(self):
+        """Start an empty journal bound to the current users.json."""
+        header = json.dumps({"base": list(self._signature[:3])}) + "\n"
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".journal-", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._journal_signature = self._stat_signature(self.journal_path)
+        self._journal_offset = len(header.encode())
+        self._journal_ops = 0
+
+    def _append_journal(self, op: dict):
+        if self._journal_offset == 0:
+            # No journal bound to this users.json yet
+            self._reset_journal()
+        line = json.dumps(op) + "\n"
+        with open(self.journal_path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_signature = self._stat_signature(self.journal_path)
+        self._journal_offset += len(line.encode())
+        self._journal_ops += 1
+        if self._journal_ops >= JOURNAL_COMPACT_EVERY:
+            self._publish(self._users)
+
+    def _mutate(self, op: dict):
+        """Read-modify-write one op under the file lock and persist it."""
+        with self._locked():
+            self._refresh()
+            try:
+                changed, result = self._apply(op)
+                if changed:
+                    if self.journal:
+                        self._append_journal(op)
+                    else:
+                        self._publish(self._users)
+            except BaseException:
+                # The cache may hold a change that never reached disk
+                self._loaded = False
+                raise
+            return result
+
+    def compact(self):
+        """Fold the journal into users.json."""
+        with self._locked():
+            self._refresh()
+            self._publish(self._users)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    # -- StorageBackend ----------------------------------------------------
+
+    def load_all(self) -> dict:
+        """Return a private copy of every user, safe for the caller to mutate."""
+        return json.loads(json.dumps(self._snapshot()))
+
+    def view(self) -> dict:
+        """Return the cached users dict itself. Callers must not mutate it."""
+        return self._snapshot()
+
+    def save_all(self, users: dict):
+        with self._locked():
+            self._users = json.loads(json.dumps(users))
+            self._loaded = True
+            self._rebuild_indexes()
+            self._publish(self._users)
+
+    def search(self, kind: str, query: str, offset: int, limit: int) -> tuple[list[dict], int]:
+        with self._lock:
+            self._refresh()
+            return self._search.search(kind, query, offset, limit)
+
+    def version(self):
+        with self._lock:
+            self._refresh()
+            return (self._signature, self._journal_signature)
+
+    def get_user(self, username: str) -> dict | None:
+        with self._lock:
+            user_data = self._snapshot().get(username)
+            return json.loads(json.dumps(user_data)) if user_data is not None else None
+
+    def has_user(self, username: str) -> bool:
+        return username in self._snapshot()
+
+    def usernames(self) -> list[str]:
+        with self._lock:
+            return list(self._snapshot())
+
+    def all_repos(self) -> list[dict]:
+        with self._lock:
+            self._refresh()
+            return self._feed.newest_first()
+
+    def recent_repos(self, after: str | None, limit: int) -> tuple[list[dict], str | None]:
+        with self._lock:
+            self._refresh()
+            return self._feed.page(after, limit)
+
+    def repo_owners(self, repo_name: str) -> set[str]:
+        with self._lock:
+            self._refresh()
+            return set(self._repo_index.get(repo_name, ()))
+
+    def create_user(self, username: str, password_hash: str) -> bool:
+        return self._mutate({"op": "create_user", "username": username, "password_hash": password_hash})
+
+    def add_repo(self, username: str, repo_entry: dict) -> str | None:
+        return self._mutate({"op": "add_repo", "username": username, "repo": dict(repo_entry)})
+
+    def remove_repo(self, username: str, repo_name: str):
+        self._mutate({"op": "remove_repo", "username": username, "name": repo_name})
+
+    def add_api_key(self, username: str, key_hash: str):
+        self._mutate({"op": "add_api_key", "username": username, "key_hash": key_hash})
+        self._update_key_metadata({key_hash: {"created_at": datetime.now(UTC).isoformat()}})
+
+    def revoke_api_key(self, username: str, key_hash: str):
+        self._mutate({"op": "revoke_api_key", "username": username, "key_hash": key_hash})
+        self._update_key_metadata({key_hash: None})
+
+    def find_api_key(self, key_hash: str) -> dict | None:
+        with self._lock:
+            self._refresh()
+            username = self._key_index.get(key_hash)
+            if username is None:
+                return None
+            meta = self._key_metadata().get(key_hash, {})
+        return {
+            "username": username,
+            "created_at": meta.get("created_at"),
+            "last_used": self._pending_last_used(key_hash) or meta.get("last_used")
+        }
+
+    def _key_metadata(self) -> dict:
+        signature = self._stat_signature(self.keys_path)
+        if signature != self._key_meta_signature:
+            try:
+                with open(self.keys_path, "r") as f:
+                    self._key_meta = json.load(f)
+            except FileNotFoundError:
+                self._key_meta = {}
+            self._key_meta_signature = signature
+        return self._key_meta
+
+    def _update_key_metadata(self, updates: dict[str, dict | None]):
+        """Merge per-key fields into the sidecar; None drops a key."""
+        with self._locked():
+            self._refresh()
+            meta = {k: dict(v) for k, v in self._key_metadata().items() if k in self._key_index}
+            for key_hash, fields in updates.items():
+                if fields is None:
+                    meta.pop(key_hash, None)
+                elif key_hash in self._key_index:
+                    meta.setdefault(key_hash, {}).update(fields)
+            write_json_atomic(self.keys_path, meta)
+            self._key_meta = meta
+            self._key_meta_signature = self._stat_signature(self.keys_path)
+
+    def _write_key_usage(self, usage: dict[str, str]):
+        self._update_key_metadata({k: {"last_used": v} for k, v in usage.items()})
+
+
+def apply_op(users: dict, op: dict):
+    """
+    Apply one journal op to the users dict in place.
+    Returns (changed, result), where result is what the store method returns.
+    """
+    kind = op["op"]
+    username = op["username"]
+    user_data = users.get(username)
+
+    if kind == "create_user":
+        if user_data is not None:
+            return False, False
+        users[username] = {"password_hash": op["password_hash"], "repos": [], "api_keys": []}
+        return True, True
+
+    if not user_data:
+        return False, "User not found" if kind == "add_repo" else None
+
+    if kind == "add_repo":
+        if any(r["name"] == op["repo"]["name"] for r in user_data["repos"]):
+            return False, "Repository already exists"
+        user_data["repos"].append(dict(op["repo"]))
+        return True, None
+    if kind == "remove_repo":
+        repos = user_data.get("repos", [])
+        kept = [r for r in repos if r["name"] != op["name"]]
+        user_data["repos"] = kept
+        return len(kept) != len(repos), None
+    if kind == "add_api_key":
+        user_data.setdefault("api_keys", []).append(op["key_hash"])
+        return True, None
+    if kind == "revoke_api_key":
+        keys = user_data.get("api_keys", [])
+        if op["key_hash"] not in keys:
+            return False, None
+        keys.remove(op["key_hash"])
+        return True, None
+    raise ValueError(f"Unknown users journal op: {kind}")
+
+
+def write_json_atomic(path: str, data, indent: int | None = None):
+    """Write data as JSON to a temp file next to path, fsync it and rename it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + "-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(directory)
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """
+    Exclusive flock on path (created, with its directory, if missing), shared
+    by every worker process. Yields whether it was acquired: non-blocking
+    callers get False while another process holds it. Without fcntl nothing
+    is locked and it yields True.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as lock_file:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fsync_dir(path: str):
+    """Make a rename inside path durable. A no-op where directories can't be opened."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
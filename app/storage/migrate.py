@@ -0,0 +1,27 @@
+"""
+One-shot migration of users.json into the SQLite storage engine.
+
+    python -m app.storage.migrate app/data/users.json app/data/gitminihub.db
+
+Users, repos and API keys already present in the database are kept, so the
+migration can safely be re-run.
+"""
+import sys, json
+from app.storage.sqlite_store import SqliteStore
+
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    """Copy every user from json_path into db_path. Returns the number of users read."""
+    with open(json_path, "r") as f:
+        users = json.load(f)
+
+    SqliteStore(db_path).import_users(users)
+    return len(users)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python -m app.storage.migrate <users.json> <database.db>")
+        sys.exit(1)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} users into {sys.argv[2]}")
@@ -0,0 +1,177 @@
+"""
+In-memory search index over usernames and repo names.
+
+Prefix matches come from sorted arrays (binary search for the range, then
+slice the page out of it). Fuzzy matches come from a trigram index: a name
+matches when it shares at least half of the query's trigrams. Candidates are
+only drawn from the postings of the rarest trigrams (any match must contain
+at least one of them) and capped, so a query costs the same however many
+names share a common trigram.
+"""
+import math
+from itertools import chain, islice
+from bisect import bisect_left, insort
+
+# Share of the query's trigrams a fuzzy match must contain
+FUZZY_THRESHOLD = 0.5
+# Fuzzy candidates scored per query; beyond this, prefix matches are what the user wants anyway
+FUZZY_CANDIDATES = 100
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SortedKeys:
+    """Sorted (key, *payload) tuples, searched by key prefix."""
+
+    def __init__(self, rows=()):
+        self.rows = sorted(rows)
+
+    def add(self, row: tuple):
+        insort(self.rows, row)
+
+    def remove(self, row: tuple):
+        i = bisect_left(self.rows, row)
+        if i < len(self.rows) and self.rows[i] == row:
+            del self.rows[i]
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        start = bisect_left(self.rows, (prefix,))
+        end = bisect_left(self.rows, (prefix + "\uffff",), lo=start)
+        return start, end
+
+
+class TrigramIndex:
+    def __init__(self):
+        self.postings: dict[str, set] = {}
+
+    def add(self, text: str, item):
+        for gram in trigrams(text):
+            self.postings.setdefault(gram, set()).add(item)
+
+    def remove(self, text: str, item):
+        for gram in trigrams(text):
+            items = self.postings.get(gram)
+            if items is not None:
+                items.discard(item)
+                if not items:
+                    del self.postings[gram]
+
+    def matches(self, query: str, exclude=None) -> dict:
+        """
+        {item: score} for items sharing at least FUZZY_THRESHOLD of the query's trigrams.
+        exclude(item) drops candidates before they are scored.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return {}
+        needed = max(1, math.ceil(len(grams) * FUZZY_THRESHOLD))
+        # Rarest first: an item with `needed` shared trigrams must hold one of the first len - needed + 1
+        postings = sorted((self.postings.get(gram, frozenset()) for gram in grams), key=len)
+        candidates = chain.from_iterable(postings[:len(postings) - needed + 1])
+        if exclude is not None:
+            candidates = (item for item in candidates if not exclude(item))
+        scores = {}
+        for item in islice(candidates, FUZZY_CANDIDATES):
+            if item in scores:
+                continue
+            shared = sum(1 for items in postings if item in items)
+            if shared >= needed:
+                scores[item] = shared / len(grams)
+        return scores
+
+
+class SearchIndex:
+    """
+    Users are indexed by username, repos by name and by "owner/name"
+    (queries containing a slash search the latter).
+    """
+
+    def __init__(self):
+        self.users = SortedKeys()
+        self.repo_names = SortedKeys()
+        self.repo_paths = SortedKeys()
+        self.user_grams = TrigramIndex()
+        self.repo_grams = TrigramIndex()
+        self._repos: dict[tuple[str, str], str] = {}
+
+    @classmethod
+    def build(cls, usernames, repos) -> "SearchIndex":
+        """repos: iterable of {"username", "name", "created_at"}."""
+        index = cls()
+        usernames = list(usernames)
+        index.users = SortedKeys((u.lower(), u) for u in usernames)
+        for username in usernames:
+            index.user_grams.add(username.lower(), username)
+        names, paths = [], []
+        for repo in repos:
+            key = (repo["username"], repo["name"])
+            index._repos[key] = repo["created_at"]
+            names.append((repo["name"].lower(), *key))
+            paths.append((f"{repo['username']}/{repo['name']}".lower(), *key))
+            index.repo_grams.add(repo["name"].lower(), key)
+        index.repo_names = SortedKeys(names)
+        index.repo_paths = SortedKeys(paths)
+        return index
+
+    def add_user(self, username: str):
+        self.users.add((username.lower(), username))
+        self.user_grams.add(username.lower(), username)
+
+    def add_repo(self, username: str, name: str, created_at: str):
+        key = (username, name)
+        if key in self._repos:
+            return
+        self._repos[key] = created_at
+        self.repo_names.add((name.lower(), *key))
+        self.repo_paths.add((f"{username}/{name}".lower(), *key))
+        self.repo_grams.add(name.lower(), key)
+
+    def remove_repo(self, username: str, name: str):
+        key = (username, name)
+        if self._repos.pop(key, None) is None:
+            return
+        self.repo_names.remove((name.lower(), *key))
+        self.repo_paths.remove((f"{username}/{name}".lower(), *key))
+        self.repo_grams.remove(name.lower(), key)
+
+    def search(self, kind: str, query: str, offset: int, limit: int) -> tuple[list[dict], int]:
+        """
+        One page of results and the total match count. Prefix matches come first
+        (alphabetical), then fuzzy matches by score.
+        """
+        query = query.strip().lower()
+        if not query:
+            return [], 0
+        if kind == "users":
+            keys, grams = self.users, self.user_grams
+        elif "/" in query:
+            keys, grams = self.repo_paths, None
+        else:
+            keys, grams = self.repo_names, self.repo_grams
+
+        start, end = keys.prefix_range(query)
+        prefix_rows = keys.rows[start + offset:min(end, start + offset + limit)] if offset < end - start else []
+        results = [self._result(kind, row[1:]) for row in prefix_rows]
+
+        fuzzy = []
+        if grams is not None:
+            # Prefix matches are already listed
+            scores = grams.matches(query, exclude=lambda item: self._label(kind, item).lower().startswith(query))
+            fuzzy = sorted(scores, key=lambda item: (-scores[item], self._label(kind, item).lower()))
+        total = (end - start) + len(fuzzy)
+        if len(results) < limit:
+            fuzzy_offset = max(0, offset - (end - start))
+            for item in fuzzy[fuzzy_offset:fuzzy_offset + limit - len(results)]:
+                results.append(self._result(kind, item if kind == "repos" else (item,)))
+        return results, total
+
+    def _label(self, kind: str, item) -> str:
+        return item[1] if kind == "repos" else item
+
+    def _result(self, kind: str, payload: tuple) -> dict:
+        if kind == "users":
+            return {"username": payload[0]}
+        username, name = payload
+        return {"username": username, "name": name, "created_at": self._repos[(username, name)]}
@@ -0,0 +1,276 @@
+import json, sqlite3, threading
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from app.storage.backend import StorageBackend
+from app.storage.search import SearchIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS repos (
+    username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (username, name)
+);
+CREATE INDEX IF NOT EXISTS repos_created_at ON repos(created_at);
+CREATE INDEX IF NOT EXISTS repos_name ON repos(name);
+CREATE TABLE IF NOT EXISTS api_keys (
+    key_hash TEXT PRIMARY KEY,
+    username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    created_at TEXT NOT NULL,
+    last_used TEXT
+);
+CREATE INDEX IF NOT EXISTS api_keys_username ON api_keys(username);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+# Bump meta.generation on every user or repo change, so version() sees writes from any process
+GENERATION_TRIGGERS = "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_generation AFTER {event} ON {table}
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'generation';
+END;"""
+    for table in ("users", "repos") for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+# Columns of the users table; any other field of a user record lives in "extra"
+USER_COLUMNS = {"password_hash", "repos", "api_keys"}
+
+
+class SqliteStore(StorageBackend):
+    """
+    SQLite backend (WAL mode) with one row per user, repo and API key.
+
+    Each thread gets its own connection. Writes touch only the affected rows,
+    so their cost no longer depends on the number of users.
+
+    The search index lives in memory and is tagged with the generation it
+    reflects. This process's writes patch it in place; a generation it did
+    not see (another process wrote) makes the next search rebuild it.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._search: SearchIndex | None = None
+        self._search_generation = None
+        self._search_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA + GENERATION_TRIGGERS)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _build_user(self, conn: sqlite3.Connection, row: sqlite3.Row) -> dict:
+        user_data = json.loads(row["extra"])
+        user_data["password_hash"] = row["password_hash"]
+        user_data["repos"] = [
+            {"name": r["name"], "created_at": r["created_at"]}
+            for r in conn.execute(
+                "SELECT name, created_at FROM repos WHERE username = ? ORDER BY rowid",
+                (row["username"],)
+            )
+        ]
+        user_data["api_keys"] = [
+            r["key_hash"] for r in conn.execute(
+                "SELECT key_hash FROM api_keys WHERE username = ? ORDER BY rowid",
+                (row["username"],)
+            )
+        ]
+        return user_data
+
+    def load_all(self) -> dict:
+        conn = self._connect()
+        rows = conn.execute("SELECT * FROM users ORDER BY rowid").fetchall()
+        return {row["username"]: self._build_user(conn, row) for row in rows}
+
+    def save_all(self, users: dict):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM api_keys")
+            conn.execute("DELETE FROM repos")
+            conn.execute("DELETE FROM users")
+            for username, user_data in users.items():
+                insert_user(conn, username, user_data)
+
+    def import_users(self, users: dict):
+        """Insert users.json-shaped records, keeping rows that already exist."""
+        conn = self._connect()
+        with conn:
+            for username, user_data in users.items():
+                insert_user(conn, username, user_data)
+
+    def version(self):
+        return self._generation(self._connect())
+
+    def _generation(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    @contextmanager
+    def _tracked_write(self):
+        """Write transaction that records the generation before and after it, for _sync_search."""
+        conn = self._connect()
+        span = {}
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = self._generation(conn)
+            yield conn, span
+            span["before"], span["after"] = before, self._generation(conn)
+
+    def _sync_search(self, span: dict, change):
+        """Patch the search index with change(index) if it was current when the write began."""
+        with self._search_lock:
+            if self._search is None or span.get("before") != self._search_generation:
+                return
+            change(self._search)
+            self._search_generation = span["after"]
+
+    def search(self, kind: str, query: str, offset: int, limit: int) -> tuple[list[dict], int]:
+        generation = self.version()
+        with self._search_lock:
+            if self._search is None or generation != self._search_generation:
+                self._search = SearchIndex.build(self.usernames(), self.all_repos())
+                self._search_generation = generation
+            return self._search.search(kind, query, offset, limit)
+
+    def get_user(self, username: str) -> dict | None:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return self._build_user(conn, row) if row else None
+
+    def has_user(self, username: str) -> bool:
+        row = self._connect().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def usernames(self) -> list[str]:
+        return [r["username"] for r in self._connect().execute("SELECT username FROM users ORDER BY rowid")]
+
+    def all_repos(self) -> list[dict]:
+        rows = self._connect().execute(
+            "SELECT username, name, created_at FROM repos ORDER BY created_at DESC"
+        )
+        return [dict(r) for r in rows]
+
+    def recent_repos(self, after: str | None, limit: int) -> tuple[list[dict], str | None]:
+        conn = self._connect()
+        where, params = ("WHERE created_at < ?", (after,)) if after is not None else ("", ())
+        rows = [dict(r) for r in conn.execute(
+            f"SELECT username, name, created_at FROM repos {where} "
+            "ORDER BY created_at DESC, username DESC, name DESC LIMIT ?",
+            (*params, limit)
+        )]
+        if not rows:
+            return [], None
+        # Keep repos sharing the last timestamp on one page, so the cursor never splits them
+        last = rows[-1]["created_at"]
+        tied = [dict(r) for r in conn.execute(
+            "SELECT username, name, created_at FROM repos WHERE created_at = ? "
+            "ORDER BY username DESC, name DESC", (last,)
+        )]
+        repos = [r for r in rows if r["created_at"] != last] + tied
+        more = conn.execute("SELECT 1 FROM repos WHERE created_at < ? LIMIT 1", (last,)).fetchone()
+        return repos, last if more else None
+
+    def repo_owners(self, repo_name: str) -> set[str]:
+        rows = self._connect().execute("SELECT username FROM repos WHERE name = ?", (repo_name,))
+        return {r["username"] for r in rows}
+
+    def create_user(self, username: str, password_hash: str) -> bool:
+        with self._tracked_write() as (conn, span):
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)",
+                (username, password_hash)
+            )
+        if cur.rowcount == 1:
+            self._sync_search(span, lambda index: index.add_user(username))
+        return cur.rowcount == 1
+
+    def add_repo(self, username: str, repo_entry: dict) -> str | None:
+        with self._tracked_write() as (conn, span):
+            if not conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+                return "User not found"
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO repos (username, name, created_at) VALUES (?, ?, ?)",
+                (username, repo_entry["name"], repo_entry["created_at"])
+            )
+        if cur.rowcount == 0:
+            return "Repository already exists"
+        self._sync_search(span, lambda index: index.add_repo(username, repo_entry["name"], repo_entry["created_at"]))
+        return None
+
+    def remove_repo(self, username: str, repo_name: str):
+        with self._tracked_write() as (conn, span):
+            conn.execute("DELETE FROM repos WHERE username = ? AND name = ?", (username, repo_name))
+        self._sync_search(span, lambda index: index.remove_repo(username, repo_name))
+
+    def add_api_key(self, username: str, key_hash: str):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO api_keys (key_hash, username, created_at) "
+                "SELECT ?, username, ? FROM users WHERE username = ?",
+                (key_hash, datetime.now(UTC).isoformat(), username)
+            )
+
+    def revoke_api_key(self, username: str, key_hash: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM api_keys WHERE key_hash = ? AND username = ?", (key_hash, username))
+
+    def find_api_key(self, key_hash: str) -> dict | None:
+        row = self._connect().execute(
+            "SELECT username, created_at, last_used FROM api_keys WHERE key_hash = ?", (key_hash,)
+        ).fetchone()
+        if not row:
+            return None
+        record = dict(row)
+        record["last_used"] = self._pending_last_used(key_hash) or record["last_used"]
+        return record
+
+    def _write_key_usage(self, usage: dict[str, str]):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "UPDATE api_keys SET last_used = ? WHERE key_hash = ?",
+                [(last_used, key_hash) for key_hash, last_used in usage.items()]
+            )
+
+
+def insert_user(conn: sqlite3.Connection, username: str, user_data: dict):
+    """Insert one users.json-shaped record. Existing rows are left untouched."""
+    extra = {k: v for k, v in user_data.items() if k not in USER_COLUMNS}
+    conn.execute(
+        "INSERT OR IGNORE INTO users (username, password_hash, extra) VALUES (?, ?, ?)",
+        (username, user_data.get("password_hash", ""), json.dumps(extra))
+    )
+    for repo in user_data.get("repos", []):
+        # Early users.json files stored bare repo names
+        if isinstance(repo, str):
+            repo = {"name": repo, "created_at": ""}
+        conn.execute(
+            "INSERT OR IGNORE INTO repos (username, name, created_at) VALUES (?, ?, ?)",
+            (username, repo["name"], repo.get("created_at", ""))
+        )
+    for key_hash in user_data.get("api_keys", []):
+        conn.execute(
+            "INSERT OR IGNORE INTO api_keys (key_hash, username, created_at) VALUES (?, ?, ?)",
+            (key_hash, username, "")
+        )
@@ -0,0 +1,51 @@
+"""
+The one Jinja environment every page renders with.
+
+Compiled templates are kept as bytecode under GITMINIHUB_TEMPLATE_CACHE, so a
+fresh worker loads them instead of parsing and compiling every template
+again. Jinja checks whether a template file changed on every lookup unless
+auto_reload is off; it is off by default (production) and turned back on with
+GITMINIHUB_TEMPLATE_RELOAD=1 while editing templates.
+
+Listing pages go through render(): a short list is rendered into one body
+(which the page cache can keep), a long one is streamed with
+Template.generate() so the first bytes go out before the whole list is
+rendered.
+"""
+import os
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+
+TEMPLATE_DIR = "app/templates"
+TEMPLATE_CACHE_DIR = os.getenv("GITMINIHUB_TEMPLATE_CACHE", "app/data/template_cache")
+TEMPLATE_AUTO_RELOAD = os.getenv("GITMINIHUB_TEMPLATE_RELOAD", "0") == "1"
+# Lists longer than this are streamed
+STREAM_LIST_THRESHOLD = int(os.getenv("GITMINIHUB_STREAM_LIST_THRESHOLD", "200"))
+
+
+def bytecode_cache() -> FileSystemBytecodeCache | None:
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    except OSError:
+        # Read-only deployment: compile in memory only
+        return None
+    return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    bytecode_cache=bytecode_cache()
+)
+templates = Jinja2Templates(env=env)
+
+
+def render(request: Request, name: str, context: dict, items: int = 0, status_code: int = 200):
+    """TemplateResponse, or a streamed response when the page lists more than STREAM_LIST_THRESHOLD items."""
+    if items <= STREAM_LIST_THRESHOLD:
+        return templates.TemplateResponse(request, name, context, status_code=status_code)
+    template = templates.get_template(name)
+    return StreamingResponse(template.generate({"request": request, **context}), status_code=status_code, media_type="text/html")
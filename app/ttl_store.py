@@ -0,0 +1,114 @@
+"""
+Bounded mapping whose entries expire.
+
+Each value carries its own deadline, read through expires_at(value) (epoch
+seconds), so callers keep storing plain dicts. Deadlines sit in a min-heap:
+expiring everything that is due costs O(log n) per expired entry, and no
+operation scans the whole store. The heap is lazy: when an entry's deadline
+has moved (it was replaced, or its value was updated in place) the stale
+heap item is re-queued at the new deadline or dropped when it surfaces.
+
+The store never holds more than max_entries: inserting a new key into a full
+store evicts the least recently used one.
+"""
+import time, heapq, threading, itertools
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+
+class TTLStore(MutableMapping):
+    def __init__(self, max_entries: int, expires_at, clock=time.time):
+        self.max_entries = max_entries
+        self.expires_at = expires_at
+        self.clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self.expired = 0
+        self.evicted = 0
+
+    def _push(self, key, value):
+        heapq.heappush(self._heap, (self.expires_at(value), next(self._seq), key))
+        # Replaced keys leave stale items behind; rebuild once they dominate
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(self.expires_at(v), next(self._seq), k) for k, v in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def purge(self) -> int:
+        """Drop every entry whose deadline has passed. Returns how many were dropped."""
+        with self._lock:
+            now = self.clock()
+            dropped = 0
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key = heapq.heappop(self._heap)
+                value = self._entries.get(key)
+                if value is None:
+                    continue
+                deadline = self.expires_at(value)
+                if deadline <= now:
+                    del self._entries[key]
+                    dropped += 1
+                else:
+                    # Extended since it was queued
+                    heapq.heappush(self._heap, (deadline, next(self._seq), key))
+            self.expired += dropped
+            return dropped
+
+    def __getitem__(self, key):
+        with self._lock:
+            self.purge()
+            value = self._entries[key]
+            if self.expires_at(value) <= self.clock():
+                del self._entries[key]
+                self.expired += 1
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self.purge()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            elif len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            self._entries[key] = value
+            self._push(key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            # The heap item is skipped when it surfaces
+            del self._entries[key]
+
+    def __contains__(self, key) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        with self._lock:
+            self.purge()
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.purge()
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self),
+                "max_entries": self.max_entries,
+                "expired": self.expired,
+                "evicted": self.evicted
+            }
@@ -1,33 +1,116 @@
-import os, json, re, shutil
+import os, re, hashlib
 from passlib.hash import bcrypt
-from itsdangerous import URLSafeSerializer
 from fastapi import Request
 from datetime import datetime, UTC
+from app.storage.backend import get_backend
+from app.hashing import password_pool
+from app.sessions import SessionStore
+from app.gitmini.trash import Reaper, get_reaper
+from app.gitmini.objects import forget_object_store
+from app.gitmini.commit_graph import forget_commit_graph
 
 # user content "database"
 users_path = os.getenv("GITMINIHUB_USERS_PATH", "app/data/users.json")
+# "json" (users.json) or "sqlite" (see app/storage/migrate.py to convert)
+storage_engine = os.getenv("GITMINIHUB_STORAGE", "json")
+db_path = os.getenv("GITMINIHUB_DB_PATH", "app/data/gitminihub.db")
+# Append single changes to users.json.journal instead of rewriting users.json
+users_journal = os.getenv("GITMINIHUB_USERS_JOURNAL", "0") == "1"
+# CLI login sessions and rate limits: "memory" (one worker) or "sqlite" (shared by every worker on the host)
+auth_state_engine = os.getenv("GITMINIHUB_AUTH_STATE", "memory")
+auth_state_path = os.getenv("GITMINIHUB_AUTH_STATE_PATH", "app/data/auth_state.db")
 RESERVED_USERNAMES = {
     "login", "logout", "signup", "search", "static", "admin", "user", "api", "create_repo",
-    "auth", "cli-login"
+    "auth", "cli-login", "raw", "archive"
 }
 
 # Dynamic repo root (so tests can override it)
 def get_repo_root():
     return os.getenv("GITMINIHUB_REPO_ROOT", "app/data/repos")
 
-# For validating cookies
+# For signing session cookies
 SECRET_KEY = os.environ["GITMINIHUB_SECRET"]
-serializer = URLSafeSerializer(SECRET_KEY)
+
+def get_storage():
+    if storage_engine == "sqlite":
+        return get_backend("sqlite", db_path)
+    return get_backend("json", users_path, journal=users_journal)
 
 def load_users():
-    if os.path.exists(users_path):
-        with open(users_path, "r") as f:
-            return json.load(f)
-    return {}
+    return get_storage().load_all()
 
 def save_users(users):
-    with open(users_path, "w") as f:
-        json.dump(users, f, indent=2)
+    get_storage().save_all(users)
+
+def get_user(username: str) -> dict | None:
+    return get_storage().get_user(username)
+
+def user_exists(username: str) -> bool:
+    return get_storage().has_user(username)
+
+def get_usernames() -> list[str]:
+    return get_storage().usernames()
+
+# Homepage feed page sizes
+FEED_PAGE_SIZE = 30
+FEED_PAGE_MAX = 100
+
+def get_recent_repos(after: str | None = None, limit: int = FEED_PAGE_SIZE) -> tuple[list[dict], str | None]:
+    """A page of the global repo feed, newest first, and the cursor for the next one."""
+    return get_storage().recent_repos(after or None, max(1, min(limit, FEED_PAGE_MAX)))
+
+# Search result page sizes
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 50
+SEARCH_KINDS = ("repos", "users")
+
+def search(kind: str, query: str, page: int = 1, per_page: int = SEARCH_PAGE_SIZE) -> tuple[list[dict], int]:
+    """One page of user or repo search results and the total number of matches."""
+    per_page = max(1, min(per_page, SEARCH_PAGE_MAX))
+    return get_storage().search(kind, query, (max(page, 1) - 1) * per_page, per_page)
+
+def repo_owned_by_other_user(username: str, repo_name: str) -> bool:
+    """Whether someone other than username has a repo called repo_name (403 rather than 404)."""
+    return any(owner != username for owner in get_storage().repo_owners(repo_name))
+
+def create_user(username: str, password_hash: str) -> bool:
+    return get_storage().create_user(username, password_hash)
+
+def add_user_repo(username: str, repo_name: str) -> str | None:
+    repo_name = normalize_username(repo_name)
+    if is_invalid_repo_name(repo_name):
+        return "Invalid repository name"
+    error = get_storage().add_repo(username, create_repo_entry(repo_name))
+    sessions.invalidate_user(username)
+    return error
+
+def remove_user_repo(username: str, repo_name: str):
+    get_storage().remove_repo(username, repo_name)
+    sessions.invalidate_user(username)
+
+def add_user_api_key(username: str, key_hash: str):
+    get_storage().add_api_key(username, key_hash)
+    sessions.invalidate_user(username)
+
+def revoke_user_api_key(username: str, key_hash: str):
+    get_storage().revoke_api_key(username, key_hash)
+    sessions.invalidate_user(username)
+
+def hash_api_key(api_key: str) -> str:
+    """Hash an API key for storage."""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+# check a raw CLI API key against the key-hash index and record its use
+def authenticate_api_key(username: str, api_key: str) -> bool:
+    if not api_key:
+        return False
+    storage = get_storage()
+    key_hash = hash_api_key(api_key)
+    record = storage.find_api_key(key_hash)
+    if not record or record["username"] != username:
+        return False
+    storage.touch_api_key(key_hash)
+    return True
 
 def normalize_username(username: str) -> str:
     return username.replace(" ", "").lower()
@@ -45,6 +128,14 @@ def is_invalid_username(username: str) -> bool:
         return True
     return False
 
+def is_invalid_repo_name(repo_name: str) -> bool:
+    """Names that would leave <repo_root>/<user>/ when joined into a path, or hide in it."""
+    if not repo_name:
+        return True
+    if "/" in repo_name or "\\" in repo_name or "\0" in repo_name:
+        return True
+    return ".." in repo_name or repo_name.startswith(".")
+
 def is_invalid_password(password: str) -> bool:
     return " " in password
 
@@ -54,20 +145,30 @@ def hash_password(password: str) -> str:
 def verify_password(input_password: str, stored_hash: str) -> bool:
     return bcrypt.verify(input_password, stored_hash)
 
-# sign a cookie with username
-def create_session_cookie(username: str) -> str:
-    return serializer.dumps(username)
+# bcrypt on the bounded worker pool; raises PasswordPoolSaturated when it is full
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
 
-# return the current user if session is valid
+async def verify_password_async(input_password: str, stored_hash: str) -> bool:
+    return await password_pool.run(verify_password, input_password, stored_hash)
+
+# Browser sessions; see app/sessions.py
+sessions = SessionStore(SECRET_KEY, get_user)
+
+def create_session_cookie(username: str, user_data: dict | None = None) -> str:
+    return sessions.create(username, user_data)
+
+# return the current user if session is valid (no storage access once the cookie is cached)
 def get_current_user(request: Request) -> str | None:
-    cookie = request.cookies.get("session")
-    if not cookie:
-        return None
-    try:
-        username = serializer.loads(cookie)
-        return username
-    except Exception:
-        return None
+    entry = sessions.resolve(request.cookies.get("session"))
+    return entry["username"] if entry else None
+
+def revoke_session(request: Request):
+    sessions.revoke(request.cookies.get("session"))
+
+# e.g. after a password change
+def revoke_user_sessions(username: str):
+    sessions.revoke_user(username)
 
 def create_repo_entry(name: str) -> dict:
     return {
@@ -75,44 +176,23 @@ def create_repo_entry(name: str) -> dict:
         "created_at": datetime.now(UTC).isoformat()
     }
 
-def add_repo_to_user(users: dict, username: str, repo_name: str) -> str | None:
-    normalized = normalize_username(repo_name)
-    user_data = users.get(username)
-    if not user_data:
-        return "User not found"
-    if any(r["name"] == normalized for r in user_data["repos"]):
-        return "Repository already exists"
-    user_data["repos"].append(create_repo_entry(normalized))
-    return None
+def find_repo_entry(user_data: dict | None, repo_name: str) -> dict | None:
+    return next((r for r in (user_data or {}).get("repos", []) if r["name"] == repo_name), None)
 
-def get_user_repo_entry(users: dict, username: str, repo_name: str) -> dict | None:
-    return next((r for r in users.get(username, {}).get("repos", []) if r["name"] == repo_name), None)
+def get_repo_reaper() -> Reaper:
+    return get_reaper(os.path.join(get_repo_root(), ".trash"))
 
+# moves the repo into the trash; the reaper thread frees the space (see app/gitmini/trash.py)
 def delete_repo_from_filesystem(username: str, repo_name: str):
     path = os.path.join(get_repo_root(), username, repo_name)
     if os.path.exists(path):
-        shutil.rmtree(path)
-
-def remove_repo_from_user(users: dict, username: str, repo_name: str):
-    users[username]["repos"] = [
-        r for r in users.get(username, {}).get("repos", [])
-        if r["name"] != repo_name
-    ]
+        get_repo_reaper().trash(path)
+    forget_object_store(os.path.join(path, ".gitmini", "objects"))
+    forget_commit_graph(os.path.join(path, ".gitmini"))
 
 def is_repo_owner(current_user: str | None, username: str) -> bool:
     return current_user == username
 
-def get_all_repos(users: dict) -> list[dict]:
-    all_repos = []
-    for username, data in users.items():
-        for repo in data["repos"]:
-            all_repos.append({
-                "username": username,
-                "name": repo["name"],
-                "created_at": repo["created_at"]
-            })
-    return sorted(all_repos, key=lambda r: r["created_at"], reverse=True)
-
 def initialize_repo_structure(username: str, repo_name: str):
     base_path = os.path.join(get_repo_root(), username, repo_name, ".gitmini")
     if os.path.exists(base_path):
@@ -0,0 +1,64 @@
+"""
+Search latency over a large index.
+
+    python benchmarks/bench_search.py [--repos 100000] [--queries 1000]
+
+Builds a SearchIndex of synthetic users and repos and reports p50/p95 query
+time for prefix, owner/path and fuzzy (typo) queries.
+"""
+import os, sys, time, random, argparse, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.search import SearchIndex
+
+WORDS = ["git", "mini", "hub", "api", "web", "core", "data", "tool", "lib", "app", "cli", "docs", "test", "kit", "lab"]
+
+
+def make_repos(count: int, users: int) -> list[dict]:
+    rng = random.Random(0)
+    return [
+        {
+            "username": f"user{rng.randrange(users)}",
+            "name": "-".join(rng.sample(WORDS, 3)) + str(i),
+            "created_at": f"2025-01-01T00:00:{i % 60:02d}+00:00"
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    users = max(1, args.repos // 10)
+    repos = make_repos(args.repos, users)
+    start = time.perf_counter()
+    index = SearchIndex.build([f"user{i}" for i in range(users)], repos)
+    print(f"built index of {args.repos} repos in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(1)
+    samples = [rng.choice(repos) for _ in range(args.queries)]
+    queries = {
+        "prefix": [("repos", r["name"][:6]) for r in samples],
+        "path": [("repos", f"{r['username']}/{r['name'][:3]}") for r in samples],
+        "fuzzy": [("repos", r["name"][:4] + r["name"][5:12]) for r in samples],
+        "users": [("users", r["username"][:6]) for r in samples],
+    }
+    print(f"{'query':>8} {'p50 ms':>10} {'p95 ms':>10}")
+    for label, batch in queries.items():
+        timings = []
+        for kind, query in batch:
+            start = time.perf_counter()
+            index.search(kind, query, 0, 20)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        p50 = statistics.median(timings) * 1000
+        p95 = timings[int(len(timings) * 0.95) - 1] * 1000
+        print(f"{label:>8} {p50:>10.3f} {p95:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Write latency of a single repo creation as the number of users grows.
+
+    python benchmarks/bench_user_writes.py [--users 100,1000,10000] [--writes 50]
+
+Compares the original in-place save_users rewrite, the atomic (temp + fsync +
+rename) rewrite, the append-only journal mode, and the SQLite engine.
+"""
+import os, sys, json, time, argparse, tempfile, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.json_store import UserStore
+from app.storage.sqlite_store import SqliteStore
+
+
+def make_users(count: int) -> dict:
+    return {
+        f"user{i}": {
+            "password_hash": "$2b$12$" + "x" * 53,
+            "repos": [{"name": f"repo{j}", "created_at": "2025-01-01T00:00:00+00:00"} for j in range(3)],
+            "api_keys": ["0" * 64]
+        }
+        for i in range(count)
+    }
+
+
+def bench_legacy(path: str, users: dict, writes: int) -> list[float]:
+    """The original load/mutate/save_users cycle."""
+    with open(path, "w") as f:
+        json.dump(users, f, indent=2)
+    timings = []
+    for i in range(writes):
+        start = time.perf_counter()
+        with open(path) as f:
+            data = json.load(f)
+        data["user0"]["repos"].append({"name": f"bench{i}", "created_at": "2025-01-02T00:00:00+00:00"})
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_store(store, users: dict, writes: int) -> list[float]:
+    store.save_all(users)
+    timings = []
+    for i in range(writes):
+        start = time.perf_counter()
+        store.add_repo("user0", {"name": f"bench{i}", "created_at": "2025-01-02T00:00:00+00:00"})
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default="100,1000,10000")
+    parser.add_argument("--writes", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'engine':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for count in [int(n) for n in args.users.split(",")]:
+        users = make_users(count)
+        with tempfile.TemporaryDirectory() as tmp:
+            runs = {
+                "legacy": bench_legacy(os.path.join(tmp, "legacy.json"), users, args.writes),
+                "atomic": bench_store(UserStore(os.path.join(tmp, "atomic.json")), users, args.writes),
+                "journal": bench_store(UserStore(os.path.join(tmp, "journal.json"), journal=True), users, args.writes),
+                "sqlite": bench_store(SqliteStore(os.path.join(tmp, "bench.db")), users, args.writes),
+            }
+        for engine, timings in runs.items():
+            timings.sort()
+            p50 = statistics.median(timings) * 1000
+            p95 = timings[int(len(timings) * 0.95) - 1] * 1000
+            print(f"{count:>8} {engine:>10} {p50:>10.2f} {p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
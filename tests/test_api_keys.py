@@ -0,0 +1,69 @@
+import os
+from unittest.mock import patch
+from tests.test_helpers import AppTestCase
+from app import utils
+from app.storage import backend
+
+
+class ApiKeyIndexTests(AppTestCase):
+
+    def issue_key(self, username, password="pw"):
+        """Runs the CLI login flow and returns the raw API key."""
+        cli_token = self.client.post("/auth/init").json()["cli_token"]
+        self.client.post("/auth/verify", json={"cli_token": cli_token, "username": username, "password": password})
+        return self.client.get(f"/auth/status?cli_token={cli_token}").json()["api_key"]
+
+    def test_issued_key_authenticates_remote_add(self):
+        """ The raw key handed to the CLI is accepted via its hash """
+        self.create_user("alice")
+        self.create_repo_structure("alice", "proj")
+        api_key = self.issue_key("alice")
+        resp = self.client.post("/api/remote/add", json={"user": "alice", "api_key": api_key, "repo": "proj"})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_key_is_bound_to_its_user(self):
+        """ A valid key for one user does not authenticate another """
+        self.create_user("alice")
+        self.create_user("bob")
+        api_key = self.issue_key("alice")
+        self.assertTrue(utils.authenticate_api_key("alice", api_key))
+        self.assertFalse(utils.authenticate_api_key("bob", api_key))
+
+    def test_stored_hash_is_not_a_credential(self):
+        """ Presenting the stored hash itself does not authenticate """
+        self.create_user("alice")
+        api_key = self.issue_key("alice")
+        self.assertFalse(utils.authenticate_api_key("alice", utils.hash_api_key(api_key)))
+
+    def test_revoke(self):
+        """ Revoked keys stop working immediately """
+        self.create_user("alice")
+        api_key = self.issue_key("alice")
+        resp = self.client.post("/auth/revoke", json={"user": "alice", "api_key": api_key})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(utils.authenticate_api_key("alice", api_key))
+        self.assertEqual(utils.get_user("alice")["api_keys"], [])
+
+    def test_key_metadata(self):
+        """ The index records when a key was created and last used """
+        self.create_user("alice")
+        api_key = self.issue_key("alice")
+        key_hash = utils.hash_api_key(api_key)
+        record = utils.get_storage().find_api_key(key_hash)
+        self.assertEqual(record["username"], "alice")
+        self.assertIsNotNone(record["created_at"])
+        self.assertIsNone(record["last_used"])
+
+        utils.authenticate_api_key("alice", api_key)
+        self.assertIsNotNone(utils.get_storage().find_api_key(key_hash)["last_used"])
+
+    def test_usage_does_not_rewrite_users_file(self):
+        """ Recording key use leaves users.json untouched, even when flushed """
+        self.create_user("alice")
+        api_key = self.issue_key("alice")
+        mtime = os.stat(self.users_path).st_mtime_ns
+        with patch.object(backend, "KEY_USAGE_FLUSH_INTERVAL", 0):
+            utils.authenticate_api_key("alice", api_key)
+        self.assertEqual(os.stat(self.users_path).st_mtime_ns, mtime)
+        record = utils.get_storage().find_api_key(utils.hash_api_key(api_key))
+        self.assertIsNotNone(record["last_used"])
@@ -0,0 +1,116 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta, UTC
+from tests.test_helpers import AppTestCase
+from app.ttl_store import TTLStore
+from app.storage.auth_state import MemoryAuthState, SqliteAuthState
+
+
+class MemoryAuthStateTests(unittest.TestCase):
+
+    def make_state(self):
+        return MemoryAuthState(
+            TTLStore(10, lambda session: session["expires_at"].timestamp()),
+            TTLStore(10, lambda hits: hits["expires_at"])
+        )
+
+    def setUp(self):
+        self.state = self.make_state()
+
+    def test_session_lifecycle(self):
+        expires_at = datetime.now(UTC) + timedelta(minutes=5)
+        self.assertTrue(self.state.create_session("t", expires_at, 10))
+        self.assertFalse(self.state.get_session("t")["completed"])
+        # Not completed yet: nothing to take
+        self.assertIsNone(self.state.take_session("t"))
+        self.assertTrue(self.state.complete_session("t", "alice", "key"))
+        session = self.state.take_session("t")
+        self.assertEqual((session["username"], session["raw_api_key"]), ("alice", "key"))
+        self.assertIsNone(self.state.take_session("t"))
+        self.assertIsNone(self.state.get_session("t"))
+
+    def test_expired_sessions_are_invisible(self):
+        self.state.create_session("t", datetime.now(UTC) - timedelta(seconds=1), 10)
+        self.assertIsNone(self.state.get_session("t"))
+        self.assertFalse(self.state.complete_session("t", "alice", "key"))
+
+    def test_session_cap(self):
+        expires_at = datetime.now(UTC) + timedelta(minutes=5)
+        self.assertTrue(self.state.create_session("a", expires_at, 2))
+        self.assertTrue(self.state.create_session("b", expires_at, 2))
+        self.assertFalse(self.state.create_session("c", expires_at, 2))
+
+    def test_sliding_window(self):
+        start = time.time()
+        with patch("app.storage.auth_state.time.time", return_value=start):
+            self.state.record_hit("ip", 60, 3)
+        with patch("app.storage.auth_state.time.time", return_value=start + 30):
+            self.state.record_hit("ip", 60, 3)
+            self.state.record_hit("ip", 60, 3)
+            self.assertEqual(self.state.count_hits("ip", 60), 3)
+        # The first hit slides out of the window; the others still count
+        with patch("app.storage.auth_state.time.time", return_value=start + 61):
+            self.assertEqual(self.state.count_hits("ip", 60), 2)
+        self.assertEqual(self.state.count_hits("other", 60), 0)
+
+
+class SqliteAuthStateTests(MemoryAuthStateTests):
+
+    def make_state(self):
+        return SqliteAuthState(self.path)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "auth_state.db")
+        super().setUp()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_shared_between_workers(self):
+        other = self.make_state()
+        self.state.create_session("t", datetime.now(UTC) + timedelta(minutes=5), 10)
+        self.assertTrue(other.complete_session("t", "alice", "key"))
+        self.assertEqual(self.state.take_session("t")["raw_api_key"], "key")
+        self.assertIsNone(other.take_session("t"))
+        for _ in range(3):
+            other.record_hit("ip", 60, 5)
+        self.assertEqual(self.state.count_hits("ip", 60), 3)
+
+    def test_hits_per_key_are_capped(self):
+        for _ in range(10):
+            self.state.record_hit("ip", 60, 3)
+        (rows,) = self.state._connect().execute("SELECT COUNT(*) FROM rate_hits").fetchone()
+        self.assertEqual(rows, 3)
+
+
+class SqliteCLIAuthTests(AppTestCase):
+    """The CLI login flow with state in SQLite, as run with several workers."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        patcher = patch.multiple("app.api.cli_auth", auth_state_engine="sqlite",
+                                 auth_state_path=os.path.join(self.tmpdir.name, "auth_state.db"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_login_flow(self):
+        self.create_user("alice", password="pw")
+        cli_token = self.client.post("/auth/init").json()["cli_token"]
+        self.assertEqual(self.client.get("/auth/status", params={"cli_token": cli_token}).status_code, 401)
+        resp = self.client.post("/auth/verify", json={"cli_token": cli_token, "username": "alice", "password": "pw"})
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.get("/auth/status", params={"cli_token": cli_token})
+        self.assertEqual(resp.json()["username"], "alice")
+        self.assertEqual(self.client.get("/auth/status", params={"cli_token": cli_token}).status_code, 400)
+
+    def test_rate_limit(self):
+        cli_token = self.client.post("/auth/init").json()["cli_token"]
+        codes = [self.client.post("/auth/verify", json={"cli_token": cli_token, "username": "x", "password": "y"}).status_code
+                 for _ in range(6)]
+        self.assertEqual(codes, [401] * 5 + [429])
@@ -0,0 +1,112 @@
+import os
+import unittest
+import tempfile
+from unittest.mock import patch
+from tests.test_helpers import AppTestCase
+from app.gitmini.objects import ObjectStore, get_object_store, encode_object
+from app.gitmini.refs import RefStore
+from app.gitmini.reader import ObjectReader, ObjectNotFound, object_cache, parsed_cache
+from app.page_cache import page_cache
+
+
+def write_tree(store, entries):
+    """entries: {name: bytes (blob) or dict (subtree)}. Returns the tree hash."""
+    lines = []
+    for name, value in entries.items():
+        if isinstance(value, dict):
+            lines.append(f"040000 tree {write_tree(store, value)}\t{name}\n")
+        else:
+            lines.append(f"100644 blob {store.write(encode_object('blob', value))}\t{name}\n")
+    return store.write(encode_object("tree", "".join(lines).encode()))
+
+
+def write_commit(store, files, parents=(), message="msg", timestamp=0):
+    body = f"tree {write_tree(store, files)}\n"
+    body += "".join(f"parent {p}\n" for p in parents)
+    body += f"author alice {timestamp}\n\n{message}\n"
+    return store.write(encode_object("commit", body.encode()))
+
+
+class ObjectReaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ObjectStore(os.path.join(self.tmpdir.name, "objects"))
+        self.reader = ObjectReader(self.store)
+        object_cache.clear()
+        parsed_cache.clear()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_resolve_and_cache(self):
+        commit = write_commit(self.store, {"README": b"hi\n", "src": {"main.py": b"print(1)\n"}})
+        entry = self.reader.resolve(commit, "src/main.py")
+        self.assertEqual(self.reader.read(entry["hash"]), ("blob", b"print(1)\n"))
+        self.assertEqual([e["name"] for e in self.reader.tree(self.reader.commit(commit)["tree"])], ["src", "README"])
+
+        hits = parsed_cache.metrics()["hits"]
+        self.reader.resolve(commit, "src/main.py")
+        self.assertEqual(parsed_cache.metrics()["hits"], hits + 3)
+        with self.assertRaises(ObjectNotFound):
+            self.reader.resolve(commit, "src/missing.py")
+
+    def test_large_blobs_are_streamed_not_cached(self):
+        data = b"x" * 5000
+        blob = self.store.write(encode_object("blob", data))
+        self.store.consolidate()
+        with patch("app.gitmini.reader.STREAM_THRESHOLD", 1000):
+            self.assertEqual(b"".join(self.reader.stream(blob, 1024)), data)
+            self.reader.read(blob)
+        self.assertIsNone(object_cache.get(blob))
+        self.assertEqual(self.reader.info(blob), ("blob", 5000))
+
+
+class BrowsePageTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        page_cache.clear()
+        self.create_user("alice", repos=[self.create_repo("proj")])
+        self.create_repo_structure("alice", "proj")
+        gitmini = os.path.join(self.repo_root, "alice", "proj", ".gitmini")
+        self.store = get_object_store(os.path.join(gitmini, "objects"))
+        self.first = write_commit(self.store, {"README.md": b"hello <world>\n"}, message="initial", timestamp=1)
+        self.head = write_commit(self.store, {"README.md": b"hello <world>\n", "src": {"app.py": b"x = 1\n"}},
+                                 parents=[self.first], message="add src", timestamp=2)
+        RefStore(gitmini).compare_and_swap("main", None, self.head)
+
+    def test_repo_page_lists_branches_and_files(self):
+        resp = self.client.get("/alice/proj")
+        self.assertIn('href="/alice/proj/tree/main/src"', resp.text)
+        self.assertIn("README.md", resp.text)
+        self.assertIn("add src", resp.text)
+
+    def test_tree_and_blob(self):
+        resp = self.client.get("/alice/proj/tree/main/src")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("app.py", resp.text)
+        resp = self.client.get("/alice/proj/blob/main/README.md")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("hello &lt;world&gt;", resp.text)
+
+    def test_large_blob_page_streams(self):
+        RefStore(os.path.join(self.repo_root, "alice", "proj", ".gitmini")).compare_and_swap(
+            "big", None, write_commit(self.store, {"big.txt": b"line\n" * 1000}))
+        with patch("app.pages.browse.STREAM_THRESHOLD", 100):
+            resp = self.client.get("/alice/proj/blob/big/big.txt")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.text.count("line\n"), 1000)
+        self.assertNotIn("etag", resp.headers)
+
+    def test_commits(self):
+        resp = self.client.get("/alice/proj/commits/main")
+        self.assertLess(resp.text.index("add src"), resp.text.index("initial"))
+        # Commits link to their snapshot
+        self.assertEqual(self.client.get(f"/alice/proj/tree/{self.first}").status_code, 200)
+
+    def test_missing_paths(self):
+        self.assertEqual(self.client.get("/alice/proj/tree/nope").status_code, 404)
+        self.assertEqual(self.client.get("/alice/proj/blob/main/missing.txt").status_code, 404)
+        self.assertEqual(self.client.get("/alice/proj/blob/main/src").status_code, 404)
+        self.assertEqual(self.client.get("/alice/other/tree/main").status_code, 404)
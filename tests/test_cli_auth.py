@@ -1,8 +1,12 @@
 import json
 import time
-from unittest.mock import patch, AsyncMock
+import threading
+from unittest.mock import patch
+from fastapi.testclient import TestClient
 from tests.test_helpers import AppTestCase
+from app.main import app
 from app.api.cli_auth import auth_sessions, failed_logins, cleanup_expired_sessions
+from app.utils import authenticate_api_key
 from datetime import datetime, timedelta, UTC
 
 
@@ -212,21 +216,21 @@ class CLIAuthTests(AppTestCase):
         init_resp = self.client.post("/auth/init")
         cli_token = init_resp.json()["cli_token"]
         
-        # Mock the API call
-        with patch('httpx.AsyncClient.post') as mock_post:
-            mock_post.return_value = AsyncMock()
-            mock_post.return_value.status_code = 200
-            mock_post.return_value.json.return_value = {"message": "Authentication successful"}
-            
-            resp = self.client.post("/cli-login", data={
-                "cli_token": cli_token,
-                "username": "testuser",
-                "password": "testpass",
-                "action": "login"
-            }, follow_redirects=False)
-            
-            self.assertEqual(resp.status_code, 302)
-            self.assertIn("/cli-success", resp.headers["location"])
+        resp = self.client.post("/cli-login", data={
+            "cli_token": cli_token,
+            "username": "testuser",
+            "password": "testpass",
+            "action": "login"
+        }, follow_redirects=False)
+        
+        self.assertEqual(resp.status_code, 302)
+        self.assertIn("/cli-success", resp.headers["location"])
+        
+        # Completed in-process: the CLI can collect its key straight away
+        status_resp = self.client.get(f"/auth/status?cli_token={cli_token}")
+        self.assertEqual(status_resp.status_code, 200)
+        self.assertEqual(status_resp.json()["username"], "testuser")
+        self.assertTrue(authenticate_api_key("testuser", status_resp.json()["api_key"]))
 
     def test_cli_login_new_user(self):
         """Test CLI login with new user signup."""
@@ -234,26 +238,35 @@ class CLIAuthTests(AppTestCase):
         init_resp = self.client.post("/auth/init")
         cli_token = init_resp.json()["cli_token"]
         
-        # Mock the API call
-        with patch('httpx.AsyncClient.post') as mock_post:
-            mock_post.return_value = AsyncMock()
-            mock_post.return_value.status_code = 200
-            mock_post.return_value.json.return_value = {"message": "Authentication successful"}
-            
-            resp = self.client.post("/cli-login", data={
-                "cli_token": cli_token,
-                "username": "newuser",
-                "password": "newpass",
-                "action": "signup"
-            }, follow_redirects=False)
-            
-            self.assertEqual(resp.status_code, 302)
-            self.assertIn("/cli-success", resp.headers["location"])
-            
-            # Check that user was created
-            users = self.load_users()
-            self.assertIn("newuser", users)
-            self.assertIn("api_keys", users["newuser"])
+        resp = self.client.post("/cli-login", data={
+            "cli_token": cli_token,
+            "username": "newuser",
+            "password": "newpass",
+            "action": "signup"
+        }, follow_redirects=False)
+        
+        self.assertEqual(resp.status_code, 302)
+        self.assertIn("/cli-success", resp.headers["location"])
+        
+        # Check that user was created with the CLI's key
+        users = self.load_users()
+        self.assertIn("newuser", users)
+        self.assertEqual(len(users["newuser"]["api_keys"]), 1)
+
+    def test_cli_login_with_expired_token(self):
+        """The form reports a failure instead of issuing a key for a dead session."""
+        self.create_user("testuser", password="testpass")
+        
+        resp = self.client.post("/cli-login", data={
+            "cli_token": "invalid-token",
+            "username": "testuser",
+            "password": "testpass",
+            "action": "login"
+        })
+        
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("Authentication failed", resp.text)
+        self.assertFalse(self.load_users()["testuser"].get("api_keys"))
 
     def test_cli_success_page(self):
         """Test CLI success page."""
@@ -299,6 +312,50 @@ class CLIAuthTests(AppTestCase):
         # Check that expired session was removed
         self.assertNotIn(cli_token, auth_sessions)
 
+    def test_status_long_poll_times_out(self):
+        cli_token = self.client.post("/auth/init").json()["cli_token"]
+        started = time.monotonic()
+        resp = self.client.get(f"/auth/status?cli_token={cli_token}&wait=0.3")
+        self.assertEqual(resp.status_code, 401)
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertIn(cli_token, auth_sessions)
+
+    def test_status_long_poll_wakes_on_completion(self):
+        self.create_user("testuser", password="testpass")
+        # One client, one event loop: the verify request wakes the waiting status request
+        with TestClient(app) as client, patch("app.api.cli_auth.STATUS_RECHECK_INTERVAL", 30):
+            cli_token = client.post("/auth/init").json()["cli_token"]
+            verify = threading.Timer(0.3, client.post, args=("/auth/verify",), kwargs={"json": {
+                "cli_token": cli_token, "username": "testuser", "password": "testpass"
+            }})
+            verify.start()
+            started = time.monotonic()
+            resp = client.get(f"/auth/status?cli_token={cli_token}&wait=20")
+            verify.join()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["username"], "testuser")
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertNotIn(cli_token, auth_sessions)
+
+    def test_status_event_stream(self):
+        self.create_user("testuser", password="testpass")
+        cli_token = self.client.post("/auth/init").json()["cli_token"]
+        self.client.post("/auth/verify", json={"cli_token": cli_token, "username": "testuser", "password": "testpass"})
+        resp = self.client.get(f"/auth/status?cli_token={cli_token}", headers={"Accept": "text/event-stream"})
+        self.assertTrue(resp.headers["content-type"].startswith("text/event-stream"))
+        event, data = resp.text.strip().split("\n")
+        self.assertEqual(event, "event: completed")
+        self.assertEqual(json.loads(data.removeprefix("data: "))["username"], "testuser")
+        # Still one-shot
+        self.assertEqual(self.client.get(f"/auth/status?cli_token={cli_token}").status_code, 400)
+
+    def test_status_event_stream_reports_expiry(self):
+        cli_token = self.client.post("/auth/init").json()["cli_token"]
+        with patch("app.api.cli_auth.STATUS_RECHECK_INTERVAL", 0.05):
+            auth_sessions[cli_token]["expires_at"] = datetime.now(UTC) + timedelta(seconds=0.2)
+            resp = self.client.get(f"/auth/status?cli_token={cli_token}", headers={"Accept": "text/event-stream"})
+        self.assertIn("event: error", resp.text)
+
     def load_users(self):
         """Helper to load users from test file."""
         with open(self.users_path, "r") as f:
@@ -0,0 +1,100 @@
+import os
+import unittest
+import tempfile
+from tests.test_browse import write_commit
+from app.gitmini.objects import ObjectStore
+from app.gitmini.reader import ObjectReader
+from app.gitmini.commit_graph import CommitGraph
+
+
+class CommitGraphTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.gitmini = os.path.join(self.tmpdir.name, ".gitmini")
+        self.store = ObjectStore(os.path.join(self.gitmini, "objects"))
+        self.reader = ObjectReader(self.store)
+        self.graph = CommitGraph(self.gitmini)
+
+        #   root - a1 - a2 ---- merge
+        #      \               /
+        #       b1 ---------- b2
+        self.root = write_commit(self.store, {"f": b"0"}, timestamp=1)
+        self.a1 = write_commit(self.store, {"f": b"a1"}, parents=[self.root], timestamp=2)
+        self.b1 = write_commit(self.store, {"f": b"b1"}, parents=[self.root], timestamp=3)
+        self.a2 = write_commit(self.store, {"f": b"a2"}, parents=[self.a1], timestamp=4)
+        self.b2 = write_commit(self.store, {"f": b"b2"}, parents=[self.b1], timestamp=5)
+        self.merge = write_commit(self.store, {"f": b"m"}, parents=[self.a2, self.b2], timestamp=6)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_generations(self):
+        self.assertEqual(self.graph.update(self.reader, self.merge), 6)
+        self.assertEqual(self.graph.generation(self.root), 1)
+        self.assertEqual(self.graph.generation(self.b2), 3)
+        self.assertEqual(self.graph.generation(self.merge), 4)
+        self.assertEqual(self.graph.update(self.reader, self.a2), 0)
+
+    def test_incremental_update_appends(self):
+        self.graph.update(self.reader, self.a2)
+        size = os.path.getsize(self.graph.path)
+        self.assertEqual(self.graph.update(self.reader, self.merge), 3)
+        with open(self.graph.path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertGreater(os.path.getsize(self.graph.path), size)
+        # Another process sees the same graph
+        self.assertEqual(CommitGraph(self.gitmini).generation(self.merge), 4)
+
+    def test_torn_line_is_ignored_and_replaced(self):
+        self.graph.update(self.reader, self.a1)
+        with open(self.graph.path, "a") as f:
+            f.write(self.a2[:20])
+        other = CommitGraph(self.gitmini)
+        self.assertEqual(len(other), 2)
+        other.update(self.reader, self.a2)
+        self.assertEqual(CommitGraph(self.gitmini).generation(self.a2), 3)
+
+    def test_missing(self):
+        self.graph.update(self.reader, self.merge)
+        missing, boundary = self.graph.missing(self.merge, {self.a2})
+        self.assertEqual(set(missing), {self.b1, self.b2, self.merge})
+        self.assertEqual(missing[-1], self.merge)
+        self.assertLess(missing.index(self.b1), missing.index(self.b2))
+        self.assertEqual(boundary, sorted([self.root, self.a2]))
+        self.assertEqual(self.graph.missing(self.merge, {self.b2, self.a2}), ([self.merge], sorted([self.a2, self.b2])))
+        self.assertEqual(self.graph.missing(self.a1, {self.merge}), ([], []))
+        missing, boundary = self.graph.missing(self.merge, set())
+        self.assertEqual(missing[0], self.root)
+        self.assertEqual(len(missing), 6)
+        self.assertEqual(boundary, [])
+
+    def test_ancestry(self):
+        self.graph.update(self.reader, self.merge)
+        self.assertTrue(self.graph.is_ancestor(self.root, self.merge))
+        self.assertTrue(self.graph.is_ancestor(self.b1, self.merge))
+        self.assertTrue(self.graph.is_ancestor(self.a2, self.a2))
+        self.assertFalse(self.graph.is_ancestor(self.a2, self.b2))
+        self.assertFalse(self.graph.is_ancestor(self.merge, self.root))
+        self.assertTrue(self.graph.is_fast_forward(None, self.root))
+        self.assertTrue(self.graph.is_fast_forward(self.a1, self.merge))
+        self.assertFalse(self.graph.is_fast_forward(self.a2, self.b2))
+
+    def test_merge_base(self):
+        self.graph.update(self.reader, self.merge)
+        self.assertEqual(self.graph.merge_base(self.a2, self.b2), self.root)
+        self.assertEqual(self.graph.merge_base(self.merge, self.b1), self.b1)
+        self.assertEqual(self.graph.merge_base(self.a1, self.a1), self.a1)
+        self.assertIsNone(self.graph.merge_base(self.a1, "f" * 40))
+
+    def test_walk_newest_first(self):
+        self.graph.update(self.reader, self.merge)
+        self.assertEqual(list(self.graph.walk(self.merge)),
+                         [self.merge, self.b2, self.a2, self.b1, self.a1, self.root])
+
+    def test_missing_parents_end_history(self):
+        orphan = write_commit(self.store, {"f": b"x"}, parents=["f" * 40], timestamp=7)
+        self.graph.update(self.reader, orphan)
+        self.assertEqual(self.graph.generation(orphan), 1)
+        self.assertEqual(list(self.graph.walk(orphan)), [orphan])
@@ -0,0 +1,125 @@
+import io
+import os
+import tarfile
+from unittest.mock import patch
+from tests.test_helpers import AppTestCase
+from tests.test_browse import write_commit
+from app.gitmini.objects import get_object_store
+from app.gitmini.refs import RefStore
+from app.gitmini.archive import DownloadCache
+
+
+class DownloadTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_user("alice", repos=[self.create_repo("proj")])
+        self.create_repo_structure("alice", "proj")
+        gitmini = os.path.join(self.repo_root, "alice", "proj", ".gitmini")
+        self.store = get_object_store(os.path.join(gitmini, "objects"))
+        self.data = bytes(range(256)) * 40
+        self.head = write_commit(self.store, {
+            "README.md": b"hello\n",
+            "bin.dat": self.data,
+            "src": {"app.py": b"x = 1\n", "deep": {"a.txt": b"a\n"}}
+        }, timestamp=1700000000)
+        RefStore(gitmini).compare_and_swap("main", None, self.head)
+
+    def test_raw_file(self):
+        resp = self.client.get("/raw/alice/proj/main/src/app.py")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, b"x = 1\n")
+        self.assertTrue(resp.headers["content-type"].startswith("text/plain"))
+        self.assertEqual(resp.headers["x-content-type-options"], "nosniff")
+        self.assertEqual(self.client.get("/raw/alice/proj/main/bin.dat").headers["content-type"], "application/octet-stream")
+
+    def test_raw_range(self):
+        resp = self.client.get("/raw/alice/proj/main/bin.dat", headers={"Range": "bytes=100-199"})
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, self.data[100:200])
+        self.assertEqual(resp.headers["content-range"], f"bytes 100-199/{len(self.data)}")
+        self.assertEqual(resp.headers["accept-ranges"], "bytes")
+
+    def test_raw_missing(self):
+        self.assertEqual(self.client.get("/raw/alice/proj/main/nope.txt").status_code, 404)
+        self.assertEqual(self.client.get("/raw/alice/proj/main/src").status_code, 404)
+        self.assertEqual(self.client.get("/raw/alice/proj/dev/README.md").status_code, 404)
+        self.assertEqual(self.client.get("/raw/alice/other/main/README.md").status_code, 404)
+
+    def test_downloads_of_repos_named_like_browse_routes(self):
+        for name in ("tree", "blob", "commits"):
+            self.create_user("alice", repos=[self.create_repo(name)])
+            self.create_repo_structure("alice", name)
+            gitmini = os.path.join(self.repo_root, "alice", name, ".gitmini")
+            RefStore(gitmini).compare_and_swap("main", None, write_commit(get_object_store(os.path.join(gitmini, "objects")), {"x": b"x\n"}))
+            self.assertEqual(self.client.get(f"/raw/alice/{name}/main/x").content, b"x\n")
+            resp = self.client.get(f"/archive/alice/{name}/main.tar.gz")
+            self.assertEqual(resp.headers["content-type"], "application/gzip")
+
+    def test_archive_contents(self):
+        resp = self.client.get("/archive/alice/proj/main.tar.gz")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('filename="proj-main.tar.gz"', resp.headers["content-disposition"])
+        prefix = f"proj-{self.head[:10]}"
+        with tarfile.open(fileobj=io.BytesIO(resp.content), mode="r:gz") as tar:
+            names = tar.getnames()
+            self.assertEqual(tar.extractfile(f"{prefix}/bin.dat").read(), self.data)
+            self.assertEqual(tar.extractfile(f"{prefix}/src/deep/a.txt").read(), b"a\n")
+            self.assertEqual(tar.getmember(f"{prefix}/README.md").mtime, 1700000000)
+        self.assertEqual(names[0], prefix)
+        self.assertLess(names.index(f"{prefix}/src"), names.index(f"{prefix}/src/app.py"))
+
+    def test_archive_skips_entries_escaping_the_prefix(self):
+        gitmini = os.path.join(self.repo_root, "alice", "proj", ".gitmini")
+        evil = write_commit(self.store, {
+            "ok.txt": b"ok\n",
+            "..": b"evil\n",
+            "a/../../x": b"evil\n",
+            "sub": {"..": {"y": b"evil\n"}, "fine": b"fine\n"}
+        }, parents=[self.head])
+        RefStore(gitmini).compare_and_swap("main", self.head, evil)
+        resp = self.client.get("/archive/alice/proj/main.tar.gz")
+        prefix = f"proj-{evil[:10]}"
+        with tarfile.open(fileobj=io.BytesIO(resp.content), mode="r:gz") as tar:
+            names = tar.getnames()
+        self.assertEqual(sorted(names), sorted([prefix, f"{prefix}/ok.txt", f"{prefix}/sub", f"{prefix}/sub/fine"]))
+
+    def test_repeat_archive_is_a_cached_file(self):
+        first = self.client.get("/archive/alice/proj/main.tar.gz")
+        self.assertNotIn("content-length", first.headers)
+        with patch("app.pages.downloads.tar_stream") as tar_stream:
+            second = self.client.get(f"/archive/alice/proj/{self.head}.tar.gz")
+        tar_stream.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.headers["content-length"], str(len(first.content)))
+
+    def test_abandoned_archive_is_not_cached(self):
+        cache = DownloadCache(os.path.join(self.repo_root, ".cache"))
+        path = cache.archive_path(self.head, "x.tar.gz")
+        stream = cache.tee(iter([b"a", b"b"]), path)
+        next(stream)
+        stream.close()
+        self.assertEqual(os.listdir(os.path.dirname(path)), [])
+
+    def test_cache_evicts_least_recently_sent(self):
+        cache = DownloadCache(os.path.join(self.repo_root, ".cache"))
+        paths = []
+        for i in range(3):
+            path = cache.archive_path("c" * 40, f"{i}.tar.gz")
+            list(cache.tee(iter([b"x" * 6]), path))
+            os.utime(path, ns=(i, i))
+            paths.append(path)
+        cache.get(paths[0])
+        cache.max_bytes = 15
+        cache.prune()
+        self.assertEqual([os.path.exists(p) for p in paths], [True, False, True])
+
+    def test_cache_only_scanned_when_over_the_limit(self):
+        cache = DownloadCache(os.path.join(self.repo_root, ".cache"), max_bytes=20)
+        with patch("app.gitmini.archive.os.walk", wraps=os.walk) as walk:
+            for i in range(3):
+                list(cache.tee(iter([b"x" * 6]), cache.archive_path("c" * 40, f"{i}.tar.gz")))
+            # The first publish measures the cache; the next ones just add their size
+            self.assertEqual(walk.call_count, 1)
+            list(cache.tee(iter([b"x" * 6]), cache.archive_path("c" * 40, "3.tar.gz")))
+            self.assertEqual(walk.call_count, 2)
@@ -0,0 +1,115 @@
+import io
+import os
+import json
+import tarfile
+from unittest.mock import patch
+from tests.test_helpers import AppTestCase
+from tests.test_browse import write_commit
+from app.utils import hash_api_key
+from app.gitmini.objects import get_object_store, hash_object, encode_object
+from app.gitmini.refs import RefStore
+from app.gitmini.reader import ObjectReader
+
+
+class FetchTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_user("alice", repos=[])
+        with open(self.users_path, "r") as f:
+            users = json.load(f)
+        users["alice"]["api_keys"] = [hash_api_key("key")]
+        with open(self.users_path, "w") as f:
+            json.dump(users, f)
+        self.create_repo_structure("alice", "proj")
+        gitmini = os.path.join(self.repo_root, "alice", "proj", ".gitmini")
+        self.store = get_object_store(os.path.join(gitmini, "objects"))
+        self.refs = RefStore(gitmini)
+
+        # 3 commits; the second only changes src/app.py
+        self.c1 = write_commit(self.store, {"README": b"hi\n", "src": {"app.py": b"v1\n"}}, timestamp=1)
+        self.c2 = write_commit(self.store, {"README": b"hi\n", "src": {"app.py": b"v2\n"}}, parents=[self.c1], timestamp=2)
+        self.c3 = write_commit(self.store, {"README": b"hi\n", "src": {"app.py": b"v3\n"}}, parents=[self.c2], timestamp=3)
+        self.refs.compare_and_swap("main", None, self.c3)
+
+    def fetch(self, **fields):
+        return self.client.post("/api/remote/fetch", json={"user": "alice", "api_key": "key", "repo": "proj", "branch": "main", **fields})
+
+    def read_archive(self, resp):
+        """({hash: raw object}, manifest), checking every object against its name."""
+        objects, manifest = {}, None
+        with tarfile.open(fileobj=io.BytesIO(resp.content), mode="r:gz") as tar:
+            for member in tar:
+                data = tar.extractfile(member).read()
+                if member.name == "fetch.json":
+                    manifest = json.loads(data)
+                else:
+                    obj_hash = member.name.split("/")[-1]
+                    self.assertEqual(hash_object(data), obj_hash)
+                    objects[obj_hash] = data
+        return objects, manifest
+
+    def test_clone_sends_everything_oldest_first(self):
+        resp = self.fetch()
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("content-length", resp.headers)
+        objects, manifest = self.read_archive(resp)
+        self.assertEqual(set(objects), set(self.store.loose_hashes()))
+        commits = [h for h in objects if objects[h].startswith(b"commit ")]
+        self.assertEqual(commits, [self.c1, self.c2, self.c3])
+        self.assertEqual(manifest, {"branch": "main", "commit": self.c3, "last_commit": self.c3, "complete": True, "objects": len(objects)})
+
+    def test_incremental_fetch_skips_known_objects(self):
+        objects, manifest = self.read_archive(self.fetch(have=[self.c2]))
+        # commit, root tree, src tree and the changed blob; README is unchanged
+        self.assertEqual(len(objects), 4)
+        self.assertIn(self.c3, objects)
+        self.assertTrue(manifest["complete"])
+
+    def test_incremental_fetch_reads_only_new_commits(self):
+        self.fetch()
+        read = []
+        original = ObjectReader.commit
+        with patch.object(ObjectReader, "commit", lambda reader, h: read.append(h) or original(reader, h)):
+            self.read_archive(self.fetch(have=[self.c2]))
+        self.assertEqual(set(read), {self.c2, self.c3})
+
+    def test_up_to_date(self):
+        resp = self.fetch(have=[self.c3])
+        self.assertEqual(resp.json()["message"], "Already up to date.")
+        self.assertEqual(resp.json()["most_recent_remote_branch_commit"], self.c3)
+
+    def test_batches_stop_at_a_commit_and_resume(self):
+        objects, manifest = self.read_archive(self.fetch(max_objects=1))
+        self.assertEqual(manifest["last_commit"], self.c1)
+        self.assertFalse(manifest["complete"])
+        # A whole commit is always sent
+        self.assertEqual(len(objects), 5)
+
+        have = [manifest["last_commit"]]
+        while not manifest["complete"]:
+            batch, manifest = self.read_archive(self.fetch(have=have, max_objects=1))
+            self.assertFalse(set(batch) & set(objects))
+            objects.update(batch)
+            have = [manifest["last_commit"]]
+        self.assertEqual(set(objects), set(self.store.loose_hashes()))
+
+    def test_unknown_have_is_ignored(self):
+        objects, _ = self.read_archive(self.fetch(have=["f" * 40]))
+        self.assertEqual(set(objects), set(self.store.loose_hashes()))
+
+    def test_have_naming_a_tree_or_blob_is_ignored(self):
+        tree = ObjectReader(self.store).commit(self.c1)["tree"]
+        blob = self.store.write(encode_object("blob", b"hi\n"))
+        resp = self.fetch(have=[tree, blob])
+        self.assertEqual(resp.status_code, 200)
+        objects, manifest = self.read_archive(resp)
+        self.assertTrue(manifest["complete"])
+        self.assertEqual(set(objects), set(self.store.loose_hashes()))
+
+    def test_errors(self):
+        self.assertEqual(self.fetch(have=["../etc"]).status_code, 400)
+        self.assertEqual(self.fetch(repo="../alice/proj").status_code, 400)
+        self.assertEqual(self.fetch(api_key="wrong").status_code, 401)
+        self.assertEqual(self.fetch(repo="missing").status_code, 404)
+        self.assertEqual(self.fetch(branch="dev").json()["message"], "Remote branch not found.")
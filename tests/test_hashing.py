@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+from tests.test_helpers import AppTestCase
+from app.hashing import PasswordHashPool, PasswordPoolSaturated, password_pool
+
+
+class PasswordHashPoolTests(unittest.TestCase):
+
+    def test_runs_off_the_event_loop(self):
+        pool = PasswordHashPool(workers=1, queue_limit=1)
+        loop_thread = threading.get_ident()
+        worker_thread = asyncio.run(pool.run(threading.get_ident))
+        self.assertNotEqual(worker_thread, loop_thread)
+        self.assertEqual(pool.metrics()["completed"], 1)
+
+    def test_rejects_when_saturated(self):
+        pool = PasswordHashPool(workers=1, queue_limit=1)
+        release = threading.Event()
+
+        async def scenario():
+            running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(PasswordPoolSaturated):
+                await pool.run(lambda: None)
+            release.set()
+            await asyncio.gather(*running)
+
+        asyncio.run(scenario())
+        metrics = pool.metrics()
+        self.assertEqual(metrics["rejected"], 1)
+        self.assertEqual(metrics["completed"], 2)
+        self.assertEqual(metrics["in_flight"], 0)
+
+
+class PasswordPoolEndpointTests(AppTestCase):
+
+    def test_saturated_pool_returns_503(self):
+        """ Logins are shed with a 503 when the hashing queue is full """
+        self.create_user("alice", password="pw")
+        with patch.object(password_pool, "queue_limit", -password_pool.workers):
+            resp = self.client.post("/login", data={"username": "alice", "password": "pw"})
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.headers["retry-after"], "1")
+
+    def test_metrics_endpoint(self):
+        resp = self.client.get("/api/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("queue_wait_avg_ms", resp.json()["password_hashing"])
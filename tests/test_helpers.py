@@ -14,7 +14,6 @@ os.environ["GITMINIHUB_SECRET"] = "testsecret"
 from fastapi.testclient import TestClient
 from app.main import app
 from app import utils
-from itsdangerous import URLSafeSerializer
 from passlib.hash import bcrypt
 from datetime import datetime, timezone
 
@@ -40,15 +39,17 @@ class AppTestCase(unittest.TestCase):
             shutil.rmtree(self.repo_root)
         os.makedirs(self.repo_root)
 
-        secret = os.environ["GITMINIHUB_SECRET"]
-        self.serializer = URLSafeSerializer(secret)
+        utils.sessions.clear()
 
     def tearDown(self):
         """Clean up after each test run."""
+        # Let the reaper finish with deleted repos before the tree goes away
+        utils.get_repo_reaper().reap_all()
         if os.path.exists(self.repo_root):
             shutil.rmtree(self.repo_root)
-        if os.path.exists(self.users_path):
-            os.remove(self.users_path)
+        for path in (self.users_path, self.users_path + ".lock", self.users_path + ".journal", self.users_path + ".keys"):
+            if os.path.exists(path):
+                os.remove(path)
 
     def create_user(self, username, password="pw", repos=None):
         """Creates a user in users.json with optional repos."""
@@ -72,7 +73,7 @@ class AppTestCase(unittest.TestCase):
 
     def set_session_cookie(self, username):
         """Sets a signed session cookie for the user."""
-        cookie = self.serializer.dumps(username)
+        cookie = utils.create_session_cookie(username)
         self.client.cookies.set("session", cookie)
 
     def create_repo(self, name, created_at=None):
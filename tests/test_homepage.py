@@ -91,3 +91,33 @@ class HomepageTests(AppTestCase):
         idx_a = resp.text.find("zoe/a")
 
         self.assertTrue(idx_c < idx_b < idx_a)
+
+    def test_homepage_feed_is_paginated(self):
+        """ Homepage shows one page of repos and links to the next """
+        repos = [self.create_repo(f"r{i:02d}", created_at=f"2025-06-{i + 1:02d}T00:00:00+00:00") for i in range(5)]
+        self.create_user("zoe", repos=repos)
+
+        resp = self.client.get("/?limit=2")
+        self.assertIn("zoe/r04", resp.text)
+        self.assertIn("zoe/r03", resp.text)
+        self.assertNotIn("zoe/r02", resp.text)
+        self.assertIn("/?after=2025-06-04T00%3A00%3A00%2B00%3A00&limit=2", resp.text)
+
+        resp = self.client.get("/", params={"after": "2025-06-04T00:00:00+00:00", "limit": 2})
+        self.assertNotIn("zoe/r03", resp.text)
+        self.assertIn("zoe/r02", resp.text)
+        self.assertIn("zoe/r01", resp.text)
+
+        resp = self.client.get("/", params={"after": "2025-06-02T00:00:00+00:00", "limit": 2})
+        self.assertIn("zoe/r00", resp.text)
+        self.assertNotIn("Older repositories", resp.text)
+
+    def test_homepage_feed_follows_repo_changes(self):
+        """ Created and deleted repos show up in the feed without a rebuild """
+        self.create_user("john", password="pw", repos=[self.create_repo("old", created_at="2025-01-01T00:00:00+00:00")])
+        self.login_as("john")
+        self.client.post("/john/fresh", data={"confirm_name": "fresh"})
+        resp = self.client.get("/")
+        self.assertLess(resp.text.find("john/fresh"), resp.text.find("john/old"))
+        self.client.post("/john/old/delete", data={"confirm_name": "old"})
+        self.assertNotIn("john/old", self.client.get("/").text)
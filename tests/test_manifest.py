@@ -0,0 +1,66 @@
+import os
+import json
+import unittest
+import tempfile
+from datetime import datetime, UTC
+from unittest.mock import patch
+from tests.test_browse import write_commit
+from app.gitmini.objects import ObjectStore
+from app.gitmini.refs import RefStore
+from app.gitmini.manifest import read_manifest, write_manifest, manifest_path
+
+
+class ManifestTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.gitmini = os.path.join(self.tmpdir.name, ".gitmini")
+        self.store = ObjectStore(os.path.join(self.gitmini, "objects"))
+        self.refs = RefStore(self.gitmini)
+        os.makedirs(self.refs.heads_dir)
+        self.c1 = write_commit(self.store, {"README": b"hi\n"}, timestamp=1)
+        self.refs.compare_and_swap("main", None, self.c1, "alice")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_built_on_first_read(self):
+        manifest = read_manifest(self.gitmini)
+        self.assertEqual(manifest["refs"], {"main": self.c1})
+        # commit, tree and blob
+        self.assertEqual(manifest["objects"], 3)
+        self.assertEqual(manifest["size"], sum(len(self.store.read(h)) for h in self.store.loose_hashes()))
+        # No push recorded yet: taken from the reflog
+        self.assertIsNotNone(manifest["last_pushed_at"])
+        self.assertTrue(os.path.exists(manifest_path(self.gitmini)))
+
+    def test_cached_while_file_unchanged(self):
+        first = read_manifest(self.gitmini)
+        with patch("app.gitmini.manifest.json.load", side_effect=AssertionError("re-parsed")):
+            self.assertIs(read_manifest(self.gitmini), first)
+
+    def test_rebuilt_when_refs_move(self):
+        read_manifest(self.gitmini)
+        c2 = write_commit(self.store, {"README": b"v2\n"}, parents=[self.c1], timestamp=2)
+        self.refs.compare_and_swap("dev", None, c2, "alice")
+        manifest = read_manifest(self.gitmini)
+        self.assertEqual(manifest["refs"], {"main": self.c1, "dev": c2})
+        self.assertEqual(manifest["objects"], 6)
+
+    def test_push_time_recorded(self):
+        pushed_at = datetime(2025, 6, 24, tzinfo=UTC)
+        write_manifest(self.gitmini, pushed_at)
+        with open(manifest_path(self.gitmini)) as f:
+            self.assertEqual(json.load(f)["last_pushed_at"], pushed_at.isoformat())
+        # Kept by later rebuilds
+        self.assertEqual(write_manifest(self.gitmini)["last_pushed_at"], pushed_at.isoformat())
+
+    def test_push_adds_to_previous_counts_without_scanning(self):
+        before = read_manifest(self.gitmini)
+        with patch("app.gitmini.manifest.get_object_store", side_effect=AssertionError("scanned")):
+            manifest = write_manifest(self.gitmini, datetime.now(UTC), (2, 50))
+        self.assertEqual(manifest["objects"], before["objects"] + 2)
+        self.assertEqual(manifest["size"], before["size"] + 50)
+
+    def test_missing_repo(self):
+        self.assertIsNone(read_manifest(os.path.join(self.tmpdir.name, "missing", ".gitmini")))
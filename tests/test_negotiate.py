@@ -0,0 +1,70 @@
+import os
+import json
+from tests.test_helpers import AppTestCase
+from app.utils import hash_api_key
+from app.gitmini.objects import get_object_store, encode_object
+
+class NegotiateTests(AppTestCase):
+    def setup_repo(self, username, repo_name, api_key):
+        self.create_user(username, repos=[])
+        with open(self.users_path, "r") as f:
+            users = json.load(f)
+        users[username]["api_keys"] = [hash_api_key(api_key)]
+        with open(self.users_path, "w") as f:
+            json.dump(users, f)
+        self.create_repo_structure(username, repo_name)
+        return get_object_store(os.path.join(self.repo_root, username, repo_name, ".gitmini", "objects"))
+
+    def negotiate(self, **fields):
+        return self.client.post("/api/remote/negotiate", json=fields)
+
+    def test_returns_only_missing_objects(self):
+        store = self.setup_repo("alice", "myrepo", "key")
+        present = store.write(encode_object("blob", b"on the server"))
+        absent = ["a" * 40, "b" * 40]
+        resp = self.negotiate(user="alice", api_key="key", repo="myrepo", objects=[absent[0], present, absent[1]])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["missing"], absent)
+
+    def test_sees_objects_written_after_the_filter_was_built(self):
+        store = self.setup_repo("alice", "myrepo", "key")
+        self.negotiate(user="alice", api_key="key", repo="myrepo", objects=["c" * 40])
+        obj_hash = store.write(encode_object("blob", b"pushed later"))
+        resp = self.negotiate(user="alice", api_key="key", repo="myrepo", objects=[obj_hash])
+        self.assertEqual(resp.json()["missing"], [])
+
+    def test_common_commit(self):
+        store = self.setup_repo("alice", "myrepo", "key")
+        commit = store.write(encode_object("commit", b"tree x\n\nmsg\n"))
+        resp = self.negotiate(user="alice", api_key="key", repo="myrepo", last_known_remote_commit=commit)
+        self.assertEqual(resp.json()["common_commit"], commit)
+        resp = self.negotiate(user="alice", api_key="key", repo="myrepo", last_known_remote_commit="d" * 40)
+        self.assertIsNone(resp.json()["common_commit"])
+
+    def test_invalid_hash(self):
+        self.setup_repo("alice", "myrepo", "key")
+        resp = self.negotiate(user="alice", api_key="key", repo="myrepo", objects=["../../etc/passwd"])
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["message"], "Invalid request payload")
+
+    def test_repo_outside_the_user_rejected(self):
+        self.setup_repo("alice", "myrepo", "key")
+        self.setup_repo("bob", "proj", "bobkey")
+        resp = self.negotiate(user="alice", api_key="key", repo="../bob/proj", objects=[])
+        self.assertEqual(resp.status_code, 400)
+
+    def test_batch_limit(self):
+        self.setup_repo("alice", "myrepo", "key")
+        resp = self.negotiate(user="alice", api_key="key", repo="myrepo", objects=["e" * 40] * 10001)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["max_objects"], 10000)
+
+    def test_auth_failure(self):
+        self.setup_repo("alice", "myrepo", "key")
+        resp = self.negotiate(user="alice", api_key="wrong", repo="myrepo", objects=[])
+        self.assertEqual(resp.status_code, 401)
+
+    def test_repo_not_found(self):
+        self.setup_repo("alice", "myrepo", "key")
+        resp = self.negotiate(user="alice", api_key="key", repo="missing", objects=[])
+        self.assertEqual(resp.status_code, 404)
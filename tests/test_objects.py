@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.gitmini import objects
+from app.gitmini.objects import ObjectStore, encode_object, hash_object
+from app.gitmini.bloom import BloomFilter
+from app.storage.json_store import file_lock
+
+
+class ObjectStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ObjectStore(os.path.join(self.tmpdir.name, "objects"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_loose_objects_use_fan_out_dirs(self):
+        data = encode_object("blob", b"hello")
+        obj_hash = self.store.write(data)
+        self.assertEqual(obj_hash, hash_object(data))
+        self.assertTrue(os.path.isfile(os.path.join(self.store.objects_dir, obj_hash[:2], obj_hash[2:])))
+        self.assertEqual(self.store.read(obj_hash), data)
+
+    def test_reads_legacy_flat_objects(self):
+        data = encode_object("blob", b"old")
+        os.makedirs(self.store.objects_dir)
+        with open(os.path.join(self.store.objects_dir, hash_object(data)), "wb") as f:
+            f.write(data)
+        self.assertTrue(self.store.has(hash_object(data)))
+        self.assertEqual(self.store.read(hash_object(data)), data)
+
+    def test_consolidate_into_pack(self):
+        blobs = [encode_object("blob", f"file {i}".encode()) for i in range(300)]
+        hashes = [self.store.write(b) for b in blobs]
+
+        self.assertEqual(self.store.consolidate(), 300)
+        self.assertEqual(list(self.store.loose_hashes()), [])
+        self.assertEqual(len(self.store.packs()), 1)
+        for obj_hash, data in zip(hashes, blobs):
+            self.assertTrue(self.store.has(obj_hash))
+            self.assertEqual(self.store.read(obj_hash), data)
+        self.assertFalse(self.store.has("f" * 40))
+        self.assertIsNone(self.store.read("0" * 40))
+
+    def test_objects_span_loose_and_packed(self):
+        packed = self.store.write(encode_object("blob", b"packed"))
+        self.store.consolidate()
+        loose = self.store.write(encode_object("blob", b"loose"))
+        self.assertTrue(self.store.has(packed))
+        self.assertTrue(self.store.has(loose))
+        # Already packed objects are not re-written as loose ones
+        self.store.write(encode_object("blob", b"packed"))
+        self.assertEqual(list(self.store.loose_hashes()), [loose])
+
+    def test_packs_are_merged_past_the_limit(self):
+        hashes = []
+        for run in range(objects.PACK_LIMIT + 3):
+            hashes += [self.store.write(encode_object("blob", f"run {run} file {i}".encode())) for i in range(5)]
+            stale = ObjectStore(self.store.objects_dir)
+            stale.packs()
+            self.store.consolidate()
+            self.assertLessEqual(len(self.store.packs()), objects.PACK_LIMIT)
+            # A reader still holding packs that were just merged finds the objects in the new one
+            self.assertEqual(stale.read(hashes[0]), encode_object("blob", b"run 0 file 0"))
+        self.assertEqual(sum(pack.count for pack in self.store.packs()), len(hashes))
+        for obj_hash in hashes:
+            self.assertTrue(self.store.has(obj_hash))
+            self.assertIsNotNone(self.store.read(obj_hash))
+        self.assertFalse(self.store.has("f" * 40))
+        self.assertEqual(self.store.stats()[0], len(hashes))
+
+    def test_consolidation_skipped_while_another_holds_the_lock(self):
+        self.store.write(encode_object("blob", b"x"))
+        with file_lock(os.path.join(self.store.pack_dir, ".consolidate.lock")):
+            self.assertEqual(self.store.consolidate(), 0)
+        self.assertEqual(self.store.consolidate(), 1)
+
+    def test_consolidate_if_needed(self):
+        self.store.write(encode_object("blob", b"x"))
+        self.assertEqual(self.store.consolidate_if_needed(), 0)
+        with patch.object(objects, "LOOSE_OBJECT_LIMIT", -1):
+            os.makedirs(os.path.join(self.store.objects_dir, "17"), exist_ok=True)
+            self.assertEqual(self.store.consolidate_if_needed(), 1)
+
+
+class BloomFilterTests(unittest.TestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        hashes = [hash_object(str(i).encode()) for i in range(1000)]
+        for h in hashes:
+            bloom.add(h)
+        self.assertTrue(all(h in bloom for h in hashes))
+        others = [hash_object(f"other {i}".encode()) for i in range(1000)]
+        self.assertLess(sum(h in bloom for h in others), 50)
+        self.assertFalse(bloom.full)
+        bloom.add("0" * 40)
+        self.assertTrue(bloom.full)
@@ -0,0 +1,102 @@
+import os
+from tests.test_helpers import AppTestCase
+from app.gitmini.refs import RefStore
+from app.page_cache import page_cache, PageCache, CachedPage
+
+class PageCacheTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        page_cache.clear()
+
+    def test_anonymous_pages_revalidate_with_etag(self):
+        """ Public pages carry a strong ETag and answer 304 when unchanged """
+        self.create_user("alice", repos=[self.create_repo("proj")])
+        resp = self.client.get("/alice")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["cache-control"], "no-cache")
+        self.assertIn("last-modified", resp.headers)
+        etag = resp.headers["etag"]
+        self.assertTrue(etag.startswith('"'))
+
+        resp = self.client.get("/alice", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b"")
+
+        resp = self.client.get("/alice", headers={"If-Modified-Since": resp.headers["last-modified"]})
+        self.assertEqual(resp.status_code, 304)
+
+    def test_repo_changes_invalidate(self):
+        """ Creating a repo changes the cached profile and homepage """
+        self.create_user("alice", password="pw", repos=[])
+        etag = self.client.get("/alice").headers["etag"]
+        self.client.get("/")
+        self.login_as("alice")
+        self.client.post("/alice/fresh")
+        self.client.cookies.clear()
+
+        resp = self.client.get("/alice", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("fresh", resp.text)
+        self.assertIn("alice/fresh", self.client.get("/").text)
+
+    def test_branch_update_invalidates_repo_page(self):
+        """ Moving a ref makes the repo page re-render """
+        self.create_user("alice", repos=[self.create_repo("proj")])
+        self.create_repo_structure("alice", "proj")
+        etag = self.client.get("/alice/proj").headers["etag"]
+        self.assertEqual(self.client.get("/alice/proj", headers={"If-None-Match": etag}).status_code, 304)
+
+        misses = page_cache.metrics()["misses"]
+        RefStore(os.path.join(self.repo_root, "alice", "proj", ".gitmini")).compare_and_swap("dev", None, "a" * 40)
+        resp = self.client.get("/alice/proj", headers={"If-None-Match": etag})
+        self.assertEqual(page_cache.metrics()["misses"], misses + 1)
+        # Re-rendered, but the page doesn't list branches, so the content (and ETag) is unchanged
+        self.assertEqual(resp.status_code, 304)
+
+    def test_logged_in_pages_stay_no_store(self):
+        """ Session-bearing responses are never cacheable downstream """
+        self.create_user("alice", repos=[])
+        self.login_as("alice")
+        resp = self.client.get("/alice")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("etag", resp.headers)
+        self.assertIn("no-store", resp.headers["cache-control"])
+        # Served from the server-side cache the second time
+        hits = page_cache.metrics()["hits"]
+        self.assertEqual(self.client.get("/alice").text, resp.text)
+        self.assertEqual(page_cache.metrics()["hits"], hits + 1)
+
+    def test_viewers_do_not_share_entries(self):
+        """ A logged-in render (with owner controls) is never served to anonymous visitors """
+        self.create_user("alice", repos=[])
+        self.login_as("alice")
+        logged_in = self.client.get("/").text
+        self.client.cookies.clear()
+        anonymous = self.client.get("/").text
+        self.assertIn("Create Repository", logged_in)
+        self.assertNotIn("Create Repository", anonymous)
+
+    def test_api_responses_stay_no_store(self):
+        resp = self.client.get("/api/metrics")
+        self.assertIn("no-store", resp.headers["cache-control"])
+        self.assertIn("page_cache", resp.json())
+
+    def test_unread_query_params_share_one_entry(self):
+        """ Junk query strings can't flood the cache with copies of a page """
+        self.create_user("alice", repos=[])
+        self.client.get("/alice")
+        entries = page_cache.metrics()["entries"]
+        for i in range(5):
+            self.assertEqual(self.client.get(f"/alice?x={i}").status_code, 200)
+        self.assertEqual(page_cache.metrics()["entries"], entries)
+
+    def test_bounded_by_total_size(self):
+        cache = PageCache(max_entries=100, max_bytes=250)
+        for i in range(5):
+            cache.put(("/p", i), CachedPage(None, b"x" * 100, "text/html"))
+        metrics = cache.metrics()
+        self.assertEqual(metrics["entries"], 2)
+        self.assertEqual(metrics["bytes"], 200)
+        self.assertIsNone(cache.get(("/p", 0), None))
+        self.assertIsNotNone(cache.get(("/p", 4), None))
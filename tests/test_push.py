@@ -1,39 +1,179 @@
+import io
 import os
 import json
-import shutil
-import tempfile
-import unittest
-from fastapi.testclient import TestClient
-from app.main import app
+import tarfile
 from tests.test_helpers import AppTestCase
+from app.utils import hash_api_key
+from app.gitmini.objects import encode_object, hash_object
 
 class PushTests(AppTestCase):
-    def make_branch(self, username, repo_name, branch):
+    def make_branch(self, username, repo_name, branch, commit="commit123"):
         base = os.path.join(self.repo_root, username, repo_name, ".gitmini", "refs", "heads")
         os.makedirs(base, exist_ok=True)
         with open(os.path.join(base, branch), "w") as f:
-            f.write("commit123")
+            f.write(commit)
 
     def add_api_key(self, username, api_key):
         with open(self.users_path, "r") as f:
             users = json.load(f) 
         if "api_keys" not in users[username]:
             users[username]["api_keys"] = []
-        users[username]["api_keys"].append(api_key)
+        users[username]["api_keys"].append(hash_api_key(api_key))
         with open(self.users_path, "w") as f:
             json.dump(users, f)
 
+    def make_archive(self, objects):
+        """Builds an in-memory .tar.gz of {name: bytes} members."""
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+            for name, data in objects.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return buf.getvalue()
+
+    def make_commit(self):
+        """Returns (hash, bytes) for a blob, tree and commit chain."""
+        blob = encode_object("blob", b"hello\n")
+        tree = encode_object("tree", f"100644 blob {hash_object(blob)}\thello.txt\n".encode())
+        commit = encode_object("commit", f"tree {hash_object(tree)}\nauthor alice 0\n\nfirst\n".encode())
+        return {hash_object(o): o for o in (blob, tree, commit)}, hash_object(commit)
+
+    def push(self, fields, archive=None, filename="new_objects.tar.gz"):
+        if archive is None:
+            archive = self.make_archive({})
+        return self.client.post("/api/remote/push", data=fields, files={"objects": (filename, archive, "application/gzip")})
+
+    def setup_repo(self, username, repo_name, api_key):
+        self.create_user(username, repos=[])
+        self.add_api_key(username, api_key)
+        os.makedirs(os.path.join(self.repo_root, username, repo_name, ".gitmini", "objects"))
+        self.make_branch(username, repo_name, "main")
+
     def test_success(self):
         api_key = "validkey"
-        self.create_user("alice", repos=[])
-        self.add_api_key("alice", api_key)
-        os.makedirs(os.path.join(self.repo_root, "alice", "myrepo", ".gitmini"))
-        self.make_branch("alice", "myrepo", "main")
-        resp = self.client.post("/api/remote/push", json={"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main"})
+        self.setup_repo("alice", "myrepo", api_key)
+        objects, commit = self.make_commit()
+        resp = self.push({"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main",
+                          "last_known_remote_commit": "commit123", "new_commit": commit},
+                         self.make_archive({f"objects/{h}": o for h, o in objects.items()}))
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
         self.assertEqual(data["status"], "ok")
-        self.assertEqual(data["message"], "Push successful")
+        self.assertEqual(data["message"], "Push successful.")
+        self.assertEqual(data["most_recent_remote_branch_commit"], commit)
+
+    def test_repo_path_escaping_the_user_is_refused(self):
+        api_key = "validkey"
+        self.setup_repo("alice", "myrepo", api_key)
+        self.setup_repo("bob", "proj", "bobkey")
+        objects, commit = self.make_commit()
+        for repo in ["../bob/proj", "..", ".gitmini", "a\\b"]:
+            resp = self.push({"user": "alice", "api_key": api_key, "repo": repo, "branch": "main",
+                              "last_known_remote_commit": "commit123", "new_commit": commit},
+                             self.make_archive(objects))
+            self.assertEqual(resp.status_code, 400)
+        with open(os.path.join(self.repo_root, "bob", "proj", ".gitmini", "refs", "heads", "main")) as f:
+            self.assertEqual(f.read(), "commit123")
+        self.assertFalse(os.path.exists(os.path.join(self.repo_root, "bob", "proj", ".gitmini", "objects", commit[:2])))
+
+    def test_success_stores_objects_and_updates_ref(self):
+        api_key = "validkey"
+        self.setup_repo("alice", "myrepo", api_key)
+        objects, commit = self.make_commit()
+        self.push({"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main", "new_commit": commit},
+                  self.make_archive(objects))
+        base = os.path.join(self.repo_root, "alice", "myrepo", ".gitmini")
+        for obj_hash, data in objects.items():
+            with open(os.path.join(base, "objects", obj_hash[:2], obj_hash[2:]), "rb") as f:
+                self.assertEqual(f.read(), data)
+        with open(os.path.join(base, "refs", "heads", "main")) as f:
+            self.assertEqual(f.read(), commit)
+        with open(os.path.join(base, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["refs"], {"main": commit})
+        self.assertEqual(manifest["objects"], len(objects))
+        self.assertIsNotNone(manifest["last_pushed_at"])
+
+    def test_existing_objects_are_deduplicated(self):
+        api_key = "validkey"
+        self.setup_repo("alice", "myrepo", api_key)
+        objects, commit = self.make_commit()
+        fields = {"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main", "new_commit": commit}
+        self.push(fields, self.make_archive(objects))
+        self.push(fields, self.make_archive(objects))
+        stats = self.client.get("/api/metrics").json()["push_ingest"]["last_push"]
+        self.assertEqual(stats["objects_received"], 3)
+        self.assertEqual(stats["objects_deduplicated"], 3)
+        self.assertEqual(stats["objects_written"], 0)
+
+    def test_object_hash_mismatch_rejected(self):
+        api_key = "validkey"
+        self.setup_repo("alice", "myrepo", api_key)
+        bogus = "0" * 40
+        resp = self.push({"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main", "new_commit": bogus},
+                         self.make_archive({bogus: b"not what the name says"}))
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["message"], "Object archive missing or corrupt")
+        self.assertFalse(os.path.exists(os.path.join(self.repo_root, "alice", "myrepo", ".gitmini", "objects", bogus[:2], bogus[2:])))
+        with open(os.path.join(self.repo_root, "alice", "myrepo", ".gitmini", "refs", "heads", "main")) as f:
+            self.assertEqual(f.read(), "commit123")
+
+    def test_corrupt_archive(self):
+        api_key = "validkey"
+        self.setup_repo("alice", "myrepo", api_key)
+        resp = self.push({"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main"}, b"not a tarball")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["message"], "Object archive missing or corrupt")
+
+    def test_new_commit_missing_from_store(self):
+        api_key = "validkey"
+        self.setup_repo("alice", "myrepo", api_key)
+        resp = self.push({"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main", "new_commit": "a" * 40})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["message"], "Object archive missing or corrupt")
+
+    def test_non_fast_forward_rejected(self):
+        api_key = "validkey"
+        self.setup_repo("alice", "myrepo", api_key)
+        objects, commit = self.make_commit()
+        resp = self.push({"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main",
+                          "last_known_remote_commit": "stale", "new_commit": commit},
+                         self.make_archive(objects))
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["most_recent_remote_branch_commit"], "commit123")
+
+    def push_commit(self, api_key, content, parents=(), last_known=None):
+        """Pushes a one-file commit with the given parents to alice/myrepo main."""
+        blob = encode_object("blob", content)
+        tree = encode_object("tree", f"100644 blob {hash_object(blob)}\thello.txt\n".encode())
+        body = f"tree {hash_object(tree)}\n" + "".join(f"parent {p}\n" for p in parents) + "author alice 0\n\nmsg\n"
+        commit = encode_object("commit", body.encode())
+        fields = {"user": "alice", "api_key": api_key, "repo": "myrepo", "branch": "main", "new_commit": hash_object(commit)}
+        if last_known is not None:
+            fields["last_known_remote_commit"] = last_known
+        resp = self.push(fields, self.make_archive({hash_object(o): o for o in (blob, tree, commit)}))
+        return resp, hash_object(commit)
+
+    def test_stale_base_accepted_when_fast_forward(self):
+        self.setup_repo("alice", "myrepo", "key")
+        _, first = self.push_commit("key", b"1")
+        _, second = self.push_commit("key", b"2", parents=[first], last_known=first)
+        # The client last saw first, but its commit builds on the current tip
+        resp, third = self.push_commit("key", b"3", parents=[second], last_known=first)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["most_recent_remote_branch_commit"], third)
+
+    def test_diverged_history_rejected(self):
+        self.setup_repo("alice", "myrepo", "key")
+        _, first = self.push_commit("key", b"1")
+        _, second = self.push_commit("key", b"2", parents=[first])
+        # Claims to be up to date, but would drop second from the branch
+        resp, _ = self.push_commit("key", b"other", parents=[first], last_known=second)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["most_recent_remote_branch_commit"], second)
+        resp, _ = self.push_commit("key", b"other", parents=[first], last_known=first)
+        self.assertEqual(resp.status_code, 400)
 
     def test_auth_failure(self):
         api_key = "realkey"
@@ -42,7 +182,7 @@ class PushTests(AppTestCase):
         os.makedirs(os.path.join(self.repo_root, "bob", "repo1", ".gitmini"))
         self.make_branch("bob", "repo1", "main")
         # Wrong API key
-        resp = self.client.post("/api/remote/push", json={"user": "bob", "api_key": "wrong", "repo": "repo1", "branch": "main"})
+        resp = self.push({"user": "bob", "api_key": "wrong", "repo": "repo1", "branch": "main"})
         self.assertEqual(resp.status_code, 401)
         self.assertEqual(resp.json()["message"], "Authentication failed")
 
@@ -50,7 +190,7 @@ class PushTests(AppTestCase):
         api_key = "key"
         self.create_user("carol", repos=[])
         self.add_api_key("carol", api_key)
-        resp = self.client.post("/api/remote/push", json={"user": "carol", "api_key": api_key, "repo": "missing", "branch": "main"})
+        resp = self.push({"user": "carol", "api_key": api_key, "repo": "missing", "branch": "main"})
         self.assertIn(resp.status_code, (403, 404))
         self.assertEqual(resp.json()["status"], "error")
         self.assertIn("Repository not found", resp.json()["message"])
@@ -58,13 +198,13 @@ class PushTests(AppTestCase):
     def test_access_denied(self):
         api_key = "k1"
         self.create_user("dave", repos=[])
-        self.create_user("eve", repos=[])
+        self.create_user("eve", repos=[self.create_repo("sharedrepo")])
         self.add_api_key("dave", api_key)
         self.add_api_key("eve", "k2")
         os.makedirs(os.path.join(self.repo_root, "eve", "sharedrepo", ".gitmini"))
         self.make_branch("eve", "sharedrepo", "main")
         # Dave tries to access Eve's repo
-        resp = self.client.post("/api/remote/push", json={"user": "dave", "api_key": api_key, "repo": "sharedrepo", "branch": "main"})
+        resp = self.push({"user": "dave", "api_key": api_key, "repo": "sharedrepo", "branch": "main"})
         self.assertEqual(resp.status_code, 403)
         self.assertEqual(resp.json()["status"], "error")
         self.assertIn("Repository not found or access denied", resp.json()["message"])
@@ -75,7 +215,7 @@ class PushTests(AppTestCase):
         self.add_api_key("frank", api_key)
         os.makedirs(os.path.join(self.repo_root, "frank", "repoz", ".gitmini"))
         # No branch created
-        resp = self.client.post("/api/remote/push", json={"user": "frank", "api_key": api_key, "repo": "repoz", "branch": "dev"})
+        resp = self.push({"user": "frank", "api_key": api_key, "repo": "repoz", "branch": "dev"})
         self.assertEqual(resp.status_code, 404)
         self.assertEqual(resp.json()["status"], "error")
         self.assertEqual(resp.json()["message"], "Remote branch not found.")
@@ -89,4 +229,4 @@ class PushTests(AppTestCase):
         self.assertEqual(resp.status_code, 422)
         # Not JSON
         resp = self.client.post("/api/remote/push", content=b"notjson", headers={"content-type": "application/json"})
-        self.assertEqual(resp.status_code, 422) 
\ No newline at end of file
+        self.assertEqual(resp.status_code, 422)
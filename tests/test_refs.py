@@ -0,0 +1,64 @@
+import os
+import tempfile
+import threading
+import unittest
+from app.gitmini.refs import RefStore, RefUpdateRejected
+
+
+class RefStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        gitmini = os.path.join(self.tmpdir.name, ".gitmini")
+        os.makedirs(os.path.join(gitmini, "refs", "heads"))
+        open(os.path.join(gitmini, "refs", "heads", "main"), "w").close()
+        self.refs = RefStore(gitmini)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_compare_and_swap(self):
+        self.assertEqual(self.refs.compare_and_swap("main", "", "a" * 40, "alice"), "")
+        self.assertEqual(self.refs.read("main"), "a" * 40)
+
+    def test_compare_and_swap_rejects_moved_ref(self):
+        self.refs.compare_and_swap("main", "", "a" * 40)
+        with self.assertRaises(RefUpdateRejected) as ctx:
+            self.refs.compare_and_swap("main", "", "b" * 40)
+        self.assertEqual(ctx.exception.current, "a" * 40)
+        self.assertEqual(self.refs.read("main"), "a" * 40)
+
+    def test_reflog(self):
+        self.refs.compare_and_swap("main", "", "a" * 40, "alice")
+        self.refs.compare_and_swap("main", "a" * 40, "b" * 40, "alice")
+        log = self.refs.reflog("main")
+        self.assertEqual([(e["old"], e["new"]) for e in log], [(None, "a" * 40), ("a" * 40, "b" * 40)])
+        self.assertEqual(log[0]["user"], "alice")
+
+    def test_concurrent_pushes_to_same_ref_serialize(self):
+        """ Only one of many racing swaps from the same base can win """
+        winners = []
+        barrier = threading.Barrier(8)
+
+        def push(i):
+            barrier.wait()
+            try:
+                self.refs.compare_and_swap("main", "", f"{i:040d}")
+                winners.append(i)
+            except RefUpdateRejected:
+                pass
+
+        threads = [threading.Thread(target=push, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(self.refs.read("main"), f"{winners[0]:040d}")
+        self.assertEqual(len(self.refs.reflog("main")), 1)
+
+    def test_branches_ignore_temp_and_lock_files(self):
+        self.refs.compare_and_swap("main", "", "a" * 40)
+        open(os.path.join(self.refs.heads_dir, ".main.tmp"), "w").close()
+        self.assertEqual(self.refs.branches(), {"main": "a" * 40})
+        self.assertFalse(self.refs.exists("../main"))
@@ -6,6 +6,7 @@ import unittest
 from fastapi.testclient import TestClient
 from app.main import app
 from tests.test_helpers import AppTestCase
+from app.utils import hash_api_key
 
 class RemoteAddTests(AppTestCase):
     def make_branches(self, username, repo_name, branches):
@@ -21,7 +22,7 @@ class RemoteAddTests(AppTestCase):
             users = json.load(f)
         if "api_keys" not in users[username]:
             users[username]["api_keys"] = []
-        users[username]["api_keys"].append(api_key)
+        users[username]["api_keys"].append(hash_api_key(api_key))
         with open(self.users_path, "w") as f:
             json.dump(users, f)
 
@@ -56,10 +57,17 @@ class RemoteAddTests(AppTestCase):
         self.assertEqual(resp.status_code, 404)
         self.assertEqual(resp.json()["message"], "Repository not found")
 
+    def test_repo_outside_the_user_rejected(self):
+        self.create_user("carol", repos=[])
+        self.add_api_key("carol", "key")
+        os.makedirs(os.path.join(self.repo_root, "bob", "repo1", ".gitmini"))
+        resp = self.client.post("/api/remote/add", json={"user": "carol", "api_key": "key", "repo": "../bob/repo1"})
+        self.assertEqual(resp.status_code, 400)
+
     def test_access_denied(self):
         api_key = "k1"
         self.create_user("dave", repos=[])
-        self.create_user("eve", repos=[])
+        self.create_user("eve", repos=[self.create_repo("sharedrepo")])
         self.add_api_key("dave", api_key)
         self.add_api_key("eve", "k2")
         os.makedirs(os.path.join(self.repo_root, "eve", "sharedrepo", ".gitmini"))
@@ -1,6 +1,8 @@
 from tests.test_helpers import AppTestCase
 import json
 import os
+from app.gitmini.objects import get_object_store
+from app.gitmini.commit_graph import get_commit_graph
 
 class RemoteRepoTests(AppTestCase):
 
@@ -12,10 +14,18 @@ class RemoteRepoTests(AppTestCase):
 
         base = os.path.join(self.repo_root, "james", "project", ".gitmini")
         os.makedirs(base, exist_ok=True)
+        store = get_object_store(os.path.join(base, "objects"))
+        graph = get_commit_graph(base)
 
         resp = self.client.post("/james/project/delete", data={"confirm_name": "project"}, follow_redirects=False)
         self.assertEqual(resp.status_code, 302)
         self.assertEqual(resp.headers["location"], "/james")
+        # Nothing of the deleted repo stays cached in the worker
+        self.assertIsNot(get_object_store(os.path.join(base, "objects")), store)
+        self.assertIsNot(get_commit_graph(base), graph)
+
+        # Moved out of the way at once; the reaper frees the space later
+        self.assertFalse(os.path.exists(os.path.join(self.repo_root, "james", "project")))
 
         # Confirm it's gone
         with open(self.users_path) as f:
@@ -58,3 +68,20 @@ class RemoteRepoTests(AppTestCase):
         self.assertEqual(post_resp.status_code, 302)
         self.assertEqual(post_resp.headers["location"], "/james/project?error=unauthorized")
 
+
+    def test_repo_names_escaping_the_user_rejected(self):
+        """ '..' and dot-prefixed names are refused and create nothing on disk """
+        self.create_user("james", repos=[])
+        self.login_as("james")
+        for name in ["%2e%2e", ".hidden", ".gitmini"]:
+            resp = self.client.post(f"/james/{name}", follow_redirects=False)
+            self.assertEqual(resp.status_code, 302)
+            self.assertEqual(resp.headers["location"], "/?error=Invalid%20repository%20name")
+        self.assertFalse(os.path.exists(os.path.join(self.repo_root, ".gitmini")))
+        self.assertFalse(os.path.exists(os.path.join(self.repo_root, "james")))
+        with open(self.users_path) as f:
+            self.assertEqual(json.load(f)["james"]["repos"], [])
+
+        resp = self.client.post("/james/%2e%2e/delete", data={"confirm_name": ".."}, follow_redirects=False)
+        self.assertEqual(resp.headers["location"], "/james?error=not_found")
+        self.assertTrue(os.path.isdir(self.repo_root))
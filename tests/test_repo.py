@@ -10,7 +10,7 @@ class RepoTests(AppTestCase):
         self.create_user("james", repos=[repo])
         resp = self.client.get("/james/project")
         self.assertIn("james / project", resp.text)
-        self.assertIn("placeholder repo view", resp.text)
+        self.assertIn("no commits yet", resp.text)
 
     def test_guest_cannot_see_delete_button(self):
         """ Guests cannot see delete repo button """
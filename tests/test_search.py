@@ -0,0 +1,74 @@
+import unittest
+from tests.test_helpers import AppTestCase
+from app.storage.search import SearchIndex
+
+
+class SearchIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        repos = [
+            {"username": "alice", "name": "gitminihub", "created_at": "2025-01-01"},
+            {"username": "alice", "name": "notes", "created_at": "2025-01-02"},
+            {"username": "bob", "name": "gitmini-cli", "created_at": "2025-01-03"},
+            {"username": "bob", "name": "dotfiles", "created_at": "2025-01-04"},
+        ]
+        self.index = SearchIndex.build(["alice", "bob", "alicia"], repos)
+
+    def names(self, kind, query, offset=0, limit=10):
+        results, _ = self.index.search(kind, query, offset, limit)
+        return [r.get("name", r["username"]) for r in results]
+
+    def test_prefix(self):
+        self.assertEqual(self.names("repos", "gitmini"), ["gitmini-cli", "gitminihub"])
+        self.assertEqual(self.names("repos", "GITMINIH")[0], "gitminihub")
+        self.assertEqual(self.names("users", "ali"), ["alice", "alicia"])
+
+    def test_owner_path(self):
+        self.assertEqual(self.names("repos", "bob/"), ["dotfiles", "gitmini-cli"])
+        self.assertEqual(self.names("repos", "alice/no"), ["notes"])
+
+    def test_fuzzy(self):
+        # Typo and infix matches come after prefix matches
+        self.assertEqual(self.names("repos", "gitminhub"), ["gitminihub", "gitmini-cli"])
+        self.assertEqual(self.names("repos", "files"), ["dotfiles"])
+        self.assertEqual(self.names("repos", "zzzz"), [])
+
+    def test_pagination(self):
+        results, total = self.index.search("repos", "gitmini", 1, 1)
+        self.assertEqual(total, 2)
+        self.assertEqual([r["name"] for r in results], ["gitminihub"])
+        self.assertEqual(self.index.search("repos", "gitmini", 2, 1), ([], 2))
+
+    def test_incremental_updates(self):
+        self.index.add_repo("carol", "gitmini-docs", "2025-01-05")
+        self.index.remove_repo("alice", "gitminihub")
+        self.index.add_user("carl")
+        self.assertEqual(self.names("repos", "gitmini"), ["gitmini-cli", "gitmini-docs"])
+        self.assertEqual(self.names("users", "car"), ["carl"])
+
+
+class SearchPageTests(AppTestCase):
+
+    def test_search_page_and_api(self):
+        self.create_user("alice", repos=[self.create_repo("gitminihub"), self.create_repo("notes")])
+        resp = self.client.get("/search?q=gitmini")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("alice/gitminihub", resp.text)
+        self.assertNotIn("alice/notes", resp.text)
+
+        data = self.client.get("/api/search", params={"q": "ali", "kind": "users"}).json()
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["results"], [{"username": "alice"}])
+
+    def test_index_follows_signup_and_repo_changes(self):
+        self.client.post("/signup", data={"username": "newbie", "password": "pw", "confirm_password": "pw"})
+        self.assertEqual(self.client.get("/api/search?q=newb&kind=users").json()["total"], 1)
+        self.login_as("newbie")
+        self.client.post("/newbie/project")
+        self.assertEqual(self.client.get("/api/search?q=proj").json()["results"][0]["name"], "project")
+        self.client.post("/newbie/project/delete", data={"confirm_name": "project"})
+        self.assertEqual(self.client.get("/api/search?q=proj").json()["total"], 0)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get("/api/search?q=x&kind=files").status_code, 400)
+        self.assertEqual(self.client.get("/api/search?q=x&page=0").status_code, 400)
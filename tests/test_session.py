@@ -1,4 +1,8 @@
+import time
+from unittest.mock import patch
 from tests.test_helpers import AppTestCase
+from app import utils
+from app.sessions import SessionStore
 
 class SessionTests(AppTestCase):
 
@@ -51,3 +55,106 @@ class SessionTests(AppTestCase):
         # Visit repo page
         resp_repo = self.client.get("/testuser/repo1")
         self.assertIn("Log Out", resp_repo.text)
+
+    def test_login_cookie_recognized(self):
+        """ The cookie set by /login identifies the user. """
+        self.create_user("testuser", password="pw")
+        resp = self.client.post("/login", data={"username": "testuser", "password": "pw"}, follow_redirects=False)
+        self.assertIn(f"Max-Age={utils.sessions.ttl}", resp.headers["set-cookie"])
+        self.assertIn("Log Out", self.client.get("/").text)
+
+    def test_cached_session_skips_storage(self):
+        """ Once validated, a session is resolved without reading the user record. """
+        self.create_user("testuser")
+        self.login_as("testuser")
+        self.assertIn("Log Out", self.client.get("/").text)
+        with patch.object(utils.sessions, "load_user", side_effect=AssertionError("storage read")):
+            self.assertIn("Log Out", self.client.get("/testuser").text)
+
+    def test_expired_session_rejected(self):
+        """ Expiry is enforced server-side, whatever the cookie's max-age. """
+        self.create_user("testuser")
+        # Signed an hour before the session lifetime ran out
+        with patch("itsdangerous.timed.TimestampSigner.get_timestamp", return_value=int(time.time()) - utils.sessions.ttl - 3600):
+            self.login_as("testuser")
+        self.assertIn("Log In", self.client.get("/").text)
+
+    def test_logout_revokes_session(self):
+        """ A cookie kept after logout no longer works. """
+        self.create_user("testuser")
+        self.login_as("testuser")
+        cookie = self.client.cookies.get("session")
+        self.client.get("/logout")
+        self.client.cookies.set("session", cookie)
+        self.assertIn("Log In", self.client.get("/").text)
+
+    def test_revoke_user_sessions(self):
+        """ Revoking a user's sessions takes effect immediately; new logins still work. """
+        self.create_user("testuser")
+        self.login_as("testuser")
+        self.assertIn("Log Out", self.client.get("/").text)
+        utils.revoke_user_sessions("testuser")
+        self.assertIn("Log In", self.client.get("/").text)
+        self.login_as("testuser")
+        self.assertIn("Log Out", self.client.get("/").text)
+
+    def test_password_change_invalidates_session(self):
+        """ Sessions are bound to the password they were issued under. """
+        self.create_user("testuser", password="old")
+        self.login_as("testuser")
+        self.create_user("testuser", password="new")
+        utils.sessions.invalidate_user("testuser")
+        self.assertIn("Log In", self.client.get("/").text)
+
+    def test_repo_change_refreshes_cached_record(self):
+        """ Writes to the user's record drop the cached copy. """
+        self.create_user("testuser")
+        self.login_as("testuser")
+        self.assertEqual(utils.sessions.resolve(self.client.cookies.get("session"))["user"]["repos"], [])
+        utils.add_user_repo("testuser", "proj")
+        entry = utils.sessions.resolve(self.client.cookies.get("session"))
+        self.assertEqual([r["name"] for r in entry["user"]["repos"]], ["proj"])
+
+    def test_revocations_are_never_evicted(self):
+        """ A logged-out session stays dead however many others log out after it. """
+        store = SessionStore("secret", lambda name: {"password_hash": "h"}, max_entries=4)
+        cookie = store.create("testuser")
+        store.revoke(cookie)
+        for _ in range(10):
+            store.revoke(store.create("testuser"))
+        self.assertIsNone(store.resolve(cookie))
+
+    def test_session_renewed_past_half_life(self):
+        """ Active users get a fresh cookie instead of being logged out at expiry. """
+        self.create_user("testuser")
+        signed = int(time.time()) - utils.sessions.ttl // 2 - 60
+        with patch("itsdangerous.timed.TimestampSigner.get_timestamp", return_value=signed):
+            self.login_as("testuser")
+        old = self.client.cookies.get("session")
+        resp = self.client.get("/")
+        self.assertIn("Log Out", resp.text)
+        renewed = resp.cookies.get("session")
+        self.assertIsNotNone(renewed)
+        self.assertNotEqual(renewed, old)
+        self.assertEqual(utils.sessions.resolve(renewed)["sid"], utils.sessions.resolve(old)["sid"])
+
+        # A fresh cookie is left alone
+        self.client.cookies.clear()
+        self.client.cookies.set("session", renewed)
+        self.assertNotIn("set-cookie", self.client.get("/").headers)
+
+    def test_logout_after_renewal_revokes_the_old_cookie(self):
+        """ Logging out with a renewed cookie also ends the cookie it replaced. """
+        self.create_user("testuser")
+        signed = int(time.time()) - utils.sessions.ttl // 2 - 60
+        with patch("itsdangerous.timed.TimestampSigner.get_timestamp", return_value=signed):
+            self.login_as("testuser")
+        old = self.client.cookies.get("session")
+        renewed = self.client.get("/").cookies.get("session")
+        self.client.cookies.clear()
+        self.client.cookies.set("session", renewed)
+        self.client.get("/logout")
+        self.client.cookies.clear()
+        self.client.cookies.set("session", old)
+        self.assertIn("Log In", self.client.get("/").text)
+        self.assertIsNone(utils.sessions.resolve(old))
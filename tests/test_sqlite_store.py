@@ -0,0 +1,105 @@
+import os
+import json
+import tempfile
+import unittest
+from app.storage.sqlite_store import SqliteStore
+from app.storage.migrate import migrate_json_to_sqlite
+
+
+class SqliteStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+        self.store = SqliteStore(self.db_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_uses_wal_mode(self):
+        mode = self.store._connect().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_create_user_is_unique(self):
+        self.assertTrue(self.store.create_user("alice", "hash"))
+        self.assertFalse(self.store.create_user("alice", "other"))
+        self.assertEqual(self.store.get_user("alice"), {"password_hash": "hash", "repos": [], "api_keys": []})
+
+    def test_repo_lifecycle(self):
+        self.store.create_user("alice", "hash")
+        entry = {"name": "proj", "created_at": "2025-01-01T00:00:00+00:00"}
+        self.assertIsNone(self.store.add_repo("alice", entry))
+        self.assertEqual(self.store.add_repo("alice", entry), "Repository already exists")
+        self.assertEqual(self.store.add_repo("ghost", entry), "User not found")
+        self.assertEqual(self.store.all_repos(), [{"username": "alice", **entry}])
+        self.store.remove_repo("alice", "proj")
+        self.assertEqual(self.store.get_user("alice")["repos"], [])
+
+    def test_api_keys(self):
+        self.store.create_user("alice", "hash")
+        self.store.add_api_key("alice", "k1")
+        self.store.add_api_key("alice", "k2")
+        self.assertEqual(self.store.get_user("alice")["api_keys"], ["k1", "k2"])
+
+    def test_repo_owners(self):
+        self.store.create_user("a", "h")
+        self.store.create_user("b", "h")
+        self.store.add_repo("a", {"name": "proj", "created_at": "2024-01-01T00:00:00+00:00"})
+        self.store.add_repo("b", {"name": "proj", "created_at": "2025-01-01T00:00:00+00:00"})
+        self.assertEqual(self.store.repo_owners("proj"), {"a", "b"})
+        self.store.remove_repo("a", "proj")
+        self.assertEqual(self.store.repo_owners("proj"), {"b"})
+
+    def test_recent_repos_pages(self):
+        self.store.create_user("a", "h")
+        for i, day in enumerate(["01", "02", "02", "03"]):
+            self.store.add_repo("a", {"name": f"r{i}", "created_at": f"2025-01-{day}T00:00:00+00:00"})
+        repos, cursor = self.store.recent_repos(None, 2)
+        # r1 and r2 share a timestamp and stay on the same page
+        self.assertEqual([r["name"] for r in repos], ["r3", "r2", "r1"])
+        self.assertEqual(cursor, "2025-01-02T00:00:00+00:00")
+        repos, cursor = self.store.recent_repos(cursor, 2)
+        self.assertEqual([r["name"] for r in repos], ["r0"])
+        self.assertIsNone(cursor)
+
+    def test_all_repos_newest_first(self):
+        self.store.create_user("a", "h")
+        self.store.create_user("b", "h")
+        self.store.add_repo("a", {"name": "old", "created_at": "2024-01-01T00:00:00+00:00"})
+        self.store.add_repo("b", {"name": "new", "created_at": "2025-01-01T00:00:00+00:00"})
+        self.assertEqual([r["name"] for r in self.store.all_repos()], ["new", "old"])
+
+    def test_migrate_from_users_json(self):
+        users = {
+            "alice": {
+                "password_hash": "h1",
+                "repos": [{"name": "proj", "created_at": "2025-01-01T00:00:00+00:00"}],
+                "api_keys": ["k1"]
+            },
+            "legacy": {"password_hash": "h2", "repos": ["old-style"]}
+        }
+        json_path = os.path.join(self.tmpdir.name, "users.json")
+        with open(json_path, "w") as f:
+            json.dump(users, f)
+
+        self.assertEqual(migrate_json_to_sqlite(json_path, self.db_path), 2)
+        # Re-running is a no-op
+        migrate_json_to_sqlite(json_path, self.db_path)
+
+        self.assertEqual(self.store.get_user("alice"), users["alice"])
+        self.assertEqual(self.store.get_user("legacy")["repos"], [{"name": "old-style", "created_at": ""}])
+        self.assertEqual(self.store.load_all()["alice"], users["alice"])
+
+    def test_api_key_index(self):
+        self.store.create_user("alice", "hash")
+        self.store.add_api_key("alice", "k1")
+        record = self.store.find_api_key("k1")
+        self.assertEqual(record["username"], "alice")
+        self.assertIsNone(record["last_used"])
+
+        self.store.touch_api_key("k1")
+        self.store.flush_api_key_usage()
+        self.assertIsNotNone(self.store.find_api_key("k1")["last_used"])
+
+        self.store.revoke_api_key("alice", "k1")
+        self.assertIsNone(self.store.find_api_key("k1"))
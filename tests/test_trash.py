@@ -0,0 +1,76 @@
+import os
+import time
+import unittest
+import tempfile
+from unittest.mock import patch
+from app.gitmini.trash import Reaper
+
+
+class ReaperTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.trash_dir = os.path.join(self.tmpdir.name, ".trash")
+        self.reaper = Reaper(self.trash_dir, batch=2, pause=0)
+
+    def tearDown(self):
+        self.reaper.stop(timeout=5)
+        self.tmpdir.cleanup()
+
+    def make_repo(self, name, files=5):
+        path = os.path.join(self.tmpdir.name, name)
+        objects = os.path.join(path, ".gitmini", "objects", "ab")
+        os.makedirs(objects)
+        for i in range(files):
+            with open(os.path.join(objects, f"obj{i}"), "wb") as f:
+                f.write(b"x" * 100)
+        return path
+
+    def wait_until_empty(self):
+        deadline = time.monotonic() + 5
+        while self.reaper.pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.reaper.pending(), [])
+
+    def test_trash_is_a_rename(self):
+        path = self.make_repo("proj")
+        with patch.object(self.reaper, "start"):
+            target = self.reaper.trash(path)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.isdir(os.path.join(target, ".gitmini", "objects")))
+        self.assertEqual(self.reaper.pending(), [os.path.basename(target)])
+
+    def test_reap_reports_progress(self):
+        with patch.object(self.reaper, "start"):
+            self.reaper.trash(self.make_repo("proj"))
+        self.assertEqual(self.reaper.reap_all(), 1)
+        metrics = self.reaper.metrics()
+        self.assertEqual(metrics["pending"], 0)
+        self.assertEqual(metrics["reaped"], 1)
+        self.assertEqual(metrics["files_removed"], 5)
+        self.assertEqual(metrics["bytes_reclaimed"], 500)
+        self.assertIsNone(metrics["current"])
+
+    def test_throttled_between_batches(self):
+        with patch.object(self.reaper, "start"):
+            self.reaper.trash(self.make_repo("proj"))
+        with patch("app.gitmini.trash.time.sleep") as sleep:
+            self.reaper.reap_all()
+        # 5 files in batches of 2
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_background_thread_reaps(self):
+        self.reaper.trash(self.make_repo("proj"))
+        self.wait_until_empty()
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "proj")))
+
+    def test_resumes_leftovers_on_start(self):
+        # Half-removed entry left by a crash
+        leftover = self.make_repo("proj")
+        os.makedirs(self.trash_dir)
+        os.rename(leftover, os.path.join(self.trash_dir, "proj-crashed"))
+        os.remove(os.path.join(self.trash_dir, "proj-crashed", ".gitmini", "objects", "ab", "obj0"))
+
+        self.reaper.start()
+        self.wait_until_empty()
+        self.assertEqual(self.reaper.metrics()["files_removed"], 4)
@@ -0,0 +1,60 @@
+import unittest
+from app.ttl_store import TTLStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.store = TTLStore(3, lambda value: value["expires"], clock=self.clock)
+
+    def test_entries_expire(self):
+        self.store["a"] = {"expires": 1010}
+        self.store["b"] = {"expires": 1020}
+        self.clock.now = 1015
+        self.assertNotIn("a", self.store)
+        self.assertIn("b", self.store)
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.metrics()["expired"], 1)
+
+    def test_in_place_updates_extend_the_deadline(self):
+        self.store["a"] = {"expires": 1010}
+        self.store["a"]["expires"] = 1030
+        self.clock.now = 1020
+        self.assertEqual(self.store.purge(), 0)
+        self.assertIn("a", self.store)
+        self.clock.now = 1030
+        self.assertEqual(self.store.purge(), 1)
+
+    def test_capacity_evicts_least_recently_used(self):
+        for key in "abc":
+            self.store[key] = {"expires": 2000}
+        self.store["a"]
+        self.store["d"] = {"expires": 2000}
+        self.assertEqual(sorted(self.store), ["a", "c", "d"])
+        self.assertEqual(self.store.metrics()["evicted"], 1)
+
+    def test_heap_stays_bounded_under_rewrites(self):
+        for i in range(1000):
+            self.store["a"] = {"expires": 2000 + i}
+        self.assertLess(len(self.store._heap), 100)
+        self.clock.now = 2998
+        self.assertIn("a", self.store)
+        self.clock.now = 2999
+        self.assertNotIn("a", self.store)
+
+    def test_delete(self):
+        self.store["a"] = {"expires": 1010}
+        del self.store["a"]
+        self.clock.now = 1011
+        self.assertEqual(self.store.purge(), 0)
+        with self.assertRaises(KeyError):
+            del self.store["a"]
@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from tests.test_helpers import AppTestCase
 from app.utils import create_repo_entry
 import json
@@ -18,6 +19,20 @@ class UserTests(AppTestCase):
         for repo in ["my-repo", "weatherapp", "cool-stuff"]:
             self.assertIn(f'<a href="/charlie/{repo}">{repo}</a>', resp.text)
 
+    def test_long_repo_list_is_streamed(self):
+        """ Profiles listing many repos are streamed rather than rendered in one piece. """
+        repos = [self.create_repo(f"repo-{i}", created_at=f"2025-06-{i + 10}T00:00:00+00:00") for i in range(3)]
+        self.create_user("charlie", repos=repos)
+
+        with patch("app.templating.STREAM_LIST_THRESHOLD", 2):
+            resp = self.client.get("/charlie")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("content-length", resp.headers)
+        self.assertNotIn("etag", resp.headers)
+        for i in range(3):
+            self.assertIn(f'<a href="/charlie/repo-{i}">repo-{i}</a>', resp.text)
+        self.assertTrue(resp.text.rstrip().endswith("</html>"))
+
     def test_user_with_no_repos(self):
         """ User profile with no repos loads correctly """
         self.create_user("norepos", repos=[])
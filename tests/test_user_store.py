@@ -0,0 +1,126 @@
+import os
+import json
+from tests.test_helpers import AppTestCase
+from app import utils
+from app.storage.backend import get_backend
+from app.storage.json_store import UserStore
+
+
+class UserStoreTests(AppTestCase):
+
+    def test_repeated_loads_do_not_reparse(self):
+        """ Unchanged users.json is served from memory """
+        self.create_user("alice")
+        store = get_backend("json", self.users_path)
+        first = store.view()
+        self.assertIs(store.view(), first)
+
+    def test_external_write_invalidates_cache(self):
+        """ Writes by another process are picked up on the next lookup """
+        self.create_user("alice")
+        self.assertIsNotNone(utils.get_user("alice"))
+        self.create_user("bobby")
+        self.assertIsNotNone(utils.get_user("bobby"))
+        self.assertIn("bobby", utils.get_usernames())
+
+    def test_save_users_updates_cache(self):
+        """ Writes from this process are visible without a re-read """
+        utils.save_users({"carol": {"password_hash": "x", "repos": []}})
+        self.assertTrue(utils.user_exists("carol"))
+        with open(self.users_path) as f:
+            self.assertIn("carol", json.load(f))
+
+    def test_save_is_atomic_rename(self):
+        """ Saving replaces users.json instead of rewriting it in place """
+        utils.save_users({"a": {"password_hash": "x", "repos": []}})
+        inode = os.stat(self.users_path).st_ino
+        utils.create_user("b", "y")
+        self.assertNotEqual(os.stat(self.users_path).st_ino, inode)
+        self.assertEqual([f for f in os.listdir(os.path.dirname(self.users_path)) if f.endswith(".tmp")], [])
+
+    def test_lookups_return_copies(self):
+        """ Mutating a returned record does not leak into the cache """
+        self.create_user("dave")
+        utils.get_user("dave")["repos"].append({"name": "x"})
+        utils.load_users()["dave"]["repos"].append({"name": "y"})
+        self.assertEqual(utils.get_user("dave")["repos"], [])
+
+    def test_repo_owners_index(self):
+        """ Repo name -> owners follows creations, deletions and external writes """
+        self.create_user("alice", repos=[self.create_repo("shared")])
+        self.assertEqual(utils.get_storage().repo_owners("shared"), {"alice"})
+        self.assertIsNone(utils.add_user_repo("alice", "other"))
+        utils.create_user("bob", "hash")
+        self.assertIsNone(utils.add_user_repo("bob", "shared"))
+        self.assertEqual(utils.get_storage().repo_owners("shared"), {"alice", "bob"})
+        utils.remove_user_repo("alice", "shared")
+        self.assertEqual(utils.get_storage().repo_owners("shared"), {"bob"})
+        self.assertTrue(utils.repo_owned_by_other_user("alice", "shared"))
+        self.assertFalse(utils.repo_owned_by_other_user("bob", "shared"))
+        self.assertEqual(utils.get_storage().repo_owners("missing"), set())
+
+
+    def test_recent_repos_pages(self):
+        """ The feed pages match the SQLite engine, ties included """
+        repos = [self.create_repo(f"r{i}", created_at=f"2025-01-{day}T00:00:00+00:00")
+                 for i, day in enumerate(["01", "02", "02", "03"])]
+        self.create_user("a", repos=repos)
+        page, cursor = utils.get_storage().recent_repos(None, 2)
+        self.assertEqual([r["name"] for r in page], ["r3", "r2", "r1"])
+        page, cursor = utils.get_storage().recent_repos(cursor, 2)
+        self.assertEqual([r["name"] for r in page], ["r0"])
+        self.assertIsNone(cursor)
+        utils.remove_user_repo("a", "r3")
+        self.assertEqual(utils.get_storage().recent_repos(None, 1)[0][0]["name"], "r2")
+
+class JournalModeTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.store = UserStore(self.users_path, journal=True)
+
+    def test_single_change_appends_to_journal(self):
+        """ A repo creation is journaled, not re-serialized into users.json """
+        self.store.create_user("alice", "hash")
+        with open(self.users_path) as f:
+            before = f.read()
+        self.store.add_repo("alice", {"name": "proj", "created_at": "2025-01-01T00:00:00+00:00"})
+        with open(self.users_path) as f:
+            self.assertEqual(f.read(), before)
+
+        # A fresh process sees users.json + journal
+        reader = UserStore(self.users_path, journal=True)
+        self.assertEqual(reader.get_user("alice")["repos"][0]["name"], "proj")
+
+    def test_other_process_appends_are_replayed(self):
+        """ Journal entries written by another store are picked up incrementally """
+        self.store.create_user("alice", "hash")
+        other = UserStore(self.users_path, journal=True)
+        self.assertTrue(other.has_user("alice"))
+        self.store.add_api_key("alice", "k1")
+        self.assertEqual(other.get_user("alice")["api_keys"], ["k1"])
+
+    def test_compaction_folds_journal(self):
+        """ Compaction rewrites users.json and empties the journal """
+        self.store.create_user("alice", "hash")
+        self.store.add_api_key("alice", "k1")
+        self.store.compact()
+        with open(self.users_path) as f:
+            self.assertEqual(json.load(f)["alice"]["api_keys"], ["k1"])
+        with open(self.store.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_stale_journal_is_ignored(self):
+        """ A journal left over from an older users.json is not replayed """
+        self.store.create_user("alice", "hash")
+        self.save_users_file({"bob": {"password_hash": "x", "repos": []}})
+        reader = UserStore(self.users_path, journal=True)
+        self.assertEqual(reader.usernames(), ["bob"])
+
+    def test_torn_journal_line_is_skipped(self):
+        """ A half-written trailing entry does not break loading """
+        self.store.create_user("alice", "hash")
+        with open(self.store.journal_path, "a") as f:
+            f.write('{"op": "add_api_key", "userna')
+        reader = UserStore(self.users_path, journal=True)
+        self.assertEqual(reader.get_user("alice")["api_keys"], [])